@@ -1,14 +1,23 @@
 # app.py
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import os
 from datetime import datetime
 import time
 import threading
 
 from components.ui_builder import UIBuilder
-from components.capture_manager import CaptureManager
+from components.capture_manager import CaptureManager, BACKEND_SIMULATE, probe_scapy
+from components.capture_session import CaptureSession
+from components.bpf import compile_filter, FilterError
 from components.data_processor import DataProcessor
+from components.display_filter import DisplayFilter, DisplayFilterError, FilteredView
 from components.visualizations import Visualizations
+from components.pcap_io import CaptureFileReader, CaptureFileWriter
+from components.report_export import open_export, export_format
+from components.metrics import MetricsServer, DEFAULT_METRICS_PORT
+from components.packet_queue import PacketQueue, BLOCK
+from models.packet_store import PacketStore, RetentionPolicy
 
 class PacketCaptureApp:
     def __init__(self, root):
@@ -25,29 +34,80 @@ class PacketCaptureApp:
         
         # Initialize components
         self.ui_builder = UIBuilder(self.root, self)
-        self.capture_manager = CaptureManager(self)
+        self.capture_manager = CaptureManager(on_error=self.report_error)
         self.data_processor = DataProcessor()
         self.visualizations = Visualizations()
         
-        # Packet storage
-        self.packets = []
+        # Packet storage. Packets beyond the retention limits are spilled to
+        # memory-mapped segment files instead of being kept in RAM.
+        self.retention = RetentionPolicy(max_packets=2_000_000, max_bytes=256 * 1024 * 1024)
+        # Capture, storage and analysis; the app only drives and displays it
+        self.session = CaptureSession(self.capture_manager, PacketStore(retention=self.retention),
+                                      self.data_processor)
+        # Stage timings and counters, shown in the Diagnostics tab and
+        # served as Prometheus text on localhost
+        self.metrics = self.session.metrics
+        self.stage_timer = self.session.stage_timer
+        self.metrics_server = MetricsServer(self.metrics, port=DEFAULT_METRICS_PORT)
+        try:
+            self.metrics_server.start()
+            self.metrics_endpoint = self.metrics_server.url
+        except OSError as e:
+            self.metrics_endpoint = f"unavailable ({e})"
+        self.last_diagnostics_update = 0
+        # Active display filter and the view of the store it selects
+        self.display_filter = None
+        self.view = None
+        # Filtered rows folded into the view's statistics per main loop tick,
+        # so applying a filter to a large capture doesn't freeze the window
+        self.view_fold_rows = 25000
         self.capture_active = False
         self.is_real_capture = False
         self.last_ui_update = 0
+        self.ui_dirty = False
+        # Background file import/export and the status it last reported
+        self.file_task = None
+        self.file_cancel = threading.Event()
+        self.background_status = None
+        # Imported batches are decoded on the file task's thread and added to
+        # the store by the main loop, like captured packets
+        self.imported = PacketQueue(maxsize=4, policy=BLOCK)
         self.ui_update_interval = 1.0
         self.last_graph_update = 0
-        self.graph_update_interval = 10.0
+        # Charts render on a worker thread, so refreshing them doesn't stall the UI
+        self.graph_update_interval = 2.0
+        # The traffic chart is blitted, so it can refresh much more often
+        self.last_traffic_update = 0
+        self.traffic_update_interval = 0.25
+        self.traffic_dirty = False
+        # Captured packets are drained from the capture queue in batches
+        self.drain_interval_ms = 100
         
         # Create GUI
         self.setup_ui()
         self.bind_events()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(self.drain_interval_ms, self.drain_packet_queue)
+        
+        # Load scapy in the background; the window doesn't wait for it
+        probe_scapy(self.on_scapy_probe)
+        
+    def on_scapy_probe(self, available):
+        """Report a missing scapy - called from the probe thread"""
+        if not available:
+            self.background_status = ("Status: Scapy not available - using simulation mode", "#ffaa00")
         
-        # Display scapy status
-        if not self.capture_manager.SCAPY_AVAILABLE:
-            self.ui_builder.status_label.config(
-                text="Status: Scapy not available - using simulation mode", 
-                foreground="#ffaa00"
-            )
+    @property
+    def packets(self):
+        return self.session.store
+        
+    @packets.setter
+    def packets(self, store):
+        self.session.store = store
+        
+    def report_error(self, message):
+        """Show an error from a capture thread on the next drain tick"""
+        self.background_status = (message, "red")
         
     def setup_ui(self):
         """Set up the user interface"""
@@ -63,11 +123,20 @@ class PacketCaptureApp:
         """Bind UI events to handlers"""
         self.ui_builder.capture_button.config(command=self.toggle_capture)
         self.ui_builder.packet_tree.bind('<<TreeviewSelect>>', self.on_packet_select)
+        self.ui_builder.filter_entry.bind('<KeyRelease>', self.validate_capture_filter)
+        self.ui_builder.display_filter_entry.bind('<Return>', self.apply_display_filter)
         
         # Bind menu buttons
         self.ui_builder.bind_button("load_sample", self.load_sample_data)
         self.ui_builder.bind_button("clear_data", self.clear_data)
         self.ui_builder.bind_button("export_report", self.export_report)
+        self.ui_builder.bind_button("open_capture", self.open_capture)
+        self.ui_builder.bind_button("save_capture", self.save_capture)
+        self.ui_builder.bind_button("open_session", self.open_session)
+        self.ui_builder.bind_button("save_session", self.save_session)
+        self.ui_builder.bind_button("cancel_file_task", self.cancel_file_task)
+        self.ui_builder.bind_button("apply_display_filter", self.apply_display_filter)
+        self.ui_builder.bind_button("clear_display_filter", self.clear_display_filter)
         
     def toggle_capture(self):
         """Toggle between start and stop capture"""
@@ -76,90 +145,341 @@ class PacketCaptureApp:
         else:
             self.stop_capture()
             
+    def validate_capture_filter(self, event=None):
+        try:
+            compile_filter(self.ui_builder.filter_entry.get())
+            self.ui_builder.show_filter_valid(True)
+        except FilterError:
+            self.ui_builder.show_filter_valid(False)
+            
+    def apply_display_filter(self, event=None):
+        """Compile the display filter and show only the packets it matches"""
+        expression = self.ui_builder.display_filter_entry.get().strip()
+        if not expression:
+            self.clear_display_filter()
+            return
+        try:
+            self.display_filter = DisplayFilter(expression)
+        except DisplayFilterError as e:
+            self.ui_builder.show_display_filter_valid(False)
+            self.ui_builder.status_label.config(text=f"Error: Display filter: {str(e)}", foreground="red")
+            return
+        self.ui_builder.show_display_filter_valid(True)
+        self.view = FilteredView(self.packets, self.display_filter)
+        self.refresh_display()
+        
+    def clear_display_filter(self):
+        self.display_filter = None
+        self.view = None
+        self.ui_builder.display_filter_entry.delete(0, tk.END)
+        self.ui_builder.show_display_filter_valid(True)
+        self.refresh_display()
+        
+    def refresh_display(self):
+        """Redraw the packet list, statistics and charts for a new view"""
+        self.ui_builder.packet_list.reset()
+        self.ui_builder.details_text.delete(1.0, tk.END)
+        self.last_graph_update = 0
+        self.update_ui()
+        
+    def current_view(self):
+        """The packets to display: the filtered view if a filter is active"""
+        if self.view is None:
+            return self.packets
+        self.view.refresh()
+        return self.view
+        
     def start_capture(self):
+        if self.file_task_running():
+            return
+        expression = self.ui_builder.filter_entry.get().strip()
+        try:
+            self.capture_manager.capture_filter = compile_filter(expression) if expression else None
+        except FilterError as e:
+            messagebox.showerror("Invalid Filter", f"Capture filter error: {str(e)}")
+            return
+            
         self.capture_active = True
         self.is_real_capture = True
         self.ui_builder.capture_button.config(text="■ Stop Capture", style="Accent.TButton")
         self.ui_builder.status_label.config(
-            text="Status: Capturing real packets..." if self.capture_manager.SCAPY_AVAILABLE 
+            text="Status: Capturing real packets..." if self.capture_manager.select_backend() != BACKEND_SIMULATE
             else "Status: Capturing simulated packets...", 
             foreground="#00ff88"
         )
         
-        self.capture_manager.start_capture()
+        self.session.start()
         
     def stop_capture(self):
         if self.capture_active:
             self.capture_active = False
             self.ui_builder.capture_button.config(text="▶ Start Capture", style="TButton")
+            self.session.stop()
             self.ui_builder.status_label.config(text="Status: Capture stopped", foreground="#00aaff")
             
     def load_sample_data(self):
-        self.packets = self.capture_manager.load_sample_data()
+        if self.file_task_running():
+            return
+        self.packets.clear()
+        self.packets.append_columns(self.capture_manager.load_sample_data())
+        self.data_processor.rebuild(self.packets)
+        if self.display_filter is not None:
+            self.view = FilteredView(self.packets, self.display_filter)
+        self.ui_builder.packet_list.reset()
+        self.visualizations.reset_traffic()
         self.is_real_capture = False
         self.safe_update_ui()
         self.ui_builder.status_label.config(text="Status: Sample data loaded", foreground="#00ff88")
         
+    def on_close(self):
+        """Stop capturing and remove spilled segment files before exiting"""
+        self.capture_active = False
+        self.session.close()
+        self.file_cancel.set()
+        self.imported.close()
+        self.ui_builder.chart_renderer.close()
+        self.metrics_server.close()
+        self.packets.close()
+        self.root.destroy()
+        
     def clear_data(self):
-        self.packets = []
-        self.ui_builder.packet_tree.delete(*self.ui_builder.packet_tree.get_children())
+        if self.file_task_running():
+            return
+        self.packets.clear()
+        self.data_processor.reset()
+        if self.display_filter is not None:
+            self.view = FilteredView(self.packets, self.display_filter)
+        self.ui_builder.packet_list.reset()
+        self.visualizations.reset_traffic()
         self.ui_builder.details_text.delete(1.0, tk.END)
         self.safe_update_ui()
         self.is_real_capture = False
         self.ui_builder.status_label.config(text="Status: Data cleared", foreground="#00aaff")
         
     def export_report(self):
+        """Export the packets as a report, CSV, JSON Lines or NumPy archive in the background"""
         if not self.packets:
             messagebox.showwarning("No Data", "No packets to export")
             return
+        if self.file_task_running():
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Report",
+            defaultextension=".txt",
+            initialfile=f"packet_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            filetypes=[("Text report", "*.txt"), ("CSV", "*.csv"), ("JSON Lines", "*.jsonl"),
+                       ("Compressed columns (NumPy)", "*.npz")])
+        if not path:
+            return
+        # Statistics are summarised now, on the main thread; the rows are
+        # formatted and written by the worker
+        count = len(self.packets)
+        stats = self.data_processor.calculate_statistics(self.is_real_capture)
+        title = "Real Packet Capture" if self.is_real_capture else "Sample Data"
+        self.start_file_task(self.write_export, path, count, title, stats)
+        
+    def write_export(self, path, count, title, stats):
+        """Export the first ``count`` packets to ``path`` - runs on a worker thread"""
+        name = os.path.basename(path)
+        
+        def progress(done, total):
+            self.background_status = (f"Status: Exporting {name}... {done * 100 // max(total, 1)}%", "#00aaff")
             
-        filename = f"packet_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         try:
-            with open(filename, 'w') as f:
-                capture_type = "Real Packet Capture" if self.is_real_capture else "Sample Data"
-                f.write(f"Packet Capture Report - {capture_type}\n")
-                f.write("====================\n\n")
-                f.write(f"Generated: {datetime.now()}\n")
-                f.write(f"Total packets: {len(self.packets)}\n\n")
-                
-                # Add statistics
-                stats = self.data_processor.calculate_statistics(self.packets, self.is_real_capture)
-                for key, value in stats.items():
-                    if isinstance(value, dict):
-                        f.write(f"{key}:\n")
-                        for k, v in value.items():
-                            f.write(f"  {k}: {v}\n")
-                    else:
-                        f.write(f"{key}: {value}\n")
-                        
-                # Add packet list
-                f.write("\n\nPacket List:\n")
-                f.write("No.\tTime\tSource\tDestination\tProtocol\tLength\tInfo\n")
-                for i, packet in enumerate(self.packets, 1):
-                    time_str = datetime.fromtimestamp(packet['timestamp']).strftime('%H:%M:%S.%f')[:-3]
-                    src = packet.get('src_ip', 'N/A')
-                    dst = packet.get('dst_ip', 'N/A')
-                    protocol = packet.get('protocol', 'Unknown')
-                    length = packet.get('size', 0)
-                    info = self.data_processor.get_packet_info(packet)
-                    
-                    f.write(f"{i}\t{time_str}\t{src}\t{dst}\t{protocol}\t{length}\t{info}\n")
-                        
-            self.ui_builder.status_label.config(text=f"Status: Report exported to {filename}", foreground="#00ff88")
-            messagebox.showinfo("Export Successful", f"Report exported to {filename}")
+            with open_export(path, export_format(path), title, stats, count) as writer:
+                written = writer.write_store(self.packets, 0, count, progress, self.file_cancel.is_set)
+            if self.file_cancel.is_set():
+                os.remove(path)
+                self.background_status = (f"Status: Export of {name} cancelled", "#ffaa00")
+            else:
+                self.background_status = (f"Status: Exported {written} packets to {name}", "#00ff88")
         except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export report: {str(e)}")
+            self.background_status = (f"Error: Failed to export {name}: {str(e)}", "red")
             
-    def on_packet_select(self, event):
-        selection = self.ui_builder.packet_tree.selection()
-        if not selection:
+    def start_file_task(self, target, *args):
+        """Run a file import/export on a worker thread that ``cancel_file_task`` can stop"""
+        self.file_cancel.clear()
+        self.file_task = threading.Thread(target=target, args=args, daemon=True)
+        self.file_task.start()
+        self.ui_builder.set_file_task_active(True)
+        
+    def cancel_file_task(self):
+        if self.file_task is not None and self.file_task.is_alive():
+            self.file_cancel.set()
+            self.ui_builder.status_label.config(text="Status: Cancelling...", foreground="#ffaa00")
+            
+    def file_task_running(self):
+        if self.file_task is not None and self.file_task.is_alive():
+            messagebox.showwarning("Busy", "A capture file is still being read or written")
+            return True
+        return False
+        
+    def open_capture(self):
+        """Import a PCAP/PCAPNG file in the background"""
+        if self.capture_active or self.file_task_running():
+            return
+        path = filedialog.askopenfilename(
+            title="Open Capture",
+            filetypes=[("Capture files", "*.pcap *.pcapng *.cap"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            reader = CaptureFileReader(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Open Error", f"Failed to open capture: {str(e)}")
             return
             
-        item = selection[0]
-        index = self.ui_builder.packet_tree.index(item)
+        self.clear_data()
+        # Drop any batches a cancelled import left behind
+        self.imported.drain()
+        self.is_real_capture = True
+        self.start_file_task(self.import_capture, reader)
         
-        if 0 <= index < len(self.packets):
-            packet = self.packets[index]
+    def import_capture(self, reader):
+        """Decode a capture file into store columns - runs on a worker thread.
+
+        The batches go through ``self.imported`` to ``drain_imported`` on the
+        main thread; the task stays running until they have all been added.
+        """
+        name = os.path.basename(reader.path)
+        try:
+            total = 0
+            with reader:
+                for batch in reader.column_batches():
+                    if self.file_cancel.is_set() or not self.imported.put(batch):
+                        break
+                    total += len(batch[0]['timestamp'])
+                    percent = reader.position * 100 // max(reader.size, 1)
+                    self.background_status = (f"Status: Importing {name}... {percent}%", "#00aaff")
+            while self.imported.depth and not self.file_cancel.is_set():
+                time.sleep(0.05)
+            if self.file_cancel.is_set():
+                self.background_status = (f"Status: Import of {name} cancelled after {len(self.packets)} packets", "#ffaa00")
+            else:
+                self.background_status = (f"Status: Imported {total} packets from {name}", "#00ff88")
+        except Exception as e:
+            self.background_status = (f"Error: Failed to import {name}: {str(e)}", "red")
+            
+    def drain_imported(self):
+        """Add the next decoded import batch to the store - runs on the main thread"""
+        for columns, interned in self.imported.drain(1):
+            # Batches decoded before a cancel are dropped with the rest of the import
+            if self.file_cancel.is_set():
+                continue
+            self.packets.intern_rows(columns, interned)
+            self.session.add_columns(columns)
+            self.ui_dirty = True
+            self.traffic_dirty = True
+            
+    def save_capture(self):
+        """Write the captured packets to a PCAP/PCAPNG file in the background"""
+        if not self.packets:
+            messagebox.showwarning("No Data", "No packets to save")
+            return
+        if self.file_task_running():
+            return
+        path = filedialog.asksaveasfilename(
+            title="Save Capture",
+            defaultextension=".pcapng",
+            initialfile=f"capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pcapng",
+            filetypes=[("PCAPNG", "*.pcapng"), ("PCAP", "*.pcap")])
+        if not path:
+            return
+        self.start_file_task(self.write_capture, path, len(self.packets))
+        
+    def write_capture(self, path, count):
+        """Write the first ``count`` packets to ``path`` - runs on a worker thread"""
+        name = os.path.basename(path)
+        
+        def progress(done, total):
+            self.background_status = (f"Status: Saving {name}... {done * 100 // max(total, 1)}%", "#00aaff")
+            
+        try:
+            with CaptureFileWriter(path) as writer:
+                written = writer.write_store(self.packets, 0, count, progress, self.file_cancel.is_set)
+            if self.file_cancel.is_set():
+                os.remove(path)
+                self.background_status = (f"Status: Save of {name} cancelled", "#ffaa00")
+            else:
+                self.background_status = (f"Status: Saved {written} packets to {name}", "#00ff88")
+        except Exception as e:
+            self.background_status = (f"Error: Failed to save {name}: {str(e)}", "red")
+            
+    def open_session(self):
+        """Open a saved session; statistics are rebuilt in the background"""
+        if self.capture_active or self.file_task_running():
+            return
+        path = filedialog.askdirectory(title="Open Session", mustexist=True)
+        if not path:
+            return
+        try:
+            store = PacketStore.open_session(path, self.retention)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Open Error", f"Failed to open session: {str(e)}")
+            return
+        # Packets are only read from the segments as they are shown or counted
+        self.packets.close()
+        self.packets = store
+        self.data_processor.reset()
+        if self.display_filter is not None:
+            self.view = FilteredView(self.packets, self.display_filter)
+        self.ui_builder.packet_list.reset()
+        self.visualizations.reset_traffic()
+        self.is_real_capture = True
+        self.ui_dirty = True
+        self.traffic_dirty = True
+        self.start_file_task(self.index_session, os.path.basename(path))
+        
+    def index_session(self, name):
+        """Feed an opened session to the statistics - runs on a worker thread"""
+        total = len(self.packets)
+        step = self.packets.chunk_size
+        for start in range(0, total, step):
+            if self.file_cancel.is_set():
+                self.background_status = (f"Status: Statistics for {name} cancelled at {start} packets", "#ffaa00")
+                return
+            self.data_processor.track_packets(self.packets, start, min(start + step, total))
+            self.ui_dirty = True
+            self.traffic_dirty = True
+            self.background_status = (f"Status: Opening {name}... {start * 100 // max(total, 1)}%", "#00aaff")
+        self.background_status = (f"Status: Opened {total} packets from {name}", "#00ff88")
+        
+    def save_session(self):
+        """Save the packets as a session directory in the background"""
+        if not self.packets:
+            messagebox.showwarning("No Data", "No packets to save")
+            return
+        if self.file_task_running():
+            return
+        path = filedialog.askdirectory(title="Save Session")
+        if not path:
+            return
+        self.start_file_task(self.write_session, path)
+        
+    def write_session(self, path):
+        """Write the store's segments and manifest to ``path`` - runs on a worker thread"""
+        name = os.path.basename(path)
+        
+        def progress(done, total):
+            self.background_status = (f"Status: Saving session {name}... {done * 100 // max(total, 1)}%", "#00aaff")
+            
+        try:
+            saved = self.packets.save_session(path, progress, self.file_cancel.is_set)
+            if self.file_cancel.is_set():
+                self.background_status = (f"Status: Saving session {name} cancelled", "#ffaa00")
+            else:
+                self.background_status = (f"Status: Saved session of {saved} packets to {name}", "#00ff88")
+        except Exception as e:
+            self.background_status = (f"Error: Failed to save session {name}: {str(e)}", "red")
+            
+    def on_packet_select(self, event):
+        index = self.ui_builder.packet_list.selection_index()
+        if index is None:
+            return
+            
+        packets = self.packets if self.view is None else self.view
+        if 0 <= index < len(packets):
+            packet = packets[index]
             self.ui_builder.show_packet_details(packet, self.is_real_capture)
             
     def safe_update_ui(self):
@@ -168,28 +488,91 @@ class PacketCaptureApp:
         
     def update_ui(self):
         """Update UI elements - must be called from main thread"""
+        timer = self.stage_timer
         try:
-            # Update packet list
-            self.ui_builder.update_packet_list(self.packets, self.data_processor)
-            
-            # Update statistics
-            self.ui_builder.update_statistics(self.packets, self.data_processor, self.is_real_capture)
-            
-            # Update visualizations only every 10 seconds
-            current_time = time.time()
-            if current_time - self.last_graph_update >= self.graph_update_interval:
-                self.ui_builder.update_protocol_chart(self.packets, self.visualizations)
-                self.ui_builder.update_traffic_chart(self.packets, self.visualizations)
-                self.last_graph_update = current_time
+            with timer.time("ui_tick"):
+                self.packets.enforce_retention()
+                packets = self.current_view()
+                self.ui_builder.update_display_count(len(packets), len(self.packets), self.view is not None)
+                
+                # Update packet list
+                with timer.time("packet_list"):
+                    self.ui_builder.update_packet_list(packets, self.data_processor)
+                
+                # Update statistics
+                with timer.time("statistics_panel"):
+                    self.ui_builder.update_statistics(packets, self.data_processor, self.is_real_capture)
+                
+                # Update the protocol chart every graph_update_interval seconds
+                current_time = time.time()
+                if current_time - self.last_graph_update >= self.graph_update_interval:
+                    with timer.time("chart_snapshots"):
+                        statistics = self.data_processor.statistics if self.view is None else self.view.statistics
+                        self.ui_builder.update_protocol_chart(statistics, self.visualizations)
+                        self.ui_builder.update_distribution_chart(self.data_processor.statistics)
+                    self.last_graph_update = current_time
+                self.update_traffic_chart(packets)
+                self.update_conversations()
+                with timer.time("alerts"):
+                    self.ui_builder.update_alerts(self.data_processor.anomalies)
         except Exception as e:
-            print(f"Error updating UI: {e}")
+            self.metrics.record_error("update_ui", e)
+            
+    def update_conversations(self):
+        """Refresh the conversations table if its tab is showing"""
+        if self.ui_builder.conversations_visible():
+            with self.stage_timer.time("conversations"):
+                self.ui_builder.update_conversations(self.data_processor.flows, self.packets)
+                
+    def update_diagnostics(self):
+        """Refresh the diagnostics panel if its tab is showing"""
+        if self.ui_builder.diagnostics_visible():
+            self.ui_builder.update_diagnostics(self.metrics, self.metrics_endpoint)
+            self.last_diagnostics_update = time.time()
             
-    def add_packet(self, packet):
-        """Add a packet to the storage and update UI if needed"""
-        self.packets.append(packet)
+    def request_chart_redraw(self):
+        """Re-render both charts on the next tick, e.g. after a resize"""
+        self.last_graph_update = 0
+        self.ui_dirty = True
         
-        # Update UI at most once per second
+    def update_traffic_chart(self, packets):
+        with self.stage_timer.time("traffic_chart"):
+            self.ui_builder.update_traffic_chart(packets, self.visualizations,
+                                                 self.data_processor.anomalies.intervals())
+        self.last_traffic_update = time.time()
+        self.traffic_dirty = False
+        
+    def drain_packet_queue(self):
+        """Move queued packets into storage in one batch - runs on the main thread"""
+        if self.session.drain():
+            self.ui_dirty = True
+            self.traffic_dirty = True
+        self.drain_imported()
+        if self.view is not None and self.view.fold_statistics(self.view_fold_rows):
+            self.ui_dirty = True
+        self.ui_builder.update_queue_status(self.capture_manager.queue.stats())
+        self.ui_builder.update_filter_status(self.capture_manager.filter_status())
+        self.ui_builder.update_pipeline_status(self.capture_manager.pipeline_status())
+        
+        self.ui_builder.show_rendered_charts()
+        
+        if self.background_status is not None:
+            text, color = self.background_status
+            self.background_status = None
+            self.ui_builder.status_label.config(text=text, foreground=color)
+        self.ui_builder.set_file_task_active(self.file_task is not None and self.file_task.is_alive())
+            
         current_time = time.time()
-        if current_time - self.last_ui_update >= self.ui_update_interval:
-            self.safe_update_ui()
-            self.last_ui_update = current_time
\ No newline at end of file
+        if self.traffic_dirty and current_time - self.last_traffic_update >= self.traffic_update_interval:
+            self.update_traffic_chart(self.current_view())
+            
+        # Update UI at most once per second
+        if self.ui_dirty and current_time - self.last_ui_update >= self.ui_update_interval:
+            self.update_ui()
+            self.last_ui_update = current_time
+            self.ui_dirty = False
+        if current_time - self.last_diagnostics_update >= 1:
+            self.update_diagnostics()
+            
+        self.root.after(self.drain_interval_ms, self.drain_packet_queue)
+            
@@ -0,0 +1,125 @@
+# benchmarks/import_time.py
+# Cold-start latency: how long a fresh interpreter takes to import the app
+# and the headless daemon, which heavy modules those imports drag in, and
+# (with a display) how long until the Tk window has drawn once. Every run
+# is a new process so nothing is already imported or cached in memory.
+#
+#   python benchmarks/import_time.py --runs 5 --window
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay off the startup path
+HEAVY_MODULES = ("matplotlib", "matplotlib.pyplot", "scapy", "scapy.all")
+TARGETS = ("app", "daemon")
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_WINDOW_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import tkinter as tk
+from app import PacketCaptureApp
+try:
+    root = tk.Tk()
+except tk.TclError as e:
+    print(json.dumps({"error": str(e)}))
+    raise SystemExit
+app = PacketCaptureApp(root)
+root.update()
+elapsed = time.perf_counter() - started
+app.on_close()
+print(json.dumps({"seconds": elapsed}))
+"""
+
+
+def run_python(code, *flags):
+    """Run ``code`` in a fresh interpreter from the repository root"""
+    result = subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    lines = result.stdout.strip().splitlines()
+    return lines[-1] if lines else "", result.stderr
+
+
+def slowest_imports(stderr, count):
+    """The modules with the largest self time in ``-X importtime`` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(self_us), int(cumulative_us), name))
+    rows.sort(reverse=True)
+    return [{"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for self_us, cumulative_us, name in rows[:count]]
+
+
+def measure_import(target, runs, top):
+    times = []
+    for _ in range(runs):
+        output, _ = run_python(_IMPORT_SCRIPT.format(target=target, heavy=HEAVY_MODULES))
+        result = json.loads(output)
+        times.append(result["seconds"])
+    _, stderr = run_python(f"import {target}", "-X", "importtime")
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "heavy_modules": result["heavy"],
+        "slowest": slowest_imports(stderr, top),
+    }
+
+
+def measure_window(runs):
+    times = []
+    for _ in range(runs):
+        output, _ = run_python(_WINDOW_SCRIPT)
+        result = json.loads(output)
+        if "error" in result:
+            return {"skipped": result["error"]}
+        times.append(result["seconds"])
+    return {"median_s": statistics.median(times), "min_s": min(times), "max_s": max(times)}
+
+
+def run(runs=5, top=10, window=False):
+    results = {"python": sys.version.split()[0], "runs": runs,
+               "imports": {target: measure_import(target, runs, top) for target in TARGETS}}
+    if window:
+        results["window"] = measure_window(runs)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure SniffViz cold-start latency")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--window", action="store_true", help="also time the Tk window's first draw")
+    parser.add_argument("--output", help="write the JSON results here as well as to stdout")
+    args = parser.parse_args(argv)
+    results = run(args.runs, args.top, args.window)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    heavy = {target: result["heavy_modules"] for target, result in results["imports"].items()
+             if result["heavy_modules"]}
+    if heavy:
+        print(f"Heavy modules imported at startup: {heavy}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+# benchmarks/suite.py
+# End-to-end performance suite. Each capture size is replayed from a seeded
+# TrafficGenerator capture in its own interpreter, so peak memory is measured for
+# that size alone. Per size it records ingest throughput, per-tick update
+# latency (the analysis reductions, and the Tk update when a display - or
+# Xvfb - is available), chart render time, export throughput and peak RSS
+# per packet. Results are written as JSON and compared against a stored
+# baseline; a regression beyond the tolerance makes the run exit non-zero.
+# Baselines only mean something on the machine that recorded them, and
+# --repeat keeps each metric's best run to damp noise.
+#
+#   python benchmarks/suite.py --sizes 10000 100000 1000000 10000000 --xvfb
+#   python benchmarks/suite.py --save-baseline
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from components.traffic_generator import TrafficGenerator
+from utils.constants import FIELD_SRC_PORT, FIELD_TCP_FLAGS, FIELD_ICMP_TYPE
+from utils.helpers import int_to_ip
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+SEED = 1
+
+# Rows generated and ingested per batch, as the decode pipeline delivers them
+BATCH = 65536
+# Packets arriving between two UI ticks (about 10k packets/s at 10 ticks/s)
+TICK_BATCH = 1000
+CHART_SIZE = (900, 400)
+EXPORT_FORMATS = ("text", "csv", "jsonl", "npz")
+
+# Metric name suffixes where a larger value is better; all others are costs
+_HIGHER_IS_BETTER = ("_pps",)
+
+# Capture rate the synthetic packets are spread at
+RATE = 50_000.0
+
+
+# -- Synthetic capture ----------------------------------------------------
+
+def synthetic_columns(generator, count, start_time):
+    """``count`` encoded packets from ``start_time`` at RATE packets/s"""
+    return generator.sample(count, start_time, start_time + count / RATE)
+
+
+def packet_dicts(store, columns):
+    """The same packets as the dicts the scapy and simulated captures queue"""
+    packets = []
+    protocols = store.protocol_names
+    for i in range(len(columns['timestamp'])):
+        fields = int(columns['fields'][i])
+        packet = {
+            'timestamp': float(columns['timestamp'][i]),
+            'size': int(columns['size'][i]),
+            'protocol': protocols[columns['protocol'][i]],
+            'src_ip': int_to_ip(int(columns['src_ip'][i])),
+            'dst_ip': int_to_ip(int(columns['dst_ip'][i])),
+        }
+        if fields & FIELD_SRC_PORT:
+            packet['src_port'] = int(columns['src_port'][i])
+            packet['dst_port'] = int(columns['dst_port'][i])
+        if fields & FIELD_TCP_FLAGS:
+            packet['tcp_flags'] = int(columns['tcp_flags'][i])
+        if fields & FIELD_ICMP_TYPE:
+            packet['icmp_type'] = int(columns['icmp_type'][i])
+        packets.append(packet)
+    return packets
+
+
+# -- Measurements ---------------------------------------------------------
+
+def peak_rss():
+    """Peak resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def latency(samples):
+    """p50/p99 of a list of durations in seconds, as milliseconds"""
+    samples = np.asarray(samples) * 1000
+    return {"p50_ms": float(np.percentile(samples, 50)), "p99_ms": float(np.percentile(samples, 99))}
+
+
+def fill_session(session, size, generator, start_time):
+    """Ingest ``size`` synthetic packets in pipeline-sized batches.
+
+    Returns the seconds spent ingesting (generation excluded) and the
+    timestamp of the last packet.
+    """
+    elapsed = 0.0
+    done = 0
+    while done < size:
+        count = min(BATCH, size - done)
+        columns = synthetic_columns(generator, count, start_time)
+        start_time = float(columns['timestamp'][-1])
+        started = time.perf_counter()
+        session.add_columns(columns)
+        elapsed += time.perf_counter() - started
+        done += count
+    return elapsed, start_time
+
+
+def measure_ingest(size, generator, dict_limit):
+    """Column and dict ingest throughput, plus the store and peak memory they cost"""
+    from components.capture_session import CaptureSession
+
+    results = {}
+    session = CaptureSession()
+    rss_before = peak_rss()
+    elapsed, last_time = fill_session(session, size, generator, time.time() - size / RATE)
+    results["ingest_columns_pps"] = size / elapsed
+    results["rss_bytes_per_packet"] = (peak_rss() - rss_before) / size
+    results["store_bytes_per_packet"] = session.store.nbytes() / size
+
+    count = min(size, dict_limit)
+    scratch = CaptureSession()
+    packets = packet_dicts(scratch.store, synthetic_columns(generator, count, last_time))
+    started = time.perf_counter()
+    for i in range(0, count, 5000):
+        scratch.add_packets(packets[i:i + 5000])
+    results["ingest_dicts_pps"] = count / (time.perf_counter() - started)
+    del packets, scratch
+
+    started = time.perf_counter()
+    session.data_processor.rebuild(session.store)
+    results["rebuild_pps"] = size / (time.perf_counter() - started)
+    return session, last_time, results
+
+
+def measure_ticks(session, visualizations, generator, last_time, ticks):
+    """Per-tick cost of the reductions a UI tick runs over the whole capture"""
+    processor = session.data_processor
+    samples = []
+    for _ in range(ticks):
+        columns = synthetic_columns(generator, TICK_BATCH, last_time)
+        last_time = float(columns['timestamp'][-1])
+        session.add_columns(columns)
+        started = time.perf_counter()
+        processor.calculate_statistics(True)
+        visualizations.protocol_snapshot(processor.statistics)
+        visualizations.traffic_snapshot(session.store, processor.anomalies.intervals())
+        processor.statistics.distributions()
+        samples.append(time.perf_counter() - started)
+    results = {"tick_" + key: value for key, value in latency(samples).items()}
+    # The conversations table only refreshes while its tab is showing
+    samples = []
+    for _ in range(max(ticks // 10, 1)):
+        started = time.perf_counter()
+        processor.flows.top(50)
+        samples.append(time.perf_counter() - started)
+    results["conversations_ms"] = float(np.median(samples)) * 1000
+    results["flows"] = len(processor.flows)
+    return results, last_time
+
+
+def measure_charts(session, visualizations, renders):
+    """Median render time of each chart over ``renders`` draws, after a warm-up"""
+    from components.charts import create_charts
+
+    processor = session.data_processor
+    data = {
+        "protocol": visualizations.protocol_snapshot(processor.statistics),
+        "traffic": visualizations.traffic_snapshot(session.store, processor.anomalies.intervals()),
+        "distribution": processor.statistics.distributions(),
+    }
+    results = {}
+    for name, chart in create_charts(visualizations.max_bars).items():
+        started = time.perf_counter()
+        chart.render(data[name], CHART_SIZE)
+        results[f"render_{name}_first_ms"] = (time.perf_counter() - started) * 1000
+        samples = []
+        for _ in range(renders):
+            started = time.perf_counter()
+            chart.render(data[name], CHART_SIZE)
+            samples.append(time.perf_counter() - started)
+        results[f"render_{name}_ms"] = float(np.median(samples)) * 1000
+    return results
+
+
+def measure_exports(session, limit):
+    """Export throughput of each format over the first ``limit`` packets"""
+    from components.report_export import open_export
+
+    store = session.store
+    count = min(len(store), limit)
+    stats = session.data_processor.calculate_statistics(True)
+    results = {}
+    directory = tempfile.mkdtemp(prefix="sniffviz-bench-")
+    try:
+        for file_format in EXPORT_FORMATS:
+            path = os.path.join(directory, f"export.{file_format}")
+            started = time.perf_counter()
+            with open_export(path, file_format, "Benchmark", stats, count) as writer:
+                writer.write_store(store, 0, count)
+            elapsed = time.perf_counter() - started
+            results[f"export_{file_format}_pps"] = count / elapsed
+            results[f"export_{file_format}_bytes_per_packet"] = os.path.getsize(path) / count
+            os.remove(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def measure_tk(size, generator, ticks):
+    """Tick latency of the real app over ``size`` packets, or why it was skipped"""
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"skipped": str(e)}
+    from app import PacketCaptureApp
+
+    app = PacketCaptureApp(root)
+    root.update()
+    try:
+        _, last_time = fill_session(app.session, size, generator, time.time() - size / RATE)
+        app.is_real_capture = True
+        app.update_ui()
+        root.update()
+        ui, packet_list, traffic = [], [], []
+        for _ in range(ticks):
+            columns = synthetic_columns(generator, TICK_BATCH, last_time)
+            last_time = float(columns['timestamp'][-1])
+            app.session.add_columns(columns)
+            started = time.perf_counter()
+            app.update_ui()
+            root.update_idletasks()
+            ui.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            app.ui_builder.update_packet_list(app.current_view(), app.data_processor)
+            root.update_idletasks()
+            packet_list.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            app.update_traffic_chart(app.current_view())
+            traffic.append(time.perf_counter() - started)
+            root.update()
+    finally:
+        app.on_close()
+    results = {}
+    for prefix, samples in (("ui_tick", ui), ("packet_list", packet_list), ("traffic_chart", traffic)):
+        results.update({f"{prefix}_{key}": value for key, value in latency(samples).items()})
+    return results
+
+
+def run_size(size, ticks=50, renders=5, dict_limit=100_000, export_limit=1_000_000, tk_ui=True):
+    """Every measurement for one capture size; meant to run in a fresh interpreter"""
+    from components.visualizations import Visualizations
+
+    generator = TrafficGenerator(seed=SEED, diurnal=0)
+    session, last_time, results = measure_ingest(size, generator, dict_limit)
+    visualizations = Visualizations()
+    started = time.perf_counter()
+    session.data_processor.calculate_statistics(True)
+    results["statistics_ms"] = (time.perf_counter() - started) * 1000
+    tick_results, last_time = measure_ticks(session, visualizations, generator, last_time, ticks)
+    results.update(tick_results)
+    results.update(measure_charts(session, visualizations, renders))
+    results.update(measure_exports(session, export_limit))
+    session.store.close()
+    del session
+    if tk_ui:
+        results["tk"] = measure_tk(size, TrafficGenerator(seed=SEED, diurnal=0), ticks)
+    results["peak_rss_bytes"] = peak_rss()
+    return results
+
+
+# -- Driver ---------------------------------------------------------------
+
+def start_xvfb():
+    """Start a virtual X display if there is none; returns (process, display)"""
+    if os.environ.get("DISPLAY") or shutil.which("Xvfb") is None:
+        return None, os.environ.get("DISPLAY")
+    display = f":{100 + os.getpid() % 400}"
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1600x1000x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    return process, display
+
+
+def run_worker(size, args, display):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", str(size),
+               "--ticks", str(args.ticks), "--renders", str(args.renders),
+               "--dict-limit", str(args.dict_limit), "--export-limit", str(args.export_limit)]
+    if args.no_tk:
+        command.append("--no-tk")
+    env = dict(os.environ)
+    if display:
+        env["DISPLAY"] = display
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def best_of(runs):
+    """Merge repeated results, keeping each metric's best value"""
+    best = runs[0]
+    for result in runs[1:]:
+        for name, value in result.items():
+            old = best.get(name)
+            if isinstance(value, dict) and isinstance(old, dict):
+                best[name] = best_of([old, value])
+            elif isinstance(value, (int, float)) and isinstance(old, (int, float)):
+                best[name] = min(old, value) if _lower_is_better(name) else max(old, value)
+    return best
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run(args):
+    xvfb, display = (None, os.environ.get("DISPLAY"))
+    if args.xvfb and not args.no_tk:
+        xvfb, display = start_xvfb()
+    try:
+        sizes = {}
+        for size in args.sizes:
+            print(f"Running {size:,} packets...", file=sys.stderr)
+            runs = [run_worker(size, args, display) for _ in range(args.repeat)]
+            failed = [result for result in runs if "error" in result]
+            sizes[str(size)] = failed[0] if failed else best_of(runs)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    results = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": SEED,
+        "repeat": args.repeat,
+        "sizes": sizes,
+    }
+    if args.startup:
+        from import_time import run as run_import_time
+        results["startup"] = run_import_time(runs=3, top=5)
+    return results
+
+
+def _lower_is_better(metric):
+    return not metric.endswith(_HIGHER_IS_BETTER)
+
+
+def _numeric_metrics(results, prefix=""):
+    for name, value in results.items():
+        if isinstance(value, dict):
+            yield from _numeric_metrics(value, f"{prefix}{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + name, value
+
+
+def compare(results, baseline, tolerance):
+    """Metrics that got worse than the baseline by more than ``tolerance``.
+
+    Returns a list of (size, metric, baseline value, new value, change),
+    where change is the fractional slowdown whichever way the metric runs.
+    """
+    regressions = []
+    for size, measured in results["sizes"].items():
+        reference = dict(_numeric_metrics(baseline.get("sizes", {}).get(size, {})))
+        for metric, value in _numeric_metrics(measured):
+            old = reference.get(metric)
+            if not old:
+                continue
+            if _lower_is_better(metric):
+                change = value / old - 1
+            else:
+                change = old / value - 1 if value else float("inf")
+            if change > tolerance:
+                regressions.append((size, metric, old, value, change))
+    return regressions
+
+
+def summary_lines(results):
+    lines = []
+    for size, measured in results["sizes"].items():
+        lines.append(f"{int(size):,} packets")
+        if "error" in measured:
+            lines.append(f"  error: {measured['error']}")
+            continue
+        for metric, value in _numeric_metrics(measured):
+            lines.append(f"  {metric:<36} {value:>16,.3f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the SniffViz performance suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="capture sizes to replay, in packets")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="runs per size; the best value of each metric is kept")
+    parser.add_argument("--ticks", type=int, default=50, help="UI ticks timed per size")
+    parser.add_argument("--renders", type=int, default=5, help="renders timed per chart")
+    parser.add_argument("--dict-limit", type=int, default=100_000,
+                        help="packets ingested through the dict path")
+    parser.add_argument("--export-limit", type=int, default=1_000_000,
+                        help="packets exported per format")
+    parser.add_argument("--no-tk", action="store_true", help="skip the Tk tick measurements")
+    parser.add_argument("--xvfb", action="store_true", help="start Xvfb when there is no display")
+    parser.add_argument("--startup", action="store_true", help="include the cold-start import times")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="fractional slowdown reported as a regression")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        results = run_size(args.worker, args.ticks, args.renders, args.dict_limit,
+                           args.export_limit, not args.no_tk)
+        print(json.dumps(results))
+        return 0
+
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    print("\n".join(summary_lines(results)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for size, metric, old, new, change in regressions:
+        print(f"REGRESSION {int(size):,} packets {metric}: {old:,.3f} -> {new:,.3f} ({change:+.0%})")
+    if any("error" in measured for measured in results["sizes"].values()):
+        return 1
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# components/anomaly_detector.py
+# Online anomaly detection over per-interval packet and byte rates. Every
+# series (all traffic, then one per protocol code) keeps a bounded history
+# of recent normal intervals; each closed interval is scored on a log scale
+# against the history's median and tail quantiles with a z-score for
+# sudden spikes or drops, and all traffic also with a two-sided CUSUM for
+# smaller sustained shifts. All series are scored together as NumPy
+# arrays, so closing an interval costs the same however busy it was.
+import threading
+from collections import deque
+from statistics import NormalDist
+
+import numpy as np
+
+# Columns a detector update reads
+RATE_COLUMNS = ('timestamp', 'size', 'protocol')
+
+METRICS = ('packets', 'bytes')
+
+ALERT_SPIKE = "spike"
+ALERT_DROP = "drop"
+ALERT_RISE = "sustained rise"
+ALERT_FALL = "sustained fall"
+
+# Per-series state arrays, grown together when a new protocol code shows up
+_STATE = ('_pending', '_history', '_learned', '_cusum_up', '_cusum_down', '_climb_up',
+          '_climb_down', '_run', '_seen', '_started')
+# Unfilled history slots are NaN, which sorts after every value
+_STATE_FILL = {'_history': np.nan}
+
+
+class RateAnomalyDetector:
+    """Quantile baselines with z-score and CUSUM alerts on traffic rates.
+
+    Packets are counted into ``interval``-second buckets of capture time.
+    When a bucket closes, each series' packet and byte totals are compared,
+    as ``log(1 + rate)``, with the last ``history`` normal intervals: the
+    deviation from their median is scored against the spread implied by
+    their ``tail`` and ``1 - tail`` quantiles, read as normal quantiles.
+    Flow sizes are heavy-tailed, so a protocol carried by a few flows is
+    far burstier than its standard deviation suggests; the log scale and
+    quantile spread follow those bursts. ``|z| > z_threshold`` raises a
+    spike or drop. For all traffic, a CUSUM with slack ``cusum_slack``
+    passing ``cusum_threshold`` also raises a sustained rise or fall.
+
+    A protocol series only alerts when its packet rate is off by at least
+    ``min_share`` of the all-traffic rate, and any series needs ``warmup``
+    intervals of history first; a series alerts again only after returning
+    to normal. Spikes are kept out of the history; a change that lasts
+    ``warmup`` intervals, or trips the CUSUM, moves the history to the new
+    level. The spread never falls below what Poisson arrivals at the
+    baseline rate would give, so sparse series do not alert on every
+    packet. Memory is constant: ``history`` values per series and metric
+    plus bounded logs of the last ``max_alerts`` alerts and
+    ``max_intervals`` anomalous spans.
+    """
+
+    def __init__(self, interval=1.0, z_threshold=5.0, cusum_slack=0.5, cusum_threshold=8.0,
+                 warmup=30, history=300, tail=0.01, min_share=0.1, max_gap=600,
+                 max_alerts=1000, max_intervals=1000):
+        if not 0 < tail < 0.5:
+            raise ValueError(f"tail must be between 0 and 0.5, got {tail}")
+        self.interval = interval
+        self.history = history
+        self.tail = tail
+        self.min_share = min_share
+        # Standard deviations between the median and a ``tail`` quantile of
+        # a normal distribution
+        self._tail_z = NormalDist().inv_cdf(1 - tail)
+        self.z_threshold = z_threshold
+        self.cusum_slack = cusum_slack
+        self.cusum_threshold = cusum_threshold
+        self.warmup = warmup
+        self.max_gap = max_gap
+        self.max_alerts = max_alerts
+        self.max_intervals = max_intervals
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._current = None
+        self._names = ()
+        self._pending = np.zeros((1, 2))
+        # Ring of the last ``history`` normal values per series and metric;
+        # ``_learned`` counts the values written to it
+        self._history = np.full((1, self.history, 2), np.nan)
+        self._learned = np.zeros((1, 2), dtype=np.int64)
+        self._cusum_up = np.zeros((1, 2))
+        self._cusum_down = np.zeros((1, 2))
+        # Intervals since each CUSUM was last zero
+        self._climb_up = np.zeros((1, 2), dtype=np.int64)
+        self._climb_down = np.zeros((1, 2), dtype=np.int64)
+        self._run = np.zeros((1, 2), dtype=np.int64)
+        self._seen = np.zeros(1, dtype=np.int64)
+        # Series 0 is all traffic and is live from the first interval;
+        # protocol series start when their protocol first appears
+        self._started = np.ones(1, dtype=np.bool_)
+        self.alerts = deque(maxlen=self.max_alerts)
+        self.alert_count = 0
+        self._intervals = deque(maxlen=self.max_intervals)
+
+    def _grow(self, series):
+        size = len(self._seen)
+        for name in _STATE:
+            array = getattr(self, name)
+            grown = np.full((series,) + array.shape[1:], _STATE_FILL.get(name, 0), dtype=array.dtype)
+            grown[:size] = array
+            setattr(self, name, grown)
+
+    def update(self, cols, protocol_names):
+        """Fold a batch of store-encoded rows in, closing any finished intervals.
+
+        ``protocol_names`` maps protocol codes to the labels used in alerts.
+        """
+        with self._lock:
+            self._update(cols, protocol_names)
+
+    def _update(self, cols, protocol_names):
+        count = len(cols['timestamp'])
+        if not count:
+            return
+        self._names = protocol_names
+        series = int(cols['protocol'].max()) + 2
+        if series > len(self._seen):
+            self._grow(series)
+        series = len(self._seen)
+
+        buckets = np.floor(cols['timestamp'] / self.interval).astype(np.int64)
+        if self._current is None:
+            self._current = int(buckets.min())
+        # Stragglers from intervals already scored count towards the open one
+        np.maximum(buckets, self._current, out=buckets)
+        distinct, inverse = np.unique(buckets, return_inverse=True)
+
+        # Totals per (bucket, series): row 0 of each bucket is all traffic
+        keys = inverse * series + cols['protocol'].astype(np.int64) + 1
+        length = len(distinct) * series
+        packets = np.bincount(keys, minlength=length).reshape(len(distinct), series)
+        sizes = np.bincount(keys, weights=cols['size'], minlength=length).reshape(len(distinct), series)
+        packets[:, 0] = packets[:, 1:].sum(axis=1)
+        sizes[:, 0] = sizes[:, 1:].sum(axis=1)
+
+        for i, bucket in enumerate(distinct.tolist()):
+            self._advance(bucket)
+            self._pending[:, 0] += packets[i]
+            self._pending[:, 1] += sizes[i]
+
+    def _advance(self, bucket):
+        """Close every interval before ``bucket``"""
+        gap = bucket - self._current
+        if gap <= 0:
+            return
+        if gap > self.max_gap:
+            # After a long silence the old baseline says little about what
+            # comes next: score the last interval and the silence once,
+            # then learn again from scratch
+            self._close()
+            self._relearn()
+            self._current = bucket
+            return
+        for _ in range(gap):
+            self._close()
+
+    def _relearn(self):
+        self._history[:] = np.nan
+        self._learned[:] = 0
+        self._cusum_up[:] = 0
+        self._cusum_down[:] = 0
+        self._climb_up[:] = 0
+        self._climb_down[:] = 0
+        self._run[:] = 0
+        self._seen[:] = 0
+        self._started[1:] = False
+
+    def _close(self):
+        """Score the open interval against the baselines, then fold it in"""
+        counts = self._pending
+        started = self._started | (counts[:, 0] > 0)
+        self._started = started
+        # Rates are scored on a log scale: flows multiply a series' rate
+        # rather than add a fixed amount to it
+        values = np.log1p(counts)
+        low, median, high = self._quantiles()
+        expected = np.expm1(median)
+
+        # Poisson floor: n packets vary by sqrt(n), which is 1/sqrt(n) on a
+        # log scale, and bytes by at least as much relatively
+        packet_floor = 1 / np.sqrt(expected[:, 0] + 1)
+        deviation = values - median
+        spread = np.where(deviation > 0, high - median, median - low) / self._tail_z
+        spread = np.maximum(spread, packet_floor[:, None])
+        z = deviation / spread
+
+        armed = started & (self._seen >= self.warmup)
+        # A protocol only alerts on a change in its packet rate worth
+        # ``min_share`` of all traffic: quiet protocols often pause for a
+        # moment, and a big flow can multiply their rate for a while
+        armed[1:] &= np.abs(counts[1:, 0] - expected[1:, 0]) >= self.min_share * expected[0, 0]
+        armed = armed[:, None] & (self._learned > 0)
+        # Only all traffic is watched for sustained shifts: a protocol's rate
+        # shifts for as long as its biggest flow lasts
+        tracked = armed.copy()
+        tracked[1:] = False
+        k = self.cusum_slack
+        self._cusum_up = np.where(tracked, np.maximum(0, self._cusum_up + z - k), 0)
+        self._cusum_down = np.where(tracked, np.maximum(0, self._cusum_down - z - k), 0)
+        self._climb_up = np.where(self._cusum_up > 0, self._climb_up + 1, 0)
+        self._climb_down = np.where(self._cusum_down > 0, self._climb_down + 1, 0)
+
+        # Spikes are the z-score's job; the CUSUM only accumulates small shifts
+        spike = armed & (np.abs(z) > self.z_threshold)
+        self._cusum_up[spike] = 0
+        self._cusum_down[spike] = 0
+        rise = tracked & (self._cusum_up > self.cusum_threshold)
+        fall = tracked & (self._cusum_down > self.cusum_threshold)
+        anomalous = spike | rise | fall
+        new = anomalous & (self._run == 0)
+        if new.any():
+            self._record_alerts(new, counts, expected, z, spike, rise)
+        if anomalous.any():
+            self._mark_interval()
+        self._run = np.where(anomalous, self._run + 1, 0)
+
+        # Spikes stay out of the history, so an attack does not become the
+        # new normal
+        learn = started[:, None] & ~spike
+        rows, metrics = np.nonzero(learn)
+        self._history[rows, self._learned[rows, metrics] % self.history, metrics] = values[rows, metrics]
+        self._learned += learn
+        # ...unless it lasts: a CUSUM shift, or spikes for ``warmup``
+        # intervals in a row, moves the whole history to the new level. A
+        # CUSUM's level is its average since it left zero, k + S / n spreads
+        # away, not the one interval that tripped it.
+        shifted = (rise | fall) & ~spike | (self._run >= self.warmup)
+        if shifted.any():
+            offset = np.where(rise, spread * (k + self._cusum_up / np.maximum(self._climb_up, 1)), deviation)
+            offset = np.where(fall & ~rise, -spread * (k + self._cusum_down / np.maximum(self._climb_down, 1)), offset)
+            offset = np.where(shifted, offset, 0)
+            self._history = np.maximum(self._history + offset[:, None, :], 0)
+        self._cusum_up[shifted] = 0
+        self._cusum_down[shifted] = 0
+        self._climb_up[shifted] = 0
+        self._climb_down[shifted] = 0
+        self._run[shifted] = 0
+        self._seen += started
+
+        self._pending = np.zeros_like(counts)
+        self._current += 1
+
+    def _quantiles(self):
+        """The ``tail``, median and ``1 - tail`` quantiles of each history"""
+        ordered = np.sort(self._history, axis=1)
+        last = np.minimum(self._learned, self.history) - 1
+        quantiles = []
+        for q in (self.tail, 0.5, 1 - self.tail):
+            # Nearest rank among the filled slots; an empty history reads as 0
+            rank = np.rint(q * np.maximum(last, 0)).astype(np.int64)
+            value = np.take_along_axis(ordered, rank[:, None, :], axis=1)[:, 0, :]
+            quantiles.append(np.where(last >= 0, value, 0.0))
+        return quantiles
+
+    def _record_alerts(self, new, values, expected, z, spike, rise):
+        timestamp = self._current * self.interval
+        for index, metric in zip(*np.nonzero(new)):
+            if spike[index, metric]:
+                kind = ALERT_SPIKE if z[index, metric] > 0 else ALERT_DROP
+            else:
+                kind = ALERT_RISE if rise[index, metric] else ALERT_FALL
+            self.alerts.append({
+                'timestamp': timestamp,
+                'series': self._series_name(index),
+                'metric': METRICS[metric],
+                'value': float(values[index, metric]),
+                'expected': float(expected[index, metric]),
+                'score': float(z[index, metric]),
+                'kind': kind,
+            })
+            self.alert_count += 1
+
+    def _series_name(self, index):
+        if index == 0:
+            return "All traffic"
+        code = index - 1
+        return self._names[code] if code < len(self._names) else "Other"
+
+    def _mark_interval(self):
+        """Extend the last anomalous span or start a new one"""
+        start = self._current * self.interval
+        end = start + self.interval
+        if self._intervals and self._intervals[-1][1] >= start:
+            self._intervals[-1] = (self._intervals[-1][0], end)
+        else:
+            self._intervals.append((start, end))
+
+    def intervals(self):
+        """Anomalous (start, end) spans of capture time, oldest first"""
+        with self._lock:
+            return list(self._intervals)
+
+    def recent_alerts(self, since=0):
+        """Alerts after the first ``since`` ever raised, oldest first.
+
+        Returns (alerts, alert_count); pass the count back as ``since`` to
+        get only the alerts raised after this call.
+        """
+        with self._lock:
+            missing = min(self.alert_count - since, len(self.alerts))
+            alerts = list(self.alerts)[len(self.alerts) - missing:] if missing > 0 else []
+            return alerts, self.alert_count
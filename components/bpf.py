@@ -0,0 +1,462 @@
+# components/bpf.py
+# Compiler from tcpdump-style capture filter expressions to classic BPF.
+# The program is attached to the AF_PACKET socket with SO_ATTACH_FILTER so
+# the kernel discards unwanted frames before they are copied to user space.
+#
+# Supported primitives (combine with and/&&, or/||, not/! and parentheses):
+#   ip, ip6, arp, tcp, udp, icmp, icmp6
+#   [src|dst] host ADDR           IPv4 or IPv6 address
+#   [src|dst] net CIDR            IPv4 network, e.g. 10.0.0.0/8
+#   [tcp|udp] [src|dst] port N
+#   [tcp|udp] [src|dst] portrange N-M
+#   less N, greater N             frame length
+import ctypes
+import socket
+import struct
+import time
+
+# Instruction classes, sizes, modes and operations
+BPF_LD = 0x00
+BPF_LDX = 0x01
+BPF_ALU = 0x04
+BPF_JMP = 0x05
+BPF_RET = 0x06
+BPF_W = 0x00
+BPF_H = 0x08
+BPF_B = 0x10
+BPF_ABS = 0x20
+BPF_IND = 0x40
+BPF_LEN = 0x80
+BPF_MSH = 0xA0
+BPF_AND = 0x50
+BPF_JA = 0x00
+BPF_JEQ = 0x10
+BPF_JGT = 0x20
+BPF_JGE = 0x30
+BPF_JSET = 0x40
+BPF_K = 0x00
+
+LD_W_ABS = BPF_LD | BPF_W | BPF_ABS
+LD_H_ABS = BPF_LD | BPF_H | BPF_ABS
+LD_B_ABS = BPF_LD | BPF_B | BPF_ABS
+LD_H_IND = BPF_LD | BPF_H | BPF_IND
+LD_LEN = BPF_LD | BPF_W | BPF_LEN
+LDX_B_MSH = BPF_LDX | BPF_B | BPF_MSH
+ALU_AND_K = BPF_ALU | BPF_AND | BPF_K
+JEQ_K = BPF_JMP | BPF_JEQ | BPF_K
+JGT_K = BPF_JMP | BPF_JGT | BPF_K
+JGE_K = BPF_JMP | BPF_JGE | BPF_K
+JSET_K = BPF_JMP | BPF_JSET | BPF_K
+RET_K = BPF_RET | BPF_K
+
+SO_ATTACH_FILTER = 26
+SO_DETACH_FILTER = 27
+ACCEPT_SNAPLEN = 262144
+
+ETH_TYPE = 12
+ETH_HLEN = 14
+ETHERTYPES = {'ip': 0x0800, 'ip6': 0x86DD, 'arp': 0x0806}
+IP_PROTOCOLS = {'tcp': 6, 'udp': 17, 'icmp': 1, 'icmp6': 58}
+
+SOCK_FILTER = struct.Struct("=HBBI")
+
+
+class FilterError(ValueError):
+    """Raised for capture filter expressions that can't be compiled"""
+
+
+# -- Parsing ---------------------------------------------------------------
+
+def tokenize(expression):
+    tokens = []
+    for word in expression.replace('(', ' ( ').replace(')', ' ) ').split():
+        if word in ('&&', '||', '!'):
+            tokens.append({'&&': 'and', '||': 'or', '!': 'not'}[word])
+        elif word.startswith('!') and len(word) > 1:
+            tokens.extend(['not', word[1:]])
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise FilterError("unexpected end of filter expression")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise FilterError(f"unexpected '{self.peek()}'")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == 'or':
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() == 'and':
+            self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() == 'not':
+            self.take()
+            return ('not', self.parse_not())
+        if self.peek() == '(':
+            self.take()
+            node = self.parse_or()
+            if self.take() != ')':
+                raise FilterError("missing ')'")
+            return node
+        return self.parse_primitive()
+
+    def parse_primitive(self):
+        token = self.take()
+        if token in ('less', 'greater'):
+            length = _parse_number(self.take(), 0xFFFFFFFF)
+            if token == 'less':
+                return ('not', _test([(LD_LEN, 0)], JGT_K, length))
+            return _test([(LD_LEN, 0)], JGE_K, length)
+
+        proto = None
+        if token in ETHERTYPES or token in IP_PROTOCOLS:
+            proto = token
+            if self.peek() not in ('src', 'dst', 'host', 'net', 'port', 'portrange'):
+                return _protocol(proto)
+            token = self.take()
+
+        direction = None
+        if token in ('src', 'dst'):
+            direction = token
+            token = self.take()
+
+        if token == 'host':
+            return _host(self.take(), direction, proto)
+        if token == 'net':
+            return _net(self.take(), direction, proto)
+        if token == 'port':
+            port = _parse_number(self.take(), 0xFFFF)
+            return _ports(port, port, direction, proto)
+        if token == 'portrange':
+            low, _, high = self.take().partition('-')
+            return _ports(_parse_number(low, 0xFFFF), _parse_number(high, 0xFFFF), direction, proto)
+        if direction is not None:
+            # "src 10.0.0.1" is shorthand for "src host 10.0.0.1"
+            return _host(token, direction, proto)
+        raise FilterError(f"unknown filter primitive '{token}'")
+
+
+def _parse_number(token, limit):
+    try:
+        value = int(token, 0)
+    except ValueError:
+        raise FilterError(f"expected a number, got '{token}'") from None
+    if not 0 <= value <= limit:
+        raise FilterError(f"{value} is out of range")
+    return value
+
+
+# -- Primitive expansion ---------------------------------------------------
+# Primitives expand into and/or/not trees of ('test', loads, jump, k) nodes:
+# run the loads, then compare the accumulator with k.
+
+def _test(loads, jump, k):
+    return ('test', tuple(loads), jump, k)
+
+
+def _all(*nodes):
+    node = nodes[0]
+    for other in nodes[1:]:
+        node = ('and', node, other)
+    return node
+
+
+def _any(*nodes):
+    node = nodes[0]
+    for other in nodes[1:]:
+        node = ('or', node, other)
+    return node
+
+
+def _ethertype(name):
+    return _test([(LD_H_ABS, ETH_TYPE)], JEQ_K, ETHERTYPES[name])
+
+
+def _ipv4_proto(number):
+    return _all(_ethertype('ip'), _test([(LD_B_ABS, ETH_HLEN + 9)], JEQ_K, number))
+
+
+def _ipv6_proto(number):
+    return _all(_ethertype('ip6'), _test([(LD_B_ABS, ETH_HLEN + 6)], JEQ_K, number))
+
+
+def _protocol(name):
+    if name in ETHERTYPES:
+        return _ethertype(name)
+    if name == 'icmp':
+        return _ipv4_proto(1)
+    if name == 'icmp6':
+        return _ipv6_proto(58)
+    return _any(_ipv4_proto(IP_PROTOCOLS[name]), _ipv6_proto(IP_PROTOCOLS[name]))
+
+
+def _directions(direction, src, dst):
+    if direction == 'src':
+        return src
+    if direction == 'dst':
+        return dst
+    return _any(src, dst)
+
+
+def _host(address, direction, proto):
+    if ':' in address:
+        if proto not in (None, 'ip6'):
+            raise FilterError(f"'{proto}' can't be used with an IPv6 host")
+        try:
+            words = struct.unpack("!IIII", socket.inet_pton(socket.AF_INET6, address))
+        except OSError:
+            raise FilterError(f"invalid IPv6 address '{address}'") from None
+
+        def match(offset):
+            return _all(*[_test([(LD_W_ABS, offset + 4 * i)], JEQ_K, w) for i, w in enumerate(words)])
+        return _all(_ethertype('ip6'), _directions(direction, match(ETH_HLEN + 8), match(ETH_HLEN + 24)))
+
+    if proto not in (None, 'ip'):
+        raise FilterError(f"'{proto}' can't be used with an IPv4 host")
+    value = _ipv4(address)
+    return _all(_ethertype('ip'), _directions(
+        direction,
+        _test([(LD_W_ABS, ETH_HLEN + 12)], JEQ_K, value),
+        _test([(LD_W_ABS, ETH_HLEN + 16)], JEQ_K, value)))
+
+
+def _ipv4(address):
+    try:
+        if address.count('.') != 3:
+            raise OSError
+        return struct.unpack("!I", socket.inet_aton(address))[0]
+    except OSError:
+        raise FilterError(f"invalid IPv4 address '{address}'") from None
+
+
+def _net(network, direction, proto):
+    if proto not in (None, 'ip'):
+        raise FilterError(f"'{proto}' can't be used with an IPv4 network")
+    address, _, bits = network.partition('/')
+    bits = _parse_number(bits, 32) if bits else 32
+    mask = (0xFFFFFFFF << (32 - bits)) & 0xFFFFFFFF
+    value = _ipv4(address)
+    if value & ~mask & 0xFFFFFFFF:
+        raise FilterError(f"non-network bits set in '{network}'")
+
+    def match(offset):
+        return _test([(LD_W_ABS, offset), (ALU_AND_K, mask)], JEQ_K, value)
+    return _all(_ethertype('ip'), _directions(direction, match(ETH_HLEN + 12), match(ETH_HLEN + 16)))
+
+
+def _ports(low, high, direction, proto):
+    if proto not in (None, 'tcp', 'udp'):
+        raise FilterError(f"'{proto}' has no ports")
+    if low > high:
+        raise FilterError("empty port range")
+
+    def compare(loads):
+        if low == high:
+            return _test(loads, JEQ_K, low)
+        return _all(_test(loads, JGE_K, low), ('not', _test(loads, JGT_K, high)))
+
+    def ipv4(number):
+        # Skip non-first fragments, then index past the variable IP header
+        not_fragment = ('not', _test([(LD_H_ABS, ETH_HLEN + 6)], JSET_K, 0x1FFF))
+        header = (LDX_B_MSH, ETH_HLEN)
+        return _all(_ipv4_proto(number), not_fragment, _directions(
+            direction,
+            compare([header, (LD_H_IND, ETH_HLEN)]),
+            compare([header, (LD_H_IND, ETH_HLEN + 2)])))
+
+    def ipv6(number):
+        return _all(_ipv6_proto(number), _directions(
+            direction,
+            compare([(LD_H_ABS, ETH_HLEN + 40)]),
+            compare([(LD_H_ABS, ETH_HLEN + 42)])))
+
+    protocols = [proto] if proto else ['tcp', 'udp']
+    return _any(*[_any(ipv4(IP_PROTOCOLS[p]), ipv6(IP_PROTOCOLS[p])) for p in protocols])
+
+
+# -- Code generation -------------------------------------------------------
+
+class _Label:
+    __slots__ = ('index',)
+
+    def __init__(self):
+        self.index = None
+
+
+def _generate(node, on_true, on_false, code):
+    kind = node[0]
+    if kind == 'and':
+        middle = _Label()
+        _generate(node[1], middle, on_false, code)
+        middle.index = len(code)
+        _generate(node[2], on_true, on_false, code)
+    elif kind == 'or':
+        middle = _Label()
+        _generate(node[1], on_true, middle, code)
+        middle.index = len(code)
+        _generate(node[2], on_true, on_false, code)
+    elif kind == 'not':
+        _generate(node[1], on_false, on_true, code)
+    else:
+        _, loads, jump, k = node
+        for op, operand in loads:
+            code.append([op, 0, 0, operand])
+        code.append([jump, on_true, on_false, k])
+
+
+class BPFProgram:
+    """A compiled filter: the instruction list plus compile-time metrics"""
+
+    def __init__(self, expression, instructions, compile_time):
+        self.expression = expression
+        self.instructions = instructions
+        self.compile_time = compile_time
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def pack(self):
+        """Encode as an array of struct sock_filter"""
+        return b"".join(SOCK_FILTER.pack(*insn) for insn in self.instructions)
+
+    def max_path(self):
+        """Most instructions any packet can execute - the per-packet cost bound"""
+        longest = [0] * (len(self.instructions) + 1)
+        for i in range(len(self.instructions) - 1, -1, -1):
+            code, jt, jf, k = self.instructions[i]
+            if code & 0x07 == BPF_RET:
+                longest[i] = 1
+            elif code & 0x07 == BPF_JMP:
+                if code & 0xF0 == BPF_JA:
+                    longest[i] = 1 + longest[i + 1 + k]
+                else:
+                    longest[i] = 1 + max(longest[i + 1 + jt], longest[i + 1 + jf])
+            else:
+                longest[i] = 1 + longest[i + 1]
+        return longest[0] if self.instructions else 0
+
+    def matches(self, frame, wire_len=None):
+        """Run the program on a frame in user space; True if accepted"""
+        return run(self.instructions, frame, wire_len) > 0
+
+    def describe(self):
+        return (f"{len(self)} insns, max path {self.max_path()}, "
+                f"compiled in {self.compile_time * 1000:.2f} ms")
+
+
+def compile_filter(expression):
+    """Compile a capture filter expression, raising FilterError if invalid.
+
+    An empty expression compiles to a program that accepts everything.
+    """
+    start = time.perf_counter()
+    tokens = tokenize(expression)
+    if not tokens:
+        instructions = [(RET_K, 0, 0, ACCEPT_SNAPLEN)]
+        return BPFProgram(expression, instructions, time.perf_counter() - start)
+
+    tree = _Parser(tokens).parse()
+    accept, reject = _Label(), _Label()
+    code = []
+    _generate(tree, accept, reject, code)
+    accept.index = len(code)
+    code.append([RET_K, 0, 0, ACCEPT_SNAPLEN])
+    reject.index = len(code)
+    code.append([RET_K, 0, 0, 0])
+
+    instructions = []
+    for i, (op, jt, jf, k) in enumerate(code):
+        if isinstance(jt, _Label):
+            jt = jt.index - i - 1
+            jf = jf.index - i - 1
+            if jt > 255 or jf > 255:
+                raise FilterError("filter expression is too long")
+        instructions.append((op, jt, jf, k))
+    if len(instructions) > 4096:
+        raise FilterError("filter expression is too long")
+    return BPFProgram(expression, instructions, time.perf_counter() - start)
+
+
+# -- Execution -------------------------------------------------------------
+
+def run(instructions, frame, wire_len=None):
+    """Interpret a classic BPF program over a frame; returns the accept length"""
+    data = bytes(frame)
+    length = len(data) if wire_len is None else wire_len
+    a = x = 0
+    pc = 0
+    sizes = {BPF_W: 4, BPF_H: 2, BPF_B: 1}
+    while pc < len(instructions):
+        code, jt, jf, k = instructions[pc]
+        pc += 1
+        cls = code & 0x07
+        if cls == BPF_LD:
+            mode = code & 0xE0
+            if mode == BPF_LEN:
+                a = length
+                continue
+            size = sizes[code & 0x18]
+            offset = k + (x if mode == BPF_IND else 0)
+            if offset + size > len(data):
+                return 0
+            a = int.from_bytes(data[offset:offset + size], 'big')
+        elif cls == BPF_LDX:
+            if k >= len(data):
+                return 0
+            x = (data[k] & 0x0F) * 4
+        elif cls == BPF_ALU:
+            a &= k
+        elif cls == BPF_JMP:
+            op = code & 0xF0
+            if op == BPF_JA:
+                pc += k
+                continue
+            if op == BPF_JEQ:
+                taken = a == k
+            elif op == BPF_JGT:
+                taken = a > k
+            elif op == BPF_JGE:
+                taken = a >= k
+            else:
+                taken = bool(a & k)
+            pc += jt if taken else jf
+        elif cls == BPF_RET:
+            return k
+    return 0
+
+
+def attach_filter(sock, program):
+    """Attach a compiled program to a socket with SO_ATTACH_FILTER"""
+    buffer = ctypes.create_string_buffer(program.pack())
+    fprog = struct.pack("HL", len(program), ctypes.addressof(buffer))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+
+def detach_filter(sock):
+    sock.setsockopt(socket.SOL_SOCKET, SO_DETACH_FILTER, 0)
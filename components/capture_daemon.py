@@ -0,0 +1,197 @@
+# components/capture_daemon.py
+# Long-running headless capture: a CaptureSession drained in a tight loop,
+# its packets written to rotated capture files and its statistics, flows
+# and alerts written out as periodic JSON summaries. Nothing here imports
+# tkinter or matplotlib, so it runs on display-less sensors.
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from components.pcap_io import CaptureFileWriter, FORMAT_PCAPNG
+from models.packet_store import CHUNK_SIZE
+
+
+class RotatingCaptureWriter:
+    """Capture files that roll over by age or packet count.
+
+    Files are named ``<prefix>_<date>_<time>.<format>`` in ``directory``;
+    a new one starts once the current file is ``max_seconds`` old or holds
+    ``max_packets`` packets (either limit may be None), and only the newest
+    ``keep`` files are kept.
+    """
+
+    def __init__(self, directory, prefix="capture", file_format=FORMAT_PCAPNG,
+                 max_seconds=3600, max_packets=None, keep=None):
+        # A zero packet limit would never make progress, and keeping no
+        # files would delete the one being written
+        for name, value in (("max_seconds", max_seconds), ("max_packets", max_packets), ("keep", keep)):
+            if value is not None and not value > 0:
+                raise ValueError(f"{name} must be positive, got {value}")
+        self.directory = directory
+        self.prefix = prefix
+        self.format = file_format
+        self.max_seconds = max_seconds
+        self.max_packets = max_packets
+        self.keep = keep
+        self.files = []
+        self._writer = None
+        self._opened = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self):
+        return self._writer.path if self._writer is not None else None
+
+    def _open(self):
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.directory, f"{self.prefix}_{stamp}.{self.format}")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"{self.prefix}_{stamp}_{suffix}.{self.format}")
+            suffix += 1
+        self._writer = CaptureFileWriter(path, self.format)
+        self._opened = time.monotonic()
+        self.files.append(path)
+        self._prune()
+
+    def _prune(self):
+        if self.keep is None:
+            return
+        while len(self.files) > self.keep:
+            try:
+                os.remove(self.files.pop(0))
+            except OSError:
+                pass
+
+    def _due(self):
+        if self.max_seconds is not None and time.monotonic() - self._opened >= self.max_seconds:
+            return True
+        return self.max_packets is not None and self._writer.packets_written >= self.max_packets
+
+    def rotate(self):
+        """Close the current file; the next write starts a new one"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def write_store(self, store, start, stop):
+        """Write rows [start, stop) of a PacketStore, rolling over as limits are reached"""
+        while start < stop:
+            if self._writer is not None and self._due():
+                self.rotate()
+            if self._writer is None:
+                self._open()
+            end = stop
+            if self.max_packets is not None:
+                end = min(stop, start + self.max_packets - self._writer.packets_written)
+            self._writer.write_store(store, start, end)
+            start = end
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        self.rotate()
+
+
+class CaptureDaemon:
+    """Drives a CaptureSession until stopped, with files and summaries.
+
+    ``summary`` is a text stream that gets one JSON object per line every
+    ``summary_interval`` seconds. The store only holds packets until they
+    have been written and counted: once it reaches ``store_rows`` it is
+    cleared, keeping memory flat however long the daemon runs.
+    """
+
+    def __init__(self, session, writer=None, summary=None, summary_interval=60,
+                 drain_interval=0.05, store_rows=CHUNK_SIZE, top_flows=10):
+        self.session = session
+        self.writer = writer
+        self.summary = summary if summary is not None else sys.stdout
+        self.summary_interval = summary_interval
+        self.drain_interval = drain_interval
+        self.store_rows = store_rows
+        self.top_flows = top_flows
+        self.packets_seen = 0
+        self.errors = []
+        self._written = 0
+        self._stop = threading.Event()
+        self._started = None
+        self._last_summary = (0.0, 0)
+        self._alerts_seen = 0
+        session.capture_manager.on_error = self.errors.append
+
+    def stop(self):
+        """Ask ``run`` to finish; safe to call from a signal handler"""
+        self._stop.set()
+
+    def run(self):
+        """Capture until ``stop`` is called, then flush and write a final summary"""
+        self._started = time.monotonic()
+        self._last_summary = (self._started, 0)
+        self.session.start()
+        try:
+            while not self._stop.is_set():
+                if not self.step():
+                    self._stop.wait(self.drain_interval)
+                if time.monotonic() - self._last_summary[0] >= self.summary_interval:
+                    self.write_summary()
+        finally:
+            self.session.stop()
+            self.step()
+            self.write_summary()
+            self.session.close()
+            if self.writer is not None:
+                self.writer.close()
+            self.session.store.close()
+
+    def step(self):
+        """Drain captured packets into the analysis and the capture file"""
+        added = self.session.drain()
+        if not added:
+            return 0
+        store = self.session.store
+        self.packets_seen += added
+        if self.writer is not None:
+            with self.session.stage_timer.time("capture_write"):
+                self.writer.write_store(store, self._written, len(store))
+        self._written = len(store)
+        if len(store) >= self.store_rows:
+            # Everything in the store has been counted and written; the
+            # protocol and address tables survive, so codes stay valid
+            store.clear()
+            self._written = 0
+        return added
+
+    def write_summary(self):
+        now = time.monotonic()
+        then, seen = self._last_summary
+        self._last_summary = (now, self.packets_seen)
+        processor = self.session.data_processor
+        manager = self.session.capture_manager
+        store = self.session.store
+        alerts, self._alerts_seen = processor.anomalies.recent_alerts(self._alerts_seen)
+        summary = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'uptime': round(now - self._started, 3),
+            'backend': manager.active_backend,
+            'packets': self.packets_seen,
+            'packets_per_second': round((self.packets_seen - seen) / max(now - then, 1e-9), 1),
+            'queue': manager.queue.stats(),
+            'statistics': processor.calculate_statistics(True),
+            'top_flows': [processor.flows.describe(flow, store)
+                          for flow in processor.flows.top(self.top_flows)],
+            'alerts': alerts,
+            'capture_file': self.writer.path if self.writer is not None else None,
+            'stages': {stage: {key: round(value, 6) for key, value in stats.items()}
+                       for stage, stats in self.session.stage_timer.stats().items()},
+        }
+        if manager.pipeline is not None and manager.pipeline.running:
+            summary['pipeline'] = manager.pipeline.stats()
+        if self.errors:
+            summary['errors'] = list(self.errors)
+            self.errors.clear()
+        self.summary.write(json.dumps(summary, default=str) + "\n")
+        self.summary.flush()
@@ -1,36 +1,226 @@
 # components/capture_manager.py
 import threading
 import time
-import random
 from datetime import datetime
 
-# Try to import scapy, but provide fallback if not available
-SCAPY_AVAILABLE = False
-try:
-    from scapy.all import sniff, IP, TCP, UDP, ICMP, Ether
-    SCAPY_AVAILABLE = True
-except ImportError:
-    print("Scapy not available. Using simulated packet capture.")
+import numpy as np
+
+from components.afpacket import AFPacketCapture, AFPACKET_AVAILABLE
+from components.pcap_io import frame_from_packet
+from components.packet_queue import PacketQueue, DROP_OLDEST
+from components.pipeline import DissectionPipeline, AFPacketSource, default_worker_count
+from components.traffic_generator import TrafficGenerator, ATTACK_EXFIL, ATTACK_PORT_SCAN
+from utils.constants import PROTOCOLS, FIELD_SRC_PORT, FIELD_TCP_FLAGS, FIELD_ICMP_TYPE
+from utils.helpers import int_to_ip
+
+# scapy.all takes seconds to import, so it is only loaded when first needed:
+# by probe_scapy's background thread at startup, or by a Scapy capture.
+# SCAPY_AVAILABLE is None until then.
+SCAPY_AVAILABLE = None
+_scapy = None
+_scapy_lock = threading.Lock()
+
+
+def load_scapy():
+    """Import scapy.all once and return it, or None if it isn't installed"""
+    global SCAPY_AVAILABLE, _scapy
+    with _scapy_lock:
+        if SCAPY_AVAILABLE is None:
+            try:
+                import scapy.all as scapy
+                _scapy, SCAPY_AVAILABLE = scapy, True
+            except ImportError:
+                SCAPY_AVAILABLE = False
+        return _scapy
+
+
+def probe_scapy(callback=None):
+    """Load scapy on a background thread, then call ``callback(available)``"""
+    def probe():
+        available = load_scapy() is not None
+        if callback is not None:
+            callback(available)
+    thread = threading.Thread(target=probe, daemon=True)
+    thread.start()
+    return thread
+
+# Capture backends, in order of preference for "auto"
+BACKEND_AUTO = "auto"
+BACKEND_AFPACKET = "afpacket"
+BACKEND_SCAPY = "scapy"
+BACKEND_SIMULATE = "simulate"
+
+# Seconds of simulated traffic generated per batch
+SIMULATION_INTERVAL = 0.05
+# Generated batches waiting to be drained before the overflow policy applies
+BATCH_QUEUE_SIZE = 64
+# Packets in the sample data, spread over its last hour
+SAMPLE_PACKETS = 20000
+
+# Packet fields a synthesized frame, and so a capture filter verdict, depends on
+_FRAME_FIELDS = ('protocol', 'size', 'src_ip', 'dst_ip', 'src_port', 'dst_port',
+                 'tcp_flags', 'icmp_type', 'fields')
 
 class CaptureManager:
-    def __init__(self, app):
-        self.app = app
-        self.SCAPY_AVAILABLE = SCAPY_AVAILABLE
+    """Runs a capture backend and hands its packets over through a queue.
+
+    Knows nothing about the UI: capture threads run while ``running`` is
+    set, and errors from them go to ``on_error(message)``, which may be
+    called from any thread.
+    """
+
+    def __init__(self, queue_size=100000, overflow_policy=DROP_OLDEST,
+                 backend=BACKEND_AUTO, interface=None, workers=None, on_error=None,
+                 generator=None):
+        self.on_error = on_error or print
+        self.running = False
         self.capture_thread = None
+        self.backend = backend
+        self.interface = interface
+        self.afpacket = None
+        # Compiled BPF capture filter, or None to capture everything
+        self.capture_filter = None
+        self.filtered_out = 0
+        self.active_backend = None
+        # Captured packets are handed to whoever drains the session through this queue
+        self.queue = PacketQueue(queue_size, overflow_policy)
+        # Simulated traffic arrives as column batches, like decoded packets
+        self.generator = generator or TrafficGenerator()
+        self.batches = PacketQueue(BATCH_QUEUE_SIZE, overflow_policy)
+        self.simulated = 0
+        # Decoder processes for AF_PACKET capture; 0 decodes in a thread
+        self.workers = default_worker_count() if workers is None else workers
+        self.pipeline = None
+        
+    def select_backend(self):
+        """Resolve the configured backend to one that can run here.
+
+        Never imports scapy, since this runs on the UI thread: until the
+        startup probe has finished, Scapy is picked and the capture thread
+        loads it, falling back to simulation if it isn't installed.
+        """
+        if self.backend != BACKEND_AUTO:
+            return self.backend
+        if AFPACKET_AVAILABLE:
+            return BACKEND_AFPACKET
+        if SCAPY_AVAILABLE is False:
+            return BACKEND_SIMULATE
+        return BACKEND_SCAPY
         
     def start_capture(self):
-        if SCAPY_AVAILABLE:
-            self.capture_thread = threading.Thread(target=self.capture_packets_scapy)
-        else:
-            self.capture_thread = threading.Thread(target=self.simulate_capture)
+        self.running = True
+        self.queue.reopen()
+        self.queue.reset_counters()
+        self.batches.reopen()
+        self.batches.reset_counters()
+        self.filtered_out = 0
+        self.simulated = 0
+        self.active_backend = self.select_backend()
+        if self.active_backend == BACKEND_AFPACKET and self.workers and self.start_pipeline():
+            return
+        targets = {
+            BACKEND_AFPACKET: self.capture_packets_afpacket,
+            BACKEND_SCAPY: self.capture_packets_scapy,
+            BACKEND_SIMULATE: self.simulate_capture,
+        }
+        self.capture_thread = threading.Thread(target=targets[self.active_backend])
             
         self.capture_thread.daemon = True
         self.capture_thread.start()
         
+    def start_pipeline(self):
+        """Capture in a separate process and decode in a worker pool"""
+        if self.pipeline is not None and self.pipeline.running:
+            self.pipeline.close()
+        pipeline = DissectionPipeline(self.workers, AFPacketSource(self.interface, self.capture_filter))
+        try:
+            pipeline.start()
+        except OSError as e:
+            self.on_error(f"Capture pipeline unavailable ({e}), capturing in a thread")
+            return False
+        self.pipeline = pipeline
+        return True
+        
+    def stop_capture(self):
+        self.running = False
+        # Unblock the capture thread if it is waiting on a full queue
+        self.queue.close()
+        self.batches.close()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            
+    def drain_decoded(self, store, max_batches=None):
+        """Column batches decoded by the pipeline workers or simulated, in capture order"""
+        batches = self.batches.drain(max_batches)
+        if self.pipeline is None:
+            return batches
+        batches += self.pipeline.drain(store, max_batches)
+        if self.pipeline.error:
+            self.on_error(f"Error: {self.pipeline.error}")
+            self.pipeline.error = None
+        return batches
+        
+    def pipeline_status(self):
+        """Per-stage throughput of the capture pipeline, if it is running"""
+        if self.pipeline is None or not self.pipeline.running:
+            return ""
+        stats = self.pipeline.stats()
+        return (f"Pipeline x{stats['workers']}: captured {stats['captured_per_s']:.0f}/s, "
+                f"decoded {stats['decoded_per_s']:.0f}/s, delivered {stats['delivered_per_s']:.0f}/s, "
+                f"workers {stats['worker_utilization'] * 100:.0f}% busy")
+        
+    def filter_status(self):
+        """Describe the active capture filter and how much it is passing"""
+        if self.capture_filter is None or not self.capture_filter.expression.strip():
+            return "Filter: none"
+        text = f"Filter: {self.capture_filter.expression} ({self.capture_filter.describe()})"
+        if self.pipeline is not None and self.pipeline.running:
+            counts = self.pipeline.stage_counts()
+            return text + f"  passed {counts['captured']}, kernel drops {counts['kernel_drops']}"
+        if self.active_backend == BACKEND_SIMULATE:
+            text += f"  passed {self.simulated}, filtered {self.filtered_out}"
+        elif self.afpacket is not None:
+            text += f", kernel drops {self.afpacket.stats()['kernel_drops']}"
+        return text
+        
+    def capture_packets_afpacket(self):
+        """Capture packets from a TPACKET_V3 ring, falling back to Scapy"""
+        capture = AFPacketCapture(self.interface, bpf_program=self.capture_filter)
+        try:
+            capture.open()
+        except OSError as e:
+            # Usually missing CAP_NET_RAW; the fallbacks may still work
+            self.on_error(f"AF_PACKET capture unavailable ({e}), falling back")
+            if load_scapy() is not None:
+                self.active_backend = BACKEND_SCAPY
+                self.capture_packets_scapy()
+            else:
+                self.active_backend = BACKEND_SIMULATE
+                self.simulate_capture()
+            return
+            
+        self.afpacket = capture
+        try:
+            for batch in capture.batches(lambda: self.running):
+                self.queue.put_many(batch)
+        except Exception as e:
+            self.on_error(f"Error: {str(e)}")
+        finally:
+            capture.close()
+            self.afpacket = None
+            
     def capture_packets_scapy(self):
         """Capture packets using Scapy"""
+        scapy = load_scapy()
+        if scapy is None:
+            self.on_error("Scapy not available, capturing simulated packets")
+            self.active_backend = BACKEND_SIMULATE
+            self.simulate_capture()
+            return
+        IP, TCP, UDP, ICMP = scapy.IP, scapy.TCP, scapy.UDP, scapy.ICMP
+        
         def process_packet(packet):
-            if self.app.capture_active:
+            if self.running:
                 packet_info = {
                     'timestamp': time.time(),
                     'size': len(packet),
@@ -43,7 +233,7 @@ class CaptureManager:
                     packet_info['protocol'] = 'TCP'
                     packet_info['src_port'] = packet[TCP].sport
                     packet_info['dst_port'] = packet[TCP].dport
-                    packet_info['tcp_flags'] = packet[TCP].flags
+                    packet_info['tcp_flags'] = int(packet[TCP].flags)
                 elif UDP in packet:
                     packet_info['protocol'] = 'UDP'
                     packet_info['src_port'] = packet[UDP].sport
@@ -54,75 +244,62 @@ class CaptureManager:
                 else:
                     packet_info['protocol'] = 'Other'
                     
-                self.app.add_packet(packet_info)
+                self.queue.put(packet_info)
                     
         try:
-            sniff(prn=process_packet, store=0, stop_filter=lambda x: not self.app.capture_active)
+            # Scapy compiles the same expression with libpcap and attaches it
+            expression = self.capture_filter.expression if self.capture_filter else None
+            scapy.sniff(prn=process_packet, store=0, filter=expression,
+                  stop_filter=lambda x: not self.running)
         except Exception as e:
-            self.app.root.after(0, lambda: self.app.ui_builder.status_label.config(
-                text=f"Error: {str(e)}", foreground="red"))
+            self.on_error(f"Error: {str(e)}")
             
     def simulate_capture(self):
-        """Simulate packet capture for demonstration purposes"""
-        protocols = ['TCP', 'UDP', 'ICMP', 'HTTP', 'HTTPS', 'DNS', 'SSH', 'FTP']
-        sizes = [64, 128, 256, 512, 1024, 1280, 1500]
-        src_ips = [f"192.168.1.{i}" for i in range(1, 50)]
-        dst_ips = [f"10.0.0.{i}" for i in range(1, 50)] + ["8.8.8.8", "1.1.1.1", "9.9.9.9"]
-        
-        while self.app.capture_active:
-            # Create a mock packet
-            mock_packet = {
-                'protocol': random.choice(protocols),
-                'size': random.choice(sizes),
-                'timestamp': time.time(),
-                'src_ip': random.choice(src_ips),
-                'dst_ip': random.choice(dst_ips),
-                'src_port': random.randint(1024, 65535),
-                'dst_port': random.choice([80, 443, 53, 22, 21, 25, 110])
-            }
-            
-            # Add TCP flags for TCP packets
-            if mock_packet['protocol'] == 'TCP':
-                mock_packet['tcp_flags'] = random.choice([0x02, 0x10, 0x12, 0x18])  # SYN, ACK, SYN-ACK, PSH-ACK
-            
-            # Occasionally add some anomalous packets
-            if random.random() < 0.05:  # 5% chance of anomaly
-                mock_packet['size'] = random.randint(2000, 5000)  # Oversized packet
-                
-            self.app.add_packet(mock_packet)
-            time.sleep(0.1)  # Simulate network delay
-            
-    def load_sample_data(self):
-        """Generate sample data for demonstration"""
-        packets = []
-        protocols = ['TCP', 'UDP', 'ICMP', 'HTTP', 'HTTPS', 'DNS', 'SSH']
-        sizes = [64, 128, 256, 512, 1024, 1500]
-        src_ips = [f"192.168.1.{i}" for i in range(1, 20)]
-        dst_ips = [f"10.0.0.{i}" for i in range(1, 20)] + ["8.8.8.8", "1.1.1.1"]
-        
-        base_time = time.time() - 3600  # Start from 1 hour ago
-        
-        for i in range(200):
-            # Create a mock packet with various attributes
-            mock_packet = {
-                'protocol': random.choice(protocols),
-                'size': random.choice(sizes),
-                'timestamp': base_time + i * 18,  # Spread over 1 hour
-                'src_ip': random.choice(src_ips),
-                'dst_ip': random.choice(dst_ips),
-                'src_port': random.randint(1024, 65535),
-                'dst_port': random.choice([80, 443, 53, 22, 21])
-            }
-            
-            # Add TCP flags for TCP packets
-            if mock_packet['protocol'] == 'TCP':
-                mock_packet['tcp_flags'] = random.choice([0x02, 0x10, 0x12, 0x18])  # SYN, ACK, SYN-ACK, PSH-ACK
-                
-            packets.append(mock_packet)
-            
-        # Add some anomalies
-        for i in range(5):
-            anomaly_idx = random.randint(0, len(packets)-1)
-            packets[anomaly_idx]['size'] = random.randint(2000, 5000)
-            
-        return packets
\ No newline at end of file
+        """Generate synthetic traffic in real time, one batch every SIMULATION_INTERVAL"""
+        last = time.time()
+        while self.running:
+            time.sleep(max(SIMULATION_INTERVAL - (time.time() - last), 0))
+            now = time.time()
+            columns = self.generator.generate(last, now)
+            last = now
+            # No kernel here, so run the filter program in user space
+            if self.capture_filter:
+                columns = self.filter_columns(columns)
+            if len(columns['timestamp']):
+                self.simulated += len(columns['timestamp'])
+                self.batches.put(columns)
+
+    def filter_columns(self, columns):
+        """Keep the packets of a column batch that pass the capture filter.
+
+        The filter sees a frame synthesized from each packet's fields, so
+        packets with the same fields get the same verdict: the program runs
+        once per distinct combination rather than once per packet.
+        """
+        keys = np.rec.fromarrays([columns[name] for name in _FRAME_FIELDS], names=_FRAME_FIELDS)
+        distinct, inverse = np.unique(keys, return_inverse=True)
+        verdicts = np.zeros(len(distinct), dtype=bool)
+        for i, row in enumerate(distinct.tolist()):
+            packet = dict(zip(_FRAME_FIELDS, row))
+            fields = packet['fields']
+            packet['protocol'] = PROTOCOLS[packet['protocol']]
+            packet['src_ip'] = int_to_ip(packet['src_ip'])
+            packet['dst_ip'] = int_to_ip(packet['dst_ip'])
+            if not fields & FIELD_SRC_PORT:
+                packet['src_port'] = packet['dst_port'] = None
+            if not fields & FIELD_TCP_FLAGS:
+                packet['tcp_flags'] = None
+            if not fields & FIELD_ICMP_TYPE:
+                packet['icmp_type'] = None
+            verdicts[i] = self.capture_filter.matches(frame_from_packet(packet))
+        keep = verdicts[inverse.ravel()]
+        self.filtered_out += int(len(keep) - keep.sum())
+        return {name: values[keep] for name, values in columns.items()}
+
+    def load_sample_data(self, count=SAMPLE_PACKETS, duration=3600, seed=None):
+        """An hour of sample traffic as store columns, with a port scan and an exfil burst in it"""
+        end = time.time()
+        generator = TrafficGenerator(rate=count / duration, seed=seed)
+        generator.inject(ATTACK_PORT_SCAN, end - duration * 0.6, 5, rate=200)
+        generator.inject(ATTACK_EXFIL, end - duration * 0.25, 10, rate=100)
+        return generator.sample(count, end - duration, end)
@@ -0,0 +1,132 @@
+# components/capture_session.py
+# The UI-free core of a capture: packets flow from a CaptureManager's queue
+# and decode pipeline into a PacketStore and through the statistics, flow
+# table and anomaly detector. The Tk app and the headless daemon both drive
+# a session by calling ``drain`` from one thread; neither tkinter nor
+# matplotlib is imported on this path. The session's Metrics registry
+# times each stage and reads the capture counters on demand.
+import time
+
+from components.capture_manager import CaptureManager
+from components.data_processor import DataProcessor
+from components.metrics import Metrics
+from models.packet_store import PacketStore
+
+
+class CaptureSession:
+    """Capture, storage and analysis, driven by periodic ``drain`` calls"""
+
+    def __init__(self, capture_manager=None, store=None, data_processor=None, max_drain_batch=50000,
+                 metrics=None):
+        self.capture_manager = capture_manager or CaptureManager()
+        self.store = store if store is not None else PacketStore()
+        self.data_processor = data_processor or DataProcessor()
+        self.max_drain_batch = max_drain_batch
+        self.metrics = metrics or Metrics()
+        self.register_metrics()
+
+    def register_metrics(self):
+        """Stage timers and parse counters, plus gauges reading the capture side's own counters"""
+        metrics = self.metrics
+        self.stage_timer = metrics.timer("stage_seconds", "Time spent per processing stage", label="stage")
+        self.parsed = metrics.counter("packets_parsed_total",
+                                      "Packets decoded and added to the store, by how they arrived", label="path")
+        metrics.counter("packets_received_total", "Packets handed over by the capture backend",
+                        label="source", read=self._received)
+        metrics.counter("packets_dropped_total", "Packets lost before reaching the store",
+                        label="stage", read=self._dropped)
+        metrics.counter("batches_dropped_total", "Simulated packet batches lost to a full batch queue",
+                        read=lambda: self.capture_manager.batches.dropped)
+        metrics.counter("packets_filtered_total", "Packets rejected by a user-space capture filter",
+                        read=lambda: self.capture_manager.filtered_out)
+        metrics.gauge("queue_depth", "Items waiting in each capture handoff queue",
+                      label="queue", read=self._queue_depths)
+        metrics.gauge("queue_high_watermark", "Deepest each capture handoff queue has been",
+                      label="queue", read=self._queue_watermarks)
+        metrics.counter("decode_busy_seconds_total", "Time the pipeline workers spent decoding",
+                        read=lambda: self._pipeline_counts().get("decode_busy_s", 0.0))
+        metrics.gauge("store_packets", "Packets in the store", read=lambda: len(self.store))
+        metrics.gauge("store_spilled_packets", "Packets held in on-disk segments",
+                      read=lambda: self.store.spilled_count)
+        metrics.gauge("store_resident_bytes", "Memory held by the store's in-memory chunks",
+                      read=lambda: self.store.nbytes())
+        metrics.gauge("flows_active", "Flows in the flow table", read=lambda: len(self.data_processor.flows))
+
+    def _pipeline_counts(self):
+        pipeline = self.capture_manager.pipeline
+        return pipeline.stage_counts() if pipeline is not None and pipeline.running else {}
+
+    def _received(self):
+        manager = self.capture_manager
+        return {"queue": manager.queue.enqueued, "simulated": manager.simulated,
+                "pipeline": self._pipeline_counts().get("captured", 0)}
+
+    def _dropped(self):
+        manager = self.capture_manager
+        dropped = {"queue": manager.queue.dropped, "kernel": self._pipeline_counts().get("kernel_drops", 0)}
+        if manager.afpacket is not None:
+            dropped["kernel"] += manager.afpacket.stats()['kernel_drops']
+        return dropped
+
+    def _queue_depths(self):
+        manager = self.capture_manager
+        counts = self._pipeline_counts()
+        return {"packets": manager.queue.depth, "batches": manager.batches.depth,
+                "pipeline": counts.get("captured", 0) - counts.get("delivered", 0)}
+
+    def _queue_watermarks(self):
+        manager = self.capture_manager
+        return {"packets": manager.queue.high_watermark, "batches": manager.batches.high_watermark}
+
+    @property
+    def running(self):
+        return self.capture_manager.running
+
+    def start(self):
+        self.capture_manager.start_capture()
+
+    def stop(self):
+        self.capture_manager.stop_capture()
+
+    def close(self):
+        """Stop capturing and shut down the decode pipeline"""
+        self.capture_manager.stop_capture()
+        if self.capture_manager.pipeline is not None:
+            self.capture_manager.pipeline.close()
+
+    def add_packets(self, packets):
+        """Add a batch of packet dicts to the store and the analysis"""
+        start = len(self.store)
+        started = time.perf_counter()
+        self.store.extend(packets)
+        stored = time.perf_counter()
+        self.data_processor.track_packets(self.store, start)
+        self.stage_timer.observe(stored - started, "store")
+        self.stage_timer.observe(time.perf_counter() - stored, "analysis")
+        self.parsed.inc(len(packets), "dicts")
+
+    def add_columns(self, columns):
+        """Add a batch of packets already decoded into store columns"""
+        started = time.perf_counter()
+        self.store.append_columns(columns)
+        stored = time.perf_counter()
+        self.data_processor.add_columns(columns, self.store)
+        self.stage_timer.observe(stored - started, "store")
+        self.stage_timer.observe(time.perf_counter() - stored, "analysis")
+        self.parsed.inc(len(columns['timestamp']), "columns")
+
+    def drain(self):
+        """Move captured packets into the store in batches; returns how many"""
+        with self.stage_timer.time("drain"):
+            return self._drain()
+
+    def _drain(self):
+        added = 0
+        batch = self.capture_manager.queue.drain(self.max_drain_batch)
+        if batch:
+            self.add_packets(batch)
+            added += len(batch)
+        for columns in self.capture_manager.drain_decoded(self.store):
+            self.add_columns(columns)
+            added += len(columns['timestamp'])
+        return added
@@ -0,0 +1,87 @@
+# components/chart_renderer.py
+import threading
+import time
+
+
+class ChartRenderer:
+    """Renders charts on a background thread.
+
+    The main loop submits a small snapshot of aggregated data per chart;
+    the worker draws it with the chart's Agg figure and leaves a finished
+    PPM image for the main loop to pick up with ``results``. Only the newest
+    request and the newest result per chart are kept: anything superseded
+    before the worker or the main loop got to it is dropped and counted.
+
+    ``create_charts`` is called on the worker thread to build the
+    {name: chart} mapping, so plotting libraries load in the background
+    while the window is already up; requests made meanwhile just wait.
+    Render times, counts and errors go to ``metrics``.
+    """
+
+    def __init__(self, create_charts, metrics):
+        self.create_charts = create_charts
+        self.metrics = metrics
+        self.charts = None
+        self._requests = {}
+        self._results = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.rendered = 0
+        self.dropped = 0
+        self.render_seconds = {}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._render_timer = metrics.timer("chart_render_seconds", "Time to render each chart", label="chart")
+        metrics.counter("charts_rendered_total", "Chart images rendered", read=lambda: self.rendered)
+        metrics.counter("charts_dropped_total", "Chart requests or images superseded before use",
+                        read=lambda: self.dropped)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, name, data, size):
+        """Ask for ``name`` to be drawn from ``data`` at ``size`` (width, height)"""
+        with self._cond:
+            if name in self._requests:
+                self.dropped += 1
+            self._requests[name] = (data, size)
+            self._cond.notify()
+
+    def results(self):
+        """Finished images as {name: ppm bytes}, newest per chart"""
+        with self._cond:
+            results, self._results = self._results, {}
+            return results
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        try:
+            self.charts = self.create_charts()
+        except Exception as e:
+            self.metrics.record_error("create_charts", e)
+            return
+        while True:
+            with self._cond:
+                while not self._requests and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                requests, self._requests = self._requests, {}
+            for name, (data, size) in requests.items():
+                started = time.perf_counter()
+                try:
+                    image = self.charts[name].render(data, size)
+                except Exception as e:
+                    self.metrics.record_error(f"render_{name}", e)
+                    continue
+                with self._cond:
+                    if name in self._results:
+                        self.dropped += 1
+                    self._results[name] = image
+                    self.rendered += 1
+                    self.render_seconds[name] = time.perf_counter() - started
+                self._render_timer.observe(self.render_seconds[name], name)
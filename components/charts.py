@@ -0,0 +1,298 @@
+# components/charts.py
+# Charts are drawn on off-screen Agg figures, so they can be rendered on a
+# worker thread (see components/chart_renderer.py). Only the chart renderer
+# imports this module, which keeps matplotlib out of application startup;
+# pyplot is not used at all.
+from datetime import datetime
+
+import matplotlib
+import matplotlib.style
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+from components.visualizations import COLORS, ANOMALY_COLOR, TIER_LABELS, lttb
+
+# Size and resolution of a chart before its widget has been laid out
+DEFAULT_SIZE = (800, 400)
+DPI = 100
+
+
+def create_charts(max_bars=120):
+    """The charts the renderer draws, by name"""
+    matplotlib.style.use('dark_background')
+    return {"protocol": ProtocolChart(), "traffic": TrafficChart(max_bars),
+            "distribution": DistributionChart()}
+
+
+class OffscreenChart:
+    """A figure with its own Agg canvas, not registered with pyplot"""
+
+    def __init__(self):
+        self.fig = Figure(figsize=(DEFAULT_SIZE[0] / DPI, DEFAULT_SIZE[1] / DPI), dpi=DPI,
+                          facecolor=COLORS["bg_light"])
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.ax.set_facecolor(COLORS["bg_light"])
+        self.ax.title.set_color(COLORS["accent"])
+        self.ax.tick_params(colors=COLORS["text_secondary"])
+
+    def resize(self, size):
+        """Match the figure to a widget size in pixels; True if it changed"""
+        width, height = size if size[0] > 1 and size[1] > 1 else DEFAULT_SIZE
+        if (width, height) == tuple(self.canvas.get_width_height()):
+            return False
+        self.fig.set_size_inches(width / DPI, height / DPI)
+        return True
+
+    def render(self, data, size):
+        """Draw ``data`` at ``size`` and return the image as binary PPM"""
+        self.resize(size)
+        self.draw(data)
+        return self.image()
+
+    def image(self):
+        rgba = np.asarray(self.canvas.buffer_rgba())
+        height, width = rgba.shape[:2]
+        return b'P6 %d %d 255\n' % (width, height) + rgba[:, :, :3].tobytes()
+
+
+class ProtocolChart(OffscreenChart):
+    """Pie chart of the protocol distribution"""
+
+    def draw(self, protocol_counts):
+        ax = self.ax
+        ax.clear()
+        
+        if not protocol_counts:
+            ax.text(0.5, 0.5, 'No data available', 
+                    horizontalalignment='center', verticalalignment='center',
+                    color=COLORS["text_secondary"], fontsize=12)
+            ax.set_frame_on(False)
+        else:
+            labels, values = zip(*protocol_counts.items())
+            
+            # Create a color palette
+            colors = matplotlib.colormaps['Set3'](np.linspace(0, 1, len(labels)))
+            
+            # Explode the largest slice
+            max_idx = values.index(max(values))
+            explode = [0.1 if i == max_idx else 0 for i in range(len(labels))]
+            
+            wedges, texts, autotexts = ax.pie(
+                values, 
+                labels=labels, 
+                autopct='%1.1f%%',
+                startangle=90,
+                colors=colors,
+                explode=explode,
+                shadow=True
+            )
+            
+            # Style the text
+            for text in texts:
+                text.set_color(COLORS["text"])
+                text.set_fontweight('bold')
+                
+            for autotext in autotexts:
+                autotext.set_color(COLORS["bg_dark"])
+                autotext.set_fontweight('bold')
+            
+            ax.set_title('Protocol Distribution', color=COLORS["accent"], fontweight='bold', fontsize=12)
+            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+
+        self.canvas.draw()
+
+
+class TrafficChart(OffscreenChart):
+    """Packets-per-interval chart that is updated in place, with intervals
+    flagged by the anomaly detector shaded behind the data.
+
+    A window with up to ``max_bars`` bins is drawn as bars; a longer one as
+    a line over a filled area, downsampled with LTTB to about one point per
+    two pixels, so drawing cost follows the chart width rather than the
+    capture length. The bars, area and line are animated artists: a refresh
+    restores the cached axes background and redraws just them. A full draw
+    (ticks, labels, layout) happens only when the window, the rollup tier
+    or the y range changes.
+    """
+
+    def __init__(self, max_bars=120):
+        super().__init__()
+        self.max_bars = max_bars
+        self.background = None
+        self._layout = None
+        self._ymax = 0
+        self._setup_axes()
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _setup_axes(self):
+        ax = self.ax
+        # Anomaly shading spans the full height, behind the data
+        self.highlights = PolyCollection([], facecolors=ANOMALY_COLOR, edgecolors='none',
+                                         alpha=0.35, animated=True)
+        ax.add_collection(self.highlights)
+        # All bars (or the area under the line) are one collection so a
+        # refresh is a single draw call
+        self.bars = PolyCollection([], alpha=0.8, edgecolors=COLORS["accent"], linewidths=1,
+                                   animated=True)
+        ax.add_collection(self.bars)
+        self.line, = ax.plot([], [], color=COLORS["accent"], linewidth=2, animated=True)
+        self.empty_text = ax.text(0.5, 0.5, 'No data available', transform=ax.transAxes,
+                                  horizontalalignment='center', verticalalignment='center',
+                                  color=COLORS["text_secondary"], fontsize=12)
+
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=10))
+        ax.xaxis.set_major_formatter(FuncFormatter(self._format_time))
+        ax.tick_params(axis='x', labelrotation=45, colors=COLORS["text_secondary"])
+        ax.tick_params(axis='y', colors=COLORS["text_secondary"])
+        ax.set_title('Network Traffic Over Time', color=COLORS["accent"], fontweight='bold', fontsize=12)
+        ax.grid(True, alpha=0.3, color=COLORS["border"])
+        for spine in ax.spines.values():
+            spine.set_color(COLORS["border"])
+        ax.set_ylim(0, 1)
+
+    @staticmethod
+    def _bar_vertices(left, width, heights):
+        """Rectangle corners for bars of the given heights and left edges"""
+        verts = np.empty((len(heights), 4, 2))
+        verts[:, :, 0] = np.asarray(left, dtype=np.float64)[:, None] + np.array([0, 0, 1, 1]) * width
+        verts[:, 0, 1] = verts[:, 3, 1] = 0
+        verts[:, 1, 1] = verts[:, 2, 1] = heights
+        return verts
+
+    def _format_time(self, value, _pos):
+        start, end = self.ax.get_xlim()
+        pattern = '%H:%M:%S' if end - start <= 86400 else '%m-%d %H:%M'
+        return datetime.fromtimestamp(value).strftime(pattern)
+
+    def _on_draw(self, event):
+        """Cache the static background after any full draw, then overlay the data"""
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        self.ax.draw_artist(self.highlights)
+        self.ax.draw_artist(self.bars)
+        self.ax.draw_artist(self.line)
+
+    def _clear(self):
+        self._layout = None
+        self._ymax = 0
+        self.bars.set_verts([])
+        self.line.set_data([], [])
+        self.highlights.set_verts([])
+        self.empty_text.set_visible(True)
+
+    @staticmethod
+    def _nice_limit(value):
+        """Round a y limit up to 1, 2 or 5 times a power of ten"""
+        magnitude = 10 ** np.floor(np.log10(max(value, 1)))
+        for step in (1, 2, 5, 10):
+            if value <= step * magnitude:
+                return step * magnitude
+        return 10 * magnitude
+
+    def render(self, snapshot, size):
+        """Draw a ``Visualizations.traffic_snapshot``, blitting when the layout is unchanged"""
+        full_draw = self.resize(size) or self.background is None
+        if snapshot is None:
+            if not self.empty_text.get_visible() or full_draw:
+                self._clear()
+                self.canvas.draw()
+            return self.image()
+
+        start, end, seconds, times, counts, spans = snapshot
+        full_draw = full_draw or self.empty_text.get_visible()
+        self.empty_text.set_visible(False)
+        if (start, end, seconds) != self._layout:
+            self._layout = (start, end, seconds)
+            self.ax.set_xlim(start, end)
+            self.ax.set_ylabel(f'Packets per {TIER_LABELS.get(seconds, f"{seconds} s")}',
+                               color=COLORS["text_secondary"], fontweight='bold')
+            full_draw = True
+
+        peak = int(counts.max()) if len(counts) else 0
+        # Grow the y range with headroom; shrink it only when it is far too tall
+        if peak * 1.05 > self._ymax or peak < self._ymax / 4:
+            self._ymax = self._nice_limit(peak * 1.2)
+            self.ax.set_ylim(0, self._ymax)
+            full_draw = True
+
+        bins_in_window = (end - start) / seconds
+        if bins_in_window <= self.max_bars:
+            self.bars.set_verts(self._bar_vertices(times + seconds * 0.1, seconds * 0.8, counts))
+            self.bars.set_facecolors(matplotlib.colormaps['viridis'](counts / max(peak, 1)))
+            # The line joins the bins that have packets, skipping empty ones
+            used = np.flatnonzero(counts)
+            self.line.set_data(times[used] + seconds / 2, counts[used])
+            self.line.set_marker('o')
+        else:
+            width = self.canvas.get_width_height()[0]
+            x, y = lttb(times + seconds / 2, counts.astype(np.float64), max(width // 2, 3))
+            area = np.column_stack([np.r_[x[:1], x, x[-1:]], np.r_[0, y, 0]]) if len(x) else np.zeros((0, 2))
+            self.bars.set_verts([area])
+            self.bars.set_facecolors([COLORS["accent_dark"]])
+            self.line.set_data(x, y)
+            self.line.set_marker('')
+        if spans:
+            lefts = np.array([a for a, _ in spans])
+            widths = np.array([b - a for a, b in spans])
+            verts = self._bar_vertices(lefts, 1, np.full(len(spans), self._ymax))
+            verts[:, 2:, 0] = (lefts + widths)[:, None]
+            self.highlights.set_verts(verts)
+        else:
+            self.highlights.set_verts([])
+
+        if full_draw:
+            self.fig.tight_layout()
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_artists()
+        return self.image()
+
+
+class DistributionChart(OffscreenChart):
+    """Packet size and inter-arrival time histograms on logarithmic axes.
+
+    Drawn from ``StreamingStatistics.distributions``: each bar is one
+    quantile sketch bucket, with the percentile values marked.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.fig.clear()
+        self.size_ax, self.gap_ax = self.fig.subplots(1, 2)
+
+    def draw(self, distributions):
+        panels = ((self.size_ax, 'size', 'Packet Size', 'Bytes'),
+                  (self.gap_ax, 'inter_arrival', 'Inter-arrival Time', 'Seconds'))
+        for ax, key, title, xlabel in panels:
+            ax.clear()
+            ax.set_facecolor(COLORS["bg_light"])
+            ax.tick_params(colors=COLORS["text_secondary"])
+            for spine in ax.spines.values():
+                spine.set_color(COLORS["border"])
+            ax.set_title(title, color=COLORS["accent"], fontweight='bold', fontsize=12)
+            lower, upper, counts = distributions[key][:3] if distributions else ((), (), ())
+            if not len(counts):
+                ax.text(0.5, 0.5, 'No data available', transform=ax.transAxes,
+                        horizontalalignment='center', verticalalignment='center',
+                        color=COLORS["text_secondary"], fontsize=12)
+                continue
+            # Buckets are contiguous, so one stairs artist draws them all
+            ax.stairs(counts, np.append(lower, upper[-1]), fill=True, color=COLORS["accent"], alpha=0.8)
+            ax.set_xscale('log')
+            ax.set_xlabel(xlabel, color=COLORS["text_secondary"])
+            ax.set_ylabel('Packets', color=COLORS["text_secondary"])
+            ax.grid(True, alpha=0.3, color=COLORS["border"])
+            for q, value in zip(distributions['percentiles'], distributions[key][3]):
+                if value > 0:
+                    ax.axvline(value, color=ANOMALY_COLOR, linestyle='--', linewidth=1)
+                    ax.text(value, 0.98, f' p{q * 100:g}', transform=ax.get_xaxis_transform(),
+                            color=COLORS["text"], fontsize=8, verticalalignment='top')
+        self.fig.tight_layout()
+        self.canvas.draw()
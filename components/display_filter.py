@@ -0,0 +1,563 @@
+# components/display_filter.py
+# Wireshark-style display filters. An expression is parsed once into an AST
+# and compiled into a predicate over packet store columns, so filtering runs
+# as NumPy operations over whole chunks instead of a Python loop per packet.
+#
+# Examples:
+#   ip.src == 192.168.1.5 && tcp.flags.syn && size > 1500
+#   ip.addr == 10.0.0.0/8 and not dns
+#   tcp.dstport in {80 443 8080} || udp.port == 53
+#   frame.time >= "2026-10-16 09:00" && frame.time < "2026-10-16 09:05"
+import re
+from datetime import datetime
+
+import numpy as np
+
+from components.stats_engine import StreamingStatistics, STATS_COLUMNS
+from utils.constants import (
+    FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_PORT, FIELD_DST_PORT, FIELD_TCP_FLAGS,
+    FIELD_ICMP_TYPE, FIELD_SRC_INTERNED, FIELD_DST_INTERNED,
+    TCP_FIN, TCP_SYN, TCP_RST, TCP_PSH, TCP_ACK, TCP_URG
+)
+from utils.helpers import ip_to_int
+
+
+class DisplayFilterError(ValueError):
+    """Raised for display filter expressions that can't be compiled"""
+
+
+# Protocol keywords and the stored protocol names they match. Application
+# protocols recorded by name still count as their transport.
+PROTOCOL_GROUPS = {
+    'tcp': {'TCP', 'HTTP', 'HTTPS', 'SSH', 'FTP'},
+    'udp': {'UDP', 'DNS'},
+    'icmp': {'ICMP'},
+    'icmpv6': {'ICMPv6'},
+    'http': {'HTTP'},
+    'https': {'HTTPS'},
+    'tls': {'HTTPS'},
+    'dns': {'DNS'},
+    'ssh': {'SSH'},
+    'ftp': {'FTP'},
+}
+
+TCP_FLAG_FIELDS = {
+    'tcp.flags.fin': TCP_FIN,
+    'tcp.flags.syn': TCP_SYN,
+    'tcp.flags.reset': TCP_RST,
+    'tcp.flags.rst': TCP_RST,
+    'tcp.flags.push': TCP_PSH,
+    'tcp.flags.psh': TCP_PSH,
+    'tcp.flags.ack': TCP_ACK,
+    'tcp.flags.urg': TCP_URG,
+}
+
+# Numeric fields: name -> (column, presence bit or 0, protocol group or None)
+NUMERIC_FIELDS = {
+    'frame.len': ('size', 0, None),
+    'size': ('size', 0, None),
+    'len': ('size', 0, None),
+    'frame.time': ('timestamp', 0, None),
+    'tcp.flags': ('tcp_flags', FIELD_TCP_FLAGS, 'tcp'),
+    'icmp.type': ('icmp_type', FIELD_ICMP_TYPE, None),
+    'tcp.srcport': ('src_port', FIELD_SRC_PORT, 'tcp'),
+    'tcp.dstport': ('dst_port', FIELD_DST_PORT, 'tcp'),
+    'udp.srcport': ('src_port', FIELD_SRC_PORT, 'udp'),
+    'udp.dstport': ('dst_port', FIELD_DST_PORT, 'udp'),
+    'srcport': ('src_port', FIELD_SRC_PORT, None),
+    'dstport': ('dst_port', FIELD_DST_PORT, None),
+}
+
+# Fields that match if either of two columns does
+EITHER_FIELDS = {
+    'tcp.port': ('tcp.srcport', 'tcp.dstport'),
+    'udp.port': ('udp.srcport', 'udp.dstport'),
+    'port': ('srcport', 'dstport'),
+    'ip.addr': ('ip.src', 'ip.dst'),
+}
+
+ADDRESS_FIELDS = {
+    'ip.src': ('src_ip', FIELD_SRC_IP, FIELD_SRC_INTERNED),
+    'ip.dst': ('dst_ip', FIELD_DST_IP, FIELD_DST_INTERNED),
+}
+
+STRING_FIELDS = {'protocol', 'proto', 'frame.protocols'}
+
+# Columns a compiled filter may read
+FILTER_COLUMNS = ('timestamp', 'size', 'src_ip', 'dst_ip', 'src_port', 'dst_port',
+                  'protocol', 'tcp_flags', 'icmp_type', 'fields')
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<op>==|!=|<=|>=|&&|\|\||[<>!(){},])
+    | "(?P<string>[^"]*)"
+    | (?P<word>[A-Za-z0-9_.:/\-]+)
+    )""", re.VERBOSE)
+
+_WORD_OPERATORS = {
+    'and': '&&', 'or': '||', 'not': '!',
+    'eq': '==', 'ne': '!=', 'lt': '<', 'gt': '>', 'le': '<=', 'ge': '>=',
+}
+_COMPARISONS = ('==', '!=', '<', '>', '<=', '>=')
+
+
+def tokenize(expression):
+    tokens = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match:
+            raise DisplayFilterError(f"unexpected character '{expression[pos:].lstrip()[0]}'")
+        pos = match.end()
+        if match.group('op'):
+            tokens.append(('op', match.group('op')))
+        elif match.group('string') is not None:
+            tokens.append(('value', match.group('string')))
+        else:
+            word = match.group('word')
+            if word.lower() in _WORD_OPERATORS:
+                tokens.append(('op', _WORD_OPERATORS[word.lower()]))
+            elif word.lower() == 'in':
+                tokens.append(('op', 'in'))
+            else:
+                tokens.append(('word', word))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        if self.pos >= len(self.tokens):
+            raise DisplayFilterError("unexpected end of filter")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise DisplayFilterError(f"unexpected '{self.tokens[self.pos][1]}'")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == ('op', '||'):
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() == ('op', '&&'):
+            self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() == ('op', '!'):
+            self.take()
+            return ('not', self.parse_not())
+        if self.peek() == ('op', '('):
+            self.take()
+            node = self.parse_or()
+            if self.take() != ('op', ')'):
+                raise DisplayFilterError("missing ')'")
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        kind, field = self.take()
+        if kind != 'word':
+            raise DisplayFilterError(f"expected a field name, got '{field}'")
+        field = field.lower()
+        kind, op = self.peek()
+        if kind == 'op' and op in _COMPARISONS:
+            self.take()
+            return ('cmp', field, op, self.take_value())
+        if (kind, op) == ('op', 'in'):
+            self.take()
+            if self.take() != ('op', '{'):
+                raise DisplayFilterError("expected '{' after 'in'")
+            values = []
+            while self.peek() != ('op', '}'):
+                if self.peek() == ('op', ','):
+                    self.take()
+                    continue
+                values.append(self.take_value())
+            self.take()
+            if not values:
+                raise DisplayFilterError("empty set after 'in'")
+            return ('in', field, values)
+        return ('exists', field)
+
+    def take_value(self):
+        kind, value = self.take()
+        if kind not in ('word', 'value'):
+            raise DisplayFilterError(f"expected a value, got '{value}'")
+        return value
+
+
+def parse(expression):
+    """Parse a display filter into an AST of nested tuples"""
+    tokens = tokenize(expression)
+    if not tokens:
+        raise DisplayFilterError("empty filter")
+    return _Parser(tokens).parse()
+
+
+# -- Compilation -----------------------------------------------------------
+# Each AST node compiles to a function (cols, store) -> boolean array, where
+# cols maps column names to equal-length arrays for a batch of rows.
+
+def _number(value):
+    try:
+        return int(value, 0)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            raise DisplayFilterError(f"'{value}' is not a number") from None
+
+
+def _time(value):
+    """A capture time given as epoch seconds or a local ISO date and time"""
+    try:
+        return _number(value)
+    except DisplayFilterError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise DisplayFilterError(f"'{value}' is not a time") from None
+
+
+def _compare(array, op, value):
+    if op == '==':
+        return array == value
+    if op == '!=':
+        return array != value
+    if op == '<':
+        return array < value
+    if op == '>':
+        return array > value
+    if op == '<=':
+        return array <= value
+    return array >= value
+
+
+def _protocol_mask(group):
+    names = PROTOCOL_GROUPS[group]
+
+    def predicate(cols, store):
+        codes = [code for code, name in enumerate(store.protocol_names) if name in names]
+        return np.isin(cols['protocol'], codes)
+    return predicate
+
+
+def _numeric(field, op, value):
+    column, bit, group = NUMERIC_FIELDS[field]
+    number = _time(value) if column == 'timestamp' else _number(value)
+    in_group = _protocol_mask(group) if group else None
+
+    def predicate(cols, store):
+        mask = _compare(cols[column], op, number)
+        if bit:
+            mask &= (cols['fields'] & bit) != 0
+        if in_group is not None:
+            mask &= in_group(cols, store)
+        return mask
+    return predicate
+
+
+def _address(field, value):
+    """Equality test of an address column against an address or IPv4 network"""
+    column, present, interned = ADDRESS_FIELDS[field]
+    address, _, bits = value.partition('/')
+    packed = ip_to_int(address)
+    if packed is not None:
+        prefix = int(bits) if bits else 32
+        if not 0 <= prefix <= 32:
+            raise DisplayFilterError(f"invalid prefix length in '{value}'")
+        mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+        network = packed & mask
+
+        def predicate(cols, store):
+            flags = cols['fields']
+            return (((flags & present) != 0) & ((flags & interned) == 0)
+                    & ((cols[column] & np.uint32(mask)) == np.uint32(network)))
+        return predicate
+
+    if bits or ':' not in address:
+        raise DisplayFilterError(f"'{value}' is not an IP address")
+
+    def predicate(cols, store):
+        code = store.address_codes().get(address)
+        if code is None:
+            return np.zeros(len(cols[column]), dtype=bool)
+        flags = cols['fields']
+        return ((flags & interned) != 0) & (cols[column] == code)
+    return predicate
+
+
+def _protocol_name(op, value):
+    if op not in ('==', '!='):
+        raise DisplayFilterError("protocol can only be compared with == or !=")
+    wanted = value.lower()
+
+    def predicate(cols, store):
+        codes = [code for code, name in enumerate(store.protocol_names) if name.lower() == wanted]
+        mask = np.isin(cols['protocol'], codes)
+        return mask if op == '==' else ~mask
+    return predicate
+
+
+def _exists(field):
+    if field in PROTOCOL_GROUPS:
+        return _protocol_mask(field)
+    if field in TCP_FLAG_FIELDS:
+        bit = TCP_FLAG_FIELDS[field]
+        in_tcp = _protocol_mask('tcp')
+        return lambda cols, store: (((cols['fields'] & FIELD_TCP_FLAGS) != 0)
+                                    & ((cols['tcp_flags'] & bit) != 0) & in_tcp(cols, store))
+    if field == 'ip':
+        return lambda cols, store: (((cols['fields'] & FIELD_SRC_IP) != 0)
+                                    & ((cols['fields'] & FIELD_SRC_INTERNED) == 0))
+    if field == 'ipv6':
+        def predicate(cols, store):
+            codes = [code for address, code in store.address_codes().items() if ':' in address]
+            return ((cols['fields'] & FIELD_SRC_INTERNED) != 0) & np.isin(cols['src_ip'], codes)
+        return predicate
+    if field in ADDRESS_FIELDS:
+        bit = ADDRESS_FIELDS[field][1]
+        return lambda cols, store: (cols['fields'] & bit) != 0
+    if field in NUMERIC_FIELDS:
+        column, bit, group = NUMERIC_FIELDS[field]
+        if not bit:
+            return lambda cols, store: np.ones(len(cols[column]), dtype=bool)
+        in_group = _protocol_mask(group) if group else None
+        return lambda cols, store: (((cols['fields'] & bit) != 0)
+                                    & (in_group(cols, store) if in_group else True))
+    if field in EITHER_FIELDS:
+        first, second = (_exists(name) for name in EITHER_FIELDS[field])
+        return lambda cols, store: first(cols, store) | second(cols, store)
+    raise DisplayFilterError(f"unknown field '{field}'")
+
+
+def _comparison(field, op, value):
+    if field in EITHER_FIELDS:
+        first, second = (_comparison(name, '==' if op == '!=' else op, value)
+                         for name in EITHER_FIELDS[field])
+        # "ip.addr != x" means neither address is x
+        if op == '!=':
+            return lambda cols, store: ~(first(cols, store) | second(cols, store))
+        return lambda cols, store: first(cols, store) | second(cols, store)
+    if field in ADDRESS_FIELDS:
+        if op not in ('==', '!='):
+            raise DisplayFilterError("addresses can only be compared with == or !=")
+        equal = _address(field, value)
+        if op == '!=':
+            return lambda cols, store: ~equal(cols, store)
+        return equal
+    if field in NUMERIC_FIELDS:
+        return _numeric(field, op, value)
+    if field in STRING_FIELDS:
+        return _protocol_name(op, value)
+    if field in TCP_FLAG_FIELDS:
+        flag = _exists(field)
+        expected = _number(value) != 0
+        if op not in ('==', '!='):
+            raise DisplayFilterError("flags can only be compared with == or !=")
+        if (op == '==') == expected:
+            return flag
+        return lambda cols, store: ~flag(cols, store)
+    raise DisplayFilterError(f"unknown field '{field}'")
+
+
+def _compile(node):
+    kind = node[0]
+    if kind == 'and':
+        left, right = _compile(node[1]), _compile(node[2])
+        return lambda cols, store: left(cols, store) & right(cols, store)
+    if kind == 'or':
+        left, right = _compile(node[1]), _compile(node[2])
+        return lambda cols, store: left(cols, store) | right(cols, store)
+    if kind == 'not':
+        inner = _compile(node[1])
+        return lambda cols, store: ~inner(cols, store)
+    if kind == 'exists':
+        return _exists(node[1])
+    if kind == 'in':
+        tests = [_comparison(node[1], '==', value) for value in node[2]]
+
+        def predicate(cols, store):
+            mask = tests[0](cols, store)
+            for test in tests[1:]:
+                mask = mask | test(cols, store)
+            return mask
+        return predicate
+    return _comparison(node[1], node[2], node[3])
+
+
+def _time_bounds(node):
+    """The (low, high) capture time every row matching ``node`` lies within"""
+    kind = node[0]
+    if kind in ('and', 'or'):
+        (low, high), (other_low, other_high) = _time_bounds(node[1]), _time_bounds(node[2])
+        if kind == 'and':
+            return max(low, other_low), min(high, other_high)
+        return min(low, other_low), max(high, other_high)
+    if kind == 'cmp' and NUMERIC_FIELDS.get(node[1], ('',))[0] == 'timestamp':
+        op, value = node[2], _time(node[3])
+        if op in ('>', '>='):
+            return value, np.inf
+        if op in ('<', '<='):
+            return -np.inf, value
+        if op == '==':
+            return value, value
+    return -np.inf, np.inf
+
+
+class DisplayFilter:
+    """A compiled display filter"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.ast = parse(expression)
+        self._predicate = _compile(self.ast)
+        # Filters that pin frame.time only need the rows in that window
+        self.time_bounds = _time_bounds(self.ast)
+
+    def evaluate(self, cols, store):
+        """Boolean mask for a batch of rows given as column arrays"""
+        mask = self._predicate(cols, store)
+        if np.ndim(mask) == 0:
+            mask = np.full(len(cols['timestamp']), bool(mask))
+        return mask
+
+    def matching_indices(self, store, start=0, stop=None):
+        """Indices of rows in [start, stop) of a store that match"""
+        low, high = self.time_bounds
+        if (low > -np.inf or high < np.inf) and hasattr(store, 'time_span'):
+            first, last = store.time_span(low, high)
+            stop = len(store) if stop is None else stop
+            start, stop = max(start, first), min(stop, last)
+            if start >= stop:
+                return np.empty(0, dtype=np.int64)
+        parts = []
+        offset = start
+        for cols in store.iter_chunks(FILTER_COLUMNS, start, stop):
+            parts.append(np.flatnonzero(self.evaluate(cols, store)) + offset)
+            offset += len(cols['timestamp'])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+
+class FilteredView:
+    """The rows of a PacketStore that match a display filter.
+
+    Offers the same read interface as the store (len, indexing, column
+    access), so the packet list, statistics and charts can use either.
+    New packets are filtered incrementally by ``refresh``. Matching is
+    cheap next to the statistics, so matched rows are only folded into the
+    view's own ``statistics`` by ``fold_statistics``, which the caller can
+    spread over several steps.
+    """
+
+    def __init__(self, store, display_filter):
+        self.store = store
+        self.filter = display_filter
+        self.indices = np.empty(0, dtype=np.int64)
+        self.statistics = StreamingStatistics()
+        self._filtered_upto = 0
+        # Leading rows of ``indices`` already folded into ``statistics``
+        self._folded = 0
+        self._column_cache = {}
+        self.refresh()
+
+    def refresh(self):
+        """Filter any packets appended to the store since the last refresh"""
+        count = len(self.store)
+        if count < self._filtered_upto:
+            # The store was cleared and refilled
+            self.indices = np.empty(0, dtype=np.int64)
+            self.statistics.reset()
+            self._filtered_upto = 0
+            self._folded = 0
+        if count > self._filtered_upto:
+            new = self.filter.matching_indices(self.store, self._filtered_upto, count)
+            if len(new):
+                self.indices = np.concatenate([self.indices, new])
+                self._column_cache.clear()
+            self._filtered_upto = count
+
+    @property
+    def statistics_pending(self):
+        """Matched rows not yet folded into ``statistics``"""
+        return len(self.indices) - self._folded
+
+    def fold_statistics(self, max_rows=None):
+        """Fold up to ``max_rows`` more matched rows into ``statistics``; returns how many"""
+        start = self._folded
+        stop = len(self.indices) if max_rows is None else min(len(self.indices), start + max_rows)
+        if stop <= start:
+            return 0
+        rows = self.indices[start:stop]
+        first, last = int(rows[0]), int(rows[-1]) + 1
+        rows = rows - first
+        self.statistics.update_columns(
+            {name: self.store.column(name, first, last)[rows] for name in STATS_COLUMNS}, self.store)
+        self._folded = stop
+        return stop - start
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __bool__(self):
+        return len(self.indices) > 0
+
+    def __getitem__(self, index):
+        return self.store[int(self.indices[index])]
+
+    def __iter__(self):
+        for index in self.indices.tolist():
+            yield self.store[index]
+
+    def store_index(self, index):
+        """Position in the underlying store of the view's ``index``-th row"""
+        return int(self.indices[index])
+
+    @property
+    def protocol_names(self):
+        return self.store.protocol_names
+
+    @property
+    def addresses(self):
+        return self.store.addresses
+
+    def format_address(self, value, interned):
+        return self.store.format_address(value, interned)
+
+    def address_codes(self):
+        return self.store.address_codes()
+
+    def column(self, name, start=0, stop=None):
+        cached = self._column_cache.get(name)
+        if cached is None:
+            if len(self.indices):
+                cached = self.store.column(name, 0, int(self.indices[-1]) + 1)[self.indices]
+            else:
+                cached = self.store.column(name, 0, 0)
+            self._column_cache[name] = cached
+        return cached[start:stop]
+
+    def columns(self, names=None):
+        names = names or FILTER_COLUMNS
+        return {name: self.column(name) for name in names}
@@ -0,0 +1,245 @@
+# components/dissector.py
+# Header parsing straight from raw frame bytes. Produces the same packet dicts
+# as the scapy capture path without building layer objects, using precompiled
+# struct formats over a memoryview so no bytes are copied. ``dissect`` returns
+# the raw header fields, which ``ColumnBuilder`` encodes straight into packet
+# store columns for bulk paths (file import, the decode pipeline).
+import socket
+import struct
+
+import numpy as np
+
+from models.packet_store import COLUMN_DTYPES
+from utils.constants import (
+    PROTOCOLS, FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_PORT, FIELD_DST_PORT,
+    FIELD_TCP_FLAGS, FIELD_ICMP_TYPE, FIELD_SRC_INTERNED, FIELD_DST_INTERNED
+)
+from utils.helpers import int_to_ip
+
+ETH_P_IP = 0x0800
+ETH_P_IPV6 = 0x86DD
+ETH_P_8021Q = 0x8100
+ETH_P_8021AD = 0x88A8
+
+# Link-layer header types (pcap LINKTYPE_* values)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+# Bytes before the IP header for link types without an ethertype to follow
+_LINK_HEADER_SIZES = {
+    LINKTYPE_RAW: 0,
+    LINKTYPE_IPV4: 0,
+    LINKTYPE_IPV6: 0,
+    LINKTYPE_LINUX_SLL: 16,
+    LINKTYPE_NULL: 4,
+}
+
+IPPROTO_ICMP = 1
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPPROTO_ICMPV6 = 58
+
+# IPv6 extension headers skipped to reach the transport header
+_IPV6_EXTENSION_HEADERS = {0, 43, 60}
+_IPV6_FRAGMENT = 44
+
+ETHERNET_HEADER = struct.Struct("!12xH")
+VLAN_TAG = struct.Struct("!HH")
+IPV4_HEADER = struct.Struct("!BBHHHBBHII")
+IPV6_HEADER = struct.Struct("!IHBB16s16s")
+IPV6_EXTENSION = struct.Struct("!BB")
+PORTS = struct.Struct("!HH")
+TCP_FLAGS = struct.Struct("!B")
+ICMP_TYPE = struct.Struct("!B")
+
+# dissect() result for a frame without an IP layer
+_NO_IP = ('Other', None, None, None, None, None, None)
+
+_PROTOCOL_CODES = {name: code for code, name in enumerate(PROTOCOLS)}
+
+
+def dissect(frame, linktype=LINKTYPE_ETHERNET):
+    """Decode a frame's headers without building a packet dict.
+
+    Returns (protocol, src, dst, src_port, dst_port, tcp_flags, icmp_type).
+    Addresses are packed ints for IPv4, 16-byte strings for IPv6 and None
+    without an IP layer; fields the frame doesn't carry are None.
+    """
+    buf = frame if isinstance(frame, memoryview) else memoryview(frame)
+    if linktype == LINKTYPE_ETHERNET:
+        if len(buf) < ETHERNET_HEADER.size:
+            return _NO_IP
+        ethertype = ETHERNET_HEADER.unpack_from(buf, 0)[0]
+        offset = ETHERNET_HEADER.size
+        while ethertype in (ETH_P_8021Q, ETH_P_8021AD) and len(buf) >= offset + VLAN_TAG.size:
+            ethertype = VLAN_TAG.unpack_from(buf, offset)[1]
+            offset += VLAN_TAG.size
+        if ethertype == ETH_P_IP:
+            return dissect_ipv4(buf, offset)
+        if ethertype == ETH_P_IPV6:
+            return dissect_ipv6(buf, offset)
+        return _NO_IP
+    offset = _LINK_HEADER_SIZES.get(linktype)
+    if offset is None or len(buf) <= offset:
+        return _NO_IP
+    version = buf[offset] >> 4
+    if version == 4:
+        return dissect_ipv4(buf, offset)
+    if version == 6:
+        return dissect_ipv6(buf, offset)
+    return _NO_IP
+
+
+def dissect_ipv4(buf, offset):
+    if len(buf) < offset + IPV4_HEADER.size:
+        return _NO_IP
+    version_ihl, _, _, _, frag, _, proto, _, src, dst = IPV4_HEADER.unpack_from(buf, offset)
+    if version_ihl >> 4 != 4:
+        return _NO_IP
+    # Only the first fragment carries the transport header
+    if frag & 0x1FFF:
+        return ('Other', src, dst, None, None, None, None)
+    return dissect_transport(buf, offset + (version_ihl & 0x0F) * 4, proto, src, dst)
+
+
+def dissect_ipv6(buf, offset):
+    if len(buf) < offset + IPV6_HEADER.size:
+        return _NO_IP
+    _, _, next_header, _, src, dst = IPV6_HEADER.unpack_from(buf, offset)
+    offset += IPV6_HEADER.size
+    while next_header in _IPV6_EXTENSION_HEADERS or next_header == _IPV6_FRAGMENT:
+        if len(buf) < offset + IPV6_EXTENSION.size:
+            return ('Other', src, dst, None, None, None, None)
+        following, length = IPV6_EXTENSION.unpack_from(buf, offset)
+        if next_header == _IPV6_FRAGMENT:
+            # Non-first fragments have no transport header
+            if len(buf) < offset + 4 or struct.unpack_from("!H", buf, offset + 2)[0] & 0xFFF8:
+                return ('Other', src, dst, None, None, None, None)
+            offset += 8
+        else:
+            offset += (length + 1) * 8
+        next_header = following
+    return dissect_transport(buf, offset, next_header, src, dst)
+
+
+def dissect_transport(buf, offset, proto, src, dst):
+    if proto == IPPROTO_TCP:
+        if len(buf) >= offset + 14:
+            src_port, dst_port = PORTS.unpack_from(buf, offset)
+            return ('TCP', src, dst, src_port, dst_port, TCP_FLAGS.unpack_from(buf, offset + 13)[0], None)
+        return ('TCP', src, dst, None, None, None, None)
+    if proto == IPPROTO_UDP:
+        if len(buf) >= offset + PORTS.size:
+            src_port, dst_port = PORTS.unpack_from(buf, offset)
+            return ('UDP', src, dst, src_port, dst_port, None, None)
+        return ('UDP', src, dst, None, None, None, None)
+    if proto in (IPPROTO_ICMP, IPPROTO_ICMPV6):
+        protocol = 'ICMP' if proto == IPPROTO_ICMP else 'ICMPv6'
+        icmp_type = ICMP_TYPE.unpack_from(buf, offset)[0] if len(buf) > offset else None
+        return (protocol, src, dst, None, None, None, icmp_type)
+    return ('Other', src, dst, None, None, None, None)
+
+
+def format_address(address):
+    """Text form of an address as ``dissect`` returns it"""
+    if address is None:
+        return 'N/A'
+    if isinstance(address, int):
+        return int_to_ip(address)
+    return socket.inet_ntop(socket.AF_INET6, address)
+
+
+def parse_packet(frame, timestamp, wire_len=None, linktype=LINKTYPE_ETHERNET):
+    """Decode a frame with the given link-layer header type into a packet dict"""
+    protocol, src, dst, src_port, dst_port, tcp_flags, icmp_type = dissect(frame, linktype)
+    packet = {
+        'timestamp': timestamp,
+        'size': wire_len if wire_len is not None else len(frame),
+        'src_ip': format_address(src),
+        'dst_ip': format_address(dst),
+        'protocol': protocol,
+    }
+    if src_port is not None:
+        packet['src_port'] = src_port
+        packet['dst_port'] = dst_port
+    if tcp_flags is not None:
+        packet['tcp_flags'] = tcp_flags
+    if icmp_type is not None:
+        packet['icmp_type'] = icmp_type
+    return packet
+
+
+def parse_frame(frame, timestamp, wire_len=None):
+    """Decode an Ethernet frame into a packet dict.
+
+    ``frame`` may be bytes or a memoryview into a capture buffer; it can be
+    truncated to the snap length, in which case ``wire_len`` gives the size
+    of the packet on the wire.
+    """
+    return parse_packet(frame, timestamp, wire_len, LINKTYPE_ETHERNET)
+
+
+def parse_frames(frames):
+    """Decode an iterable of (timestamp, frame) pairs, e.g. recorded frames"""
+    return [parse_frame(frame, timestamp) for timestamp, frame in frames]
+
+
+class ColumnBuilder:
+    """Dissected frames collected as packet store columns.
+
+    Encodes rows the way ``PacketStore.append`` does, without a store:
+    addresses the store has to intern (IPv6, or 'N/A' without an IP layer)
+    are left as 0 and listed in ``interned`` as (row, is_dst, address) for
+    ``PacketStore.intern_rows``.
+    """
+
+    def __init__(self):
+        self.values = {name: [] for name in COLUMN_DTYPES}
+        self.interned = []
+
+    def __len__(self):
+        return len(self.values['timestamp'])
+
+    def add(self, timestamp, size, dissected):
+        protocol, src, dst, src_port, dst_port, tcp_flags, icmp_type = dissected
+        values = self.values
+        row = len(values['timestamp'])
+        fields = FIELD_SRC_IP | FIELD_DST_IP
+        if type(src) is not int:
+            self.interned.append((row, False, format_address(src)))
+            src = 0
+            fields |= FIELD_SRC_INTERNED
+        if type(dst) is not int:
+            self.interned.append((row, True, format_address(dst)))
+            dst = 0
+            fields |= FIELD_DST_INTERNED
+        if src_port is not None:
+            fields |= FIELD_SRC_PORT | FIELD_DST_PORT
+        else:
+            src_port = dst_port = 0
+        if tcp_flags is not None:
+            fields |= FIELD_TCP_FLAGS
+        else:
+            tcp_flags = 0
+        if icmp_type is not None:
+            fields |= FIELD_ICMP_TYPE
+        else:
+            icmp_type = 0
+        values['timestamp'].append(timestamp)
+        values['size'].append(size)
+        values['src_ip'].append(src)
+        values['dst_ip'].append(dst)
+        values['src_port'].append(src_port)
+        values['dst_port'].append(dst_port)
+        values['protocol'].append(_PROTOCOL_CODES.get(protocol, 0))
+        values['tcp_flags'].append(tcp_flags)
+        values['icmp_type'].append(icmp_type)
+        values['fields'].append(fields)
+
+    def columns(self):
+        """The rows so far as {name: array}"""
+        return {name: np.array(values, dtype=COLUMN_DTYPES[name]) for name, values in self.values.items()}
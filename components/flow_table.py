@@ -0,0 +1,277 @@
+# components/flow_table.py
+# Bidirectional flow (conversation) table. Packets are grouped by their
+# 5-tuple with the two endpoints put in a canonical order, so both directions
+# of a connection land in the same flow. Batches of store-encoded columns are
+# aggregated with NumPy first; only one dict lookup per distinct flow in the
+# batch happens in Python.
+import threading
+
+import numpy as np
+
+from utils.constants import FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_INTERNED, FIELD_DST_INTERNED
+from utils.helpers import tcp_flag_list
+
+# Columns a flow update reads
+FLOW_COLUMNS = ('timestamp', 'size', 'src_ip', 'dst_ip', 'src_port', 'dst_port',
+                'protocol', 'tcp_flags', 'fields')
+
+# Why a flow left the active table
+END_IDLE = 1
+END_ACTIVE = 2
+END_OVERFLOW = 3
+END_REASONS = {0: "active", END_IDLE: "idle", END_ACTIVE: "active timeout", END_OVERFLOW: "evicted"}
+
+# Endpoints are packed as (address << 16 | port), where the address carries
+# the interned flag in bit 32 and a "no address" flag in bit 33. The "lo"
+# endpoint is the smaller of the two. Counters suffixed _lo went lo -> hi.
+FLOW_DTYPE = np.dtype([
+    ('lo', np.uint64),
+    ('hi', np.uint64),
+    ('protocol', np.uint8),
+    ('initiator_lo', np.bool_),
+    ('packets_lo', np.uint64),
+    ('packets_hi', np.uint64),
+    ('bytes_lo', np.uint64),
+    ('bytes_hi', np.uint64),
+    ('flags_lo', np.uint8),
+    ('flags_hi', np.uint8),
+    ('first_seen', np.float64),
+    ('last_seen', np.float64),
+    ('end_reason', np.uint8),
+])
+
+
+def endpoint_keys(cols):
+    """Packed (address, port) endpoints for the source and destination of each row"""
+    fields = cols['fields']
+    src = cols['src_ip'].astype(np.uint64)
+    src |= ((fields & FIELD_SRC_INTERNED) != 0).astype(np.uint64) << np.uint64(32)
+    src |= ((fields & FIELD_SRC_IP) == 0).astype(np.uint64) << np.uint64(33)
+    dst = cols['dst_ip'].astype(np.uint64)
+    dst |= ((fields & FIELD_DST_INTERNED) != 0).astype(np.uint64) << np.uint64(32)
+    dst |= ((fields & FIELD_DST_IP) == 0).astype(np.uint64) << np.uint64(33)
+    src = (src << np.uint64(16)) | cols['src_port'].astype(np.uint64)
+    dst = (dst << np.uint64(16)) | cols['dst_port'].astype(np.uint64)
+    return src, dst
+
+
+def split_endpoint(packed, store):
+    """(address label, port) for a packed endpoint"""
+    packed = int(packed)
+    address = packed >> 16
+    if address >> 33:
+        return 'N/A', packed & 0xFFFF
+    return store.format_address(address & 0xFFFFFFFF, address >> 32), packed & 0xFFFF
+
+
+class FlowTable:
+    """Active flows plus a bounded history of ended ones.
+
+    A flow ends when it has seen no packets for ``idle_timeout`` seconds or
+    has been open for ``active_timeout`` seconds (a long-lived connection
+    then continues as a new flow), both measured in capture time. If more
+    than ``max_flows`` are active, the least recently seen are evicted.
+    Ended flows are kept in a ring of ``max_ended`` records, so memory is
+    bounded by ``max_flows + max_ended`` rows whatever the traffic.
+    """
+
+    def __init__(self, idle_timeout=60.0, active_timeout=1800.0, max_flows=1_000_000,
+                 max_ended=100_000, sweep_interval=1.0):
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.max_flows = max_flows
+        self.max_ended = max_ended
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._flows = np.zeros(1024, dtype=FLOW_DTYPE)
+        self._in_use = np.zeros(1024, dtype=np.bool_)
+        self._slots = {}
+        self._slot_keys = [None] * 1024
+        self._free = list(range(1023, -1, -1))
+        self._ended = np.zeros(self.max_ended, dtype=FLOW_DTYPE)
+        self._ended_count = 0
+        self._ended_next = 0
+        self._last_sweep = None
+        self.evicted = {END_IDLE: 0, END_ACTIVE: 0, END_OVERFLOW: 0}
+
+    def __len__(self):
+        return len(self._slots)
+
+    @property
+    def ended_count(self):
+        return self._ended_count
+
+    def _grow(self):
+        size = len(self._flows)
+        self._flows = np.concatenate([self._flows, np.zeros(size, dtype=FLOW_DTYPE)])
+        self._in_use = np.concatenate([self._in_use, np.zeros(size, dtype=np.bool_)])
+        self._slot_keys.extend([None] * size)
+        self._free.extend(range(2 * size - 1, size - 1, -1))
+
+    def update(self, cols):
+        """Fold a batch of rows given as store-encoded columns into the table"""
+        with self._lock:
+            self._update(cols)
+
+    def _update(self, cols):
+        count = len(cols['timestamp'])
+        if not count:
+            return
+        src, dst = endpoint_keys(cols)
+        lo_to_hi = src <= dst
+        lo_key = np.where(lo_to_hi, src, dst)
+        # The protocol goes in the low byte of the hi key
+        hi_key = (np.where(lo_to_hi, dst, src) << np.uint64(8)) | cols['protocol'].astype(np.uint64)
+
+        # Group rows by flow; the sort is stable, so each group starts with
+        # its earliest row
+        order = np.lexsort((hi_key, lo_key))
+        lo_sorted, hi_sorted = lo_key[order], hi_key[order]
+        boundary = np.empty(count, dtype=np.bool_)
+        boundary[0] = True
+        boundary[1:] = (lo_sorted[1:] != lo_sorted[:-1]) | (hi_sorted[1:] != hi_sorted[:-1])
+        starts = np.flatnonzero(boundary)
+        unique_lo, unique_hi = lo_sorted[starts], hi_sorted[starts]
+        groups = len(starts)
+
+        forward = lo_to_hi[order]
+        sizes = cols['size'][order].astype(np.uint64)
+        timestamps = cols['timestamp'][order]
+        flags = cols['tcp_flags'][order]
+        zero_flags = np.zeros_like(flags)
+        packets_lo = np.add.reduceat(forward.astype(np.uint64), starts)
+        packets_hi = np.diff(np.append(starts, count)).astype(np.uint64) - packets_lo
+        bytes_lo = np.add.reduceat(np.where(forward, sizes, np.uint64(0)), starts)
+        bytes_hi = np.add.reduceat(sizes, starts) - bytes_lo
+        first_seen = np.minimum.reduceat(timestamps, starts)
+        last_seen = np.maximum.reduceat(timestamps, starts)
+        flags_lo = np.bitwise_or.reduceat(np.where(forward, flags, zero_flags), starts)
+        flags_hi = np.bitwise_or.reduceat(np.where(forward, zero_flags, flags), starts)
+
+        # Find or allocate a slot per distinct flow
+        slots = np.empty(groups, dtype=np.int64)
+        new = np.zeros(groups, dtype=np.bool_)
+        lookup = self._slots
+        for i, (lo, hi) in enumerate(zip(unique_lo.tolist(), unique_hi.tolist())):
+            key = (lo << 64) | hi
+            slot = lookup.get(key)
+            if slot is None:
+                if not self._free:
+                    self._grow()
+                slot = self._free.pop()
+                lookup[key] = slot
+                self._slot_keys[slot] = key
+                new[i] = True
+            slots[i] = slot
+
+        flows = self._flows
+        if new.any():
+            fresh = slots[new]
+            flows[fresh] = np.zeros(1, dtype=FLOW_DTYPE)
+            flows['lo'][fresh] = unique_lo[new]
+            flows['hi'][fresh] = unique_hi[new] >> np.uint64(8)
+            flows['protocol'][fresh] = (unique_hi[new] & np.uint64(0xFF)).astype(np.uint8)
+            # Whoever sent the first packet started the conversation
+            flows['initiator_lo'][fresh] = forward[starts[new]]
+            flows['first_seen'][fresh] = first_seen[new]
+            self._in_use[fresh] = True
+        flows['packets_lo'][slots] += packets_lo
+        flows['packets_hi'][slots] += packets_hi
+        flows['bytes_lo'][slots] += bytes_lo
+        flows['bytes_hi'][slots] += bytes_hi
+        flows['flags_lo'][slots] |= flags_lo
+        flows['flags_hi'][slots] |= flags_hi
+        flows['last_seen'][slots] = np.maximum(flows['last_seen'][slots], last_seen)
+
+        now = float(last_seen.max())
+        if self._last_sweep is None or now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+        if len(self._slots) > self.max_flows:
+            self._evict_oldest(len(self._slots) - self.max_flows)
+
+    def sweep(self, now):
+        """End flows that have gone idle or been open too long as of ``now``"""
+        with self._lock:
+            self._sweep(now)
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        idle = self._in_use & (now - self._flows['last_seen'] > self.idle_timeout)
+        too_long = self._in_use & ~idle & (now - self._flows['first_seen'] > self.active_timeout)
+        self._end(np.flatnonzero(idle), END_IDLE)
+        self._end(np.flatnonzero(too_long), END_ACTIVE)
+
+    def _evict_oldest(self, count):
+        used = np.flatnonzero(self._in_use)
+        oldest = np.argpartition(self._flows['last_seen'][used], count - 1)[:count]
+        self._end(used[oldest], END_OVERFLOW)
+
+    def _end(self, slots, reason):
+        """Move flows from the active table into the ring of ended flows"""
+        if not len(slots):
+            return
+        self.evicted[reason] += len(slots)
+        records = self._flows[slots]
+        records['end_reason'] = reason
+        # Only the newest max_ended records can survive in the ring
+        records = records[-self.max_ended:]
+        positions = (self._ended_next + np.arange(len(records))) % self.max_ended
+        self._ended[positions] = records
+        self._ended_next = int(positions[-1] + 1) % self.max_ended
+        self._ended_count = min(self._ended_count + len(records), self.max_ended)
+
+        self._in_use[slots] = False
+        for slot in slots.tolist():
+            del self._slots[self._slot_keys[slot]]
+            self._slot_keys[slot] = None
+            self._free.append(slot)
+
+    def flows(self, include_ended=True):
+        """Copy of the active flows, optionally followed by the ended ones"""
+        with self._lock:
+            active = self._flows[self._in_use]
+            if not include_ended:
+                return active
+            return np.concatenate([active, self._ended[:self._ended_count]])
+
+    def top(self, count=200, by='bytes', include_ended=True):
+        """The ``count`` largest flows by total 'bytes' or 'packets', largest first"""
+        flows = self.flows(include_ended)
+        totals = flows[f'{by}_lo'] + flows[f'{by}_hi']
+        if len(flows) > count:
+            keep = np.argpartition(totals, len(flows) - count)[len(flows) - count:]
+            flows, totals = flows[keep], totals[keep]
+        return flows[np.argsort(totals, kind='stable')[::-1]]
+
+    @staticmethod
+    def describe(flow, store):
+        """Format one flow record for display, oriented initiator -> responder"""
+        lo, hi = split_endpoint(flow['lo'], store), split_endpoint(flow['hi'], store)
+        if flow['initiator_lo']:
+            a, b, dirs = lo, hi, ('lo', 'hi')
+        else:
+            a, b, dirs = hi, lo, ('hi', 'lo')
+        protocol = int(flow['protocol'])
+        return {
+            'src_ip': a[0], 'src_port': a[1],
+            'dst_ip': b[0], 'dst_port': b[1],
+            'protocol': store.protocol_names[protocol] if protocol < len(store.protocol_names) else 'Other',
+            'packets': int(flow['packets_lo'] + flow['packets_hi']),
+            'bytes': int(flow['bytes_lo'] + flow['bytes_hi']),
+            'packets_ab': int(flow[f'packets_{dirs[0]}']),
+            'packets_ba': int(flow[f'packets_{dirs[1]}']),
+            'bytes_ab': int(flow[f'bytes_{dirs[0]}']),
+            'bytes_ba': int(flow[f'bytes_{dirs[1]}']),
+            'flags_ab': tcp_flag_list(int(flow[f'flags_{dirs[0]}'])),
+            'flags_ba': tcp_flag_list(int(flow[f'flags_{dirs[1]}'])),
+            'first_seen': float(flow['first_seen']),
+            'last_seen': float(flow['last_seen']),
+            'state': END_REASONS[int(flow['end_reason'])],
+        }
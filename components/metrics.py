@@ -0,0 +1,310 @@
+# components/metrics.py
+# Self-instrumentation: counters, gauges and timers for the analyzer's own
+# hot paths, cheap enough to leave on. Hot paths only bump a number or
+# append a duration to a ring; quantiles are worked out when someone looks.
+# Many metrics just read a counter some component already keeps (queue
+# depth, pipeline stage counts), so they cost nothing until collected.
+# A Metrics registry renders as Prometheus text, which MetricsServer
+# serves over HTTP on localhost.
+import os
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DEFAULT_PREFIX = "sniffviz"
+DEFAULT_METRICS_PORT = 9464
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+COUNTER = "counter"
+GAUGE = "gauge"
+SUMMARY = "summary"
+
+# Durations kept per timer series for its quantiles
+TIMER_WINDOW = 1024
+QUANTILES = (0.5, 0.99)
+
+
+def process_memory():
+    """Resident set size of this process in bytes (the peak where the current size isn't available)"""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _label_text(label, value, extra=""):
+    if label is None:
+        return "{" + extra + "}" if extra else ""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    pair = f'{label}="{escaped}"'
+    return "{" + (pair + "," + extra if extra else pair) + "}"
+
+
+def _number(value):
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named counter or gauge, optionally split by one label.
+
+    Values are either kept here (``inc`` / ``set``) or, when ``read`` is
+    given, read on collection: ``read()`` returns a number, or with a
+    ``label`` a {label value: number} mapping.
+    """
+
+    def __init__(self, name, help, kind, label=None, read=None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label = label
+        self.read = read
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, key=None):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, key=None):
+        self._values[key] = value
+
+    def values(self):
+        """{label value (None without a label): number}"""
+        if self.read is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.read()
+        return value if self.label is not None else {None: value}
+
+
+class _TimerSeries:
+    __slots__ = ("count", "total", "maximum", "last", "samples", "position")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.last = 0.0
+        self.samples = np.zeros(window)
+        self.position = 0
+
+
+class _Timing:
+    """Context manager that observes its block's duration"""
+
+    __slots__ = ("timer", "key", "started")
+
+    def __init__(self, timer, key):
+        self.timer = timer
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.observe(time.perf_counter() - self.started, self.key)
+
+
+class Timer:
+    """Durations in seconds, exported as a Prometheus summary.
+
+    Keeps a count, sum and maximum per label value, plus the last
+    ``window`` durations for p50/p99.
+    """
+
+    kind = SUMMARY
+
+    def __init__(self, name, help, label=None, window=TIMER_WINDOW):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.window = window
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def time(self, key=None):
+        return _Timing(self, key)
+
+    def observe(self, seconds, key=None):
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _TimerSeries(self.window)
+            series.count += 1
+            series.total += seconds
+            series.last = seconds
+            if seconds > series.maximum:
+                series.maximum = seconds
+            series.samples[series.position % self.window] = seconds
+            series.position += 1
+
+    def stats(self):
+        """{label value: {count, sum, max, last, p50, p99}}"""
+        with self._lock:
+            series = [(key, s.count, s.total, s.maximum, s.last, s.samples[:min(s.position, self.window)].copy())
+                      for key, s in self._series.items()]
+        result = {}
+        for key, count, total, maximum, last, samples in series:
+            p50, p99 = np.quantile(samples, QUANTILES) if len(samples) else (0.0, 0.0)
+            result[key] = {"count": count, "sum": total, "max": maximum, "last": last,
+                           "p50": float(p50), "p99": float(p99)}
+        return result
+
+
+class Metrics:
+    """Registry of the metrics one capture session reports.
+
+    Names are registered without the prefix and exported with it, e.g.
+    ``stage_seconds`` becomes ``sniffviz_stage_seconds``. Registering a
+    name again returns the existing metric.
+    """
+
+    def __init__(self, prefix=DEFAULT_PREFIX, max_errors=100):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.errors = deque(maxlen=max_errors)
+        self.error_counter = self.counter("errors_total", "Errors caught in the analyzer, by where they happened",
+                                          label="stage")
+        self.gauge("uptime_seconds", "Seconds since the analyzer started", read=self._uptime)
+        self.gauge("process_resident_bytes", "Resident memory of the analyzer process", read=process_memory)
+        self._started = time.monotonic()
+
+    def _register(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name, help, label=None, read=None):
+        return self._register(name, lambda: Metric(name, help, COUNTER, label, read))
+
+    def gauge(self, name, help, label=None, read=None):
+        return self._register(name, lambda: Metric(name, help, GAUGE, label, read))
+
+    def timer(self, name, help, label=None, window=TIMER_WINDOW):
+        return self._register(name, lambda: Timer(name, help, label, window))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def _uptime(self):
+        return round(time.monotonic() - self._started, 3)
+
+    def record_error(self, stage, error):
+        """Count an error caught in ``stage`` and keep its message for the diagnostics"""
+        message = f"Error in {stage}: {error}"
+        self.error_counter.inc(key=stage)
+        self.errors.append((time.time(), stage, str(error)))
+        print(message, file=sys.stderr)
+
+    def collect(self):
+        """(metric, values) for every metric; values as each metric's ``values`` or ``stats``"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        collected = []
+        for metric in metrics:
+            try:
+                values = metric.stats() if metric.kind == SUMMARY else metric.values()
+            except Exception as e:
+                # A source that went away (e.g. a closed pipeline) skips this scrape
+                values = {}
+                self.error_counter.inc(key=f"collect_{metric.name}")
+                self.errors.append((time.time(), f"collect_{metric.name}", str(e)))
+            collected.append((metric, values))
+        return collected
+
+    def snapshot(self):
+        """Every metric as plain JSON-friendly values"""
+        result = {}
+        for metric, values in self.collect():
+            if metric.label is None:
+                result[metric.name] = values.get(None, 0) if metric.kind != SUMMARY else values.get(None)
+            else:
+                result[metric.name] = {str(key): value for key, value in values.items()}
+        return result
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric, values in self.collect():
+            name = f"{self.prefix}_{metric.name}"
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(values.items(), key=lambda item: str(item[0])):
+                if metric.kind != SUMMARY:
+                    lines.append(f"{name}{_label_text(metric.label, key)} {_number(value)}")
+                    continue
+                for quantile in QUANTILES:
+                    label = _label_text(metric.label, key, f'quantile="{quantile}"')
+                    lines.append(f"{name}{label} {_number(value[f'p{int(quantile * 100)}'])}")
+                lines.append(f"{name}_sum{_label_text(metric.label, key)} {_number(value['sum'])}")
+                lines.append(f"{name}_count{_label_text(metric.label, key)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves a Metrics registry as Prometheus text at ``http://host:port/metrics``.
+
+    Binds to localhost by default; ``port`` 0 picks a free port. Requests
+    are handled on their own threads, never the capture or UI thread.
+    """
+
+    def __init__(self, metrics, host="127.0.0.1", port=DEFAULT_METRICS_PORT):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    @property
+    def running(self):
+        return self._server is not None
+
+    def start(self):
+        """Bind and start serving; raises OSError if the port is taken"""
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404, "Metrics are served at /metrics")
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,129 @@
+# components/packet_queue.py
+import threading
+from collections import deque
+
+# What to do when a packet arrives and the queue is full
+BLOCK = "block"
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+class PacketQueue:
+    """Bounded handoff queue between a capture thread and the Tk main loop.
+
+    Producers call ``put`` for every packet; the main loop calls ``drain`` on
+    a fixed cadence and processes whatever has accumulated as one batch. The
+    lock is only held for O(1) deque operations, so neither side waits on the
+    other's work. Queue depth and drop counts are kept for display.
+    """
+
+    def __init__(self, maxsize=100000, policy=DROP_OLDEST):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Queue one item, applying the overflow policy when full.
+
+        Returns False if the item was dropped.
+        """
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._not_full.wait(0.1)
+                    if self._closed:
+                        self.dropped += 1
+                        return False
+            self._items.append(item)
+            self.enqueued += 1
+            if len(self._items) > self.high_watermark:
+                self.high_watermark = len(self._items)
+            return True
+
+    def put_many(self, items):
+        """Queue a batch of items under one lock acquisition.
+
+        Returns the number of items that were dropped.
+        """
+        if self.policy == BLOCK:
+            return sum(not self.put(item) for item in items)
+        with self._lock:
+            overflow = len(self._items) + len(items) - self.maxsize
+            dropped = 0
+            if overflow > 0:
+                if self.policy == DROP_NEWEST:
+                    dropped = min(overflow, len(items))
+                    items = items[:len(items) - dropped]
+                else:
+                    for _ in range(min(overflow, len(self._items))):
+                        self._items.popleft()
+                    dropped = overflow
+                    items = items[-self.maxsize:]
+            self._items.extend(items)
+            self.enqueued += len(items)
+            self.dropped += dropped
+            if len(self._items) > self.high_watermark:
+                self.high_watermark = len(self._items)
+            return dropped
+
+    def drain(self, max_items=None):
+        """Remove and return up to ``max_items`` queued items, oldest first"""
+        with self._lock:
+            if max_items is None or max_items >= len(self._items):
+                batch = list(self._items)
+                self._items.clear()
+            else:
+                popleft = self._items.popleft
+                batch = [popleft() for _ in range(max_items)]
+            if batch:
+                self._not_full.notify_all()
+            return batch
+
+    def close(self):
+        """Release any producer blocked on a full queue"""
+        with self._lock:
+            self._closed = True
+            self._not_full.notify_all()
+
+    def reopen(self):
+        with self._lock:
+            self._closed = False
+
+    def reset_counters(self):
+        with self._lock:
+            self.enqueued = 0
+            self.dropped = 0
+            self.high_watermark = len(self._items)
+
+    def stats(self):
+        """Snapshot of queue depth and drop counters"""
+        return {
+            "depth": len(self._items),
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "high_watermark": self.high_watermark,
+        }
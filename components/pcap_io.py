@@ -0,0 +1,418 @@
+# components/pcap_io.py
+# Streaming PCAP / PCAPNG reading and writing. Files are read through a
+# sliding memory-mapped window so a multi-GB capture never has to fit in
+# memory, and writes go through a large buffer so saving is dominated by
+# disk speed rather than by many small write calls.
+import mmap
+import os
+import socket
+import struct
+
+from components.dissector import dissect, parse_packet, ColumnBuilder, LINKTYPE_ETHERNET
+from models.packet_store import CHUNK_SIZE
+from utils.constants import FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_INTERNED, FIELD_DST_INTERNED
+from utils.helpers import ip_to_int
+
+PCAP_MAGIC_USEC = 0xA1B2C3D4
+PCAP_MAGIC_NSEC = 0xA1B23C4D
+PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_INTERFACE_DESCRIPTION = 0x00000001
+PCAPNG_SIMPLE_PACKET = 0x00000003
+PCAPNG_ENHANCED_PACKET = 0x00000006
+PCAPNG_OPT_END = 0
+PCAPNG_OPT_IF_TSRESOL = 9
+
+FORMAT_PCAP = "pcap"
+FORMAT_PCAPNG = "pcapng"
+
+# Bytes of the file mapped at a time while reading
+MAP_WINDOW = 64 * 1024 * 1024
+# Output buffered before each write call
+WRITE_BUFFER = 4 * 1024 * 1024
+SNAPLEN = 65535
+
+
+class MappedFile:
+    """Read-only file access through a sliding memory-mapped window"""
+
+    def __init__(self, path, window=MAP_WINDOW):
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.window = window
+        self._map = None
+        self._view = None
+        self._start = 0
+        self._end = 0
+
+    def _ensure(self, offset, length):
+        if offset >= self._start and offset + length <= self._end:
+            return
+        if offset + length > self.size:
+            raise EOFError("read past end of file")
+        self._release()
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        end = min(self.size, max(start + self.window, offset + length))
+        self._map = mmap.mmap(self._file.fileno(), end - start, access=mmap.ACCESS_READ, offset=start)
+        if hasattr(self._map, 'madvise'):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        self._view = memoryview(self._map)
+        self._start, self._end = start, end
+
+    def unpack(self, fmt, offset):
+        """Unpack a precompiled struct at a file offset"""
+        self._ensure(offset, fmt.size)
+        return fmt.unpack_from(self._view, offset - self._start)
+
+    def view(self, offset, length):
+        """Memoryview of a byte range; release it before the next read"""
+        self._ensure(offset, length)
+        start = offset - self._start
+        return self._view[start:start + length]
+
+    def _release(self):
+        if self._view is not None:
+            self._view.release()
+            self._map.close()
+            self._view = self._map = None
+            self._start = self._end = 0
+
+    def close(self):
+        self._release()
+        self._file.close()
+
+
+class CaptureFileReader:
+    """Iterate over the packets of a PCAP or PCAPNG file as packet dicts.
+
+    Original capture timestamps and wire lengths are kept. ``position`` and
+    ``size`` can be used to report progress while iterating.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = MappedFile(path)
+        self.size = self.file.size
+        self.position = 0
+        if self.size < 4:
+            self.file.close()
+            raise ValueError(f"{path} is too short to be a capture file")
+        magic, = self.file.unpack(struct.Struct("<I"), 0)
+        if magic == PCAPNG_SECTION_HEADER:
+            self.format = FORMAT_PCAPNG
+        elif magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC) or \
+                struct.unpack(">I", struct.pack("<I", magic))[0] in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+            self.format = FORMAT_PCAP
+        else:
+            self.file.close()
+            raise ValueError(f"{path} is not a PCAP or PCAPNG file")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def __iter__(self):
+        for timestamp, frame, wire_len, linktype in self.frames():
+            yield parse_packet(frame, timestamp, wire_len, linktype)
+
+    def frames(self):
+        """Yield (timestamp, frame, wire_len, linktype) per record.
+
+        ``frame`` is a view into the mapped file, valid until the next one.
+        """
+        if self.format == FORMAT_PCAP:
+            return self._read_pcap()
+        return self._read_pcapng()
+
+    def batches(self, batch_size=10000):
+        """Yield lists of up to ``batch_size`` packet dicts"""
+        batch = []
+        for packet in self:
+            batch.append(packet)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def column_batches(self, batch_size=CHUNK_SIZE):
+        """Yield (columns, interned) for up to ``batch_size`` packets at a time.
+
+        Frames are decoded straight into packet store columns; the receiving
+        store fills in ``interned`` addresses with ``intern_rows``.
+        """
+        builder = ColumnBuilder()
+        for timestamp, frame, wire_len, linktype in self.frames():
+            builder.add(timestamp, wire_len, dissect(frame, linktype))
+            if len(builder) >= batch_size:
+                yield builder.columns(), builder.interned
+                builder = ColumnBuilder()
+        if len(builder):
+            yield builder.columns(), builder.interned
+
+    def _read_pcap(self):
+        magic, = self.file.unpack(struct.Struct("<I"), 0)
+        order = "<" if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC) else ">"
+        header = struct.Struct(order + "IHHiIII")
+        magic, _, _, _, _, _, network = self.file.unpack(header, 0)
+        scale = 1e-9 if magic == PCAP_MAGIC_NSEC else 1e-6
+        linktype = network & 0x0FFFFFFF
+        record = struct.Struct(order + "IIII")
+
+        pos = header.size
+        while pos + record.size <= self.size:
+            sec, frac, caplen, wire_len = self.file.unpack(record, pos)
+            pos += record.size
+            if pos + caplen > self.size:
+                break
+            with self.file.view(pos, caplen) as frame:
+                yield sec + frac * scale, frame, wire_len, linktype
+            pos += caplen
+            self.position = pos
+        self.position = self.size
+
+    def _read_pcapng(self):
+        order = "<"
+        block_header = struct.Struct("<II")
+        enhanced = struct.Struct("<IIIII")
+        simple = struct.Struct("<I")
+        interfaces = []
+        pos = 0
+        while pos + 12 <= self.size:
+            block_type, block_len = self.file.unpack(block_header, pos)
+            if block_type == PCAPNG_SECTION_HEADER:
+                bom, = self.file.unpack(struct.Struct("<I"), pos + 8)
+                order = "<" if bom == PCAPNG_BYTE_ORDER_MAGIC else ">"
+                block_header = struct.Struct(order + "II")
+                enhanced = struct.Struct(order + "IIIII")
+                simple = struct.Struct(order + "I")
+                _, block_len = self.file.unpack(block_header, pos)
+                interfaces = []
+            if block_len < 12 or pos + block_len > self.size:
+                break
+
+            if block_type == PCAPNG_INTERFACE_DESCRIPTION:
+                interfaces.append(self._read_interface(order, pos, block_len))
+            elif block_type == PCAPNG_ENHANCED_PACKET:
+                iface, ts_high, ts_low, caplen, wire_len = self.file.unpack(enhanced, pos + 8)
+                linktype, scale = interfaces[iface] if iface < len(interfaces) else (LINKTYPE_ETHERNET, 1e-6)
+                caplen = min(caplen, block_len - 32)
+                with self.file.view(pos + 28, caplen) as frame:
+                    yield ((ts_high << 32) | ts_low) * scale, frame, wire_len, linktype
+            elif block_type == PCAPNG_SIMPLE_PACKET:
+                wire_len, = self.file.unpack(simple, pos + 8)
+                linktype = interfaces[0][0] if interfaces else LINKTYPE_ETHERNET
+                caplen = min(wire_len, block_len - 16)
+                # Simple packet blocks carry no timestamp
+                with self.file.view(pos + 12, caplen) as frame:
+                    yield 0.0, frame, wire_len, linktype
+
+            pos += block_len
+            self.position = pos
+        self.position = self.size
+
+    def _read_interface(self, order, pos, block_len):
+        """Return (linktype, timestamp scale) from an interface description block"""
+        linktype, = self.file.unpack(struct.Struct(order + "H"), pos + 8)
+        scale = 1e-6
+        option = struct.Struct(order + "HH")
+        opt_pos = pos + 16
+        end = pos + block_len - 4
+        while opt_pos + 4 <= end:
+            code, length = self.file.unpack(option, opt_pos)
+            if code == PCAPNG_OPT_END:
+                break
+            if code == PCAPNG_OPT_IF_TSRESOL and length >= 1:
+                resolution, = self.file.unpack(struct.Struct("B"), opt_pos + 4)
+                if resolution & 0x80:
+                    scale = 2.0 ** -(resolution & 0x7F)
+                else:
+                    scale = 10.0 ** -resolution
+            opt_pos += 4 + ((length + 3) & ~3)
+        return linktype, scale
+
+
+# IP protocol numbers used when rebuilding headers for each protocol name
+_IP_PROTOCOLS = {
+    'TCP': 6, 'HTTP': 6, 'HTTPS': 6, 'SSH': 6, 'FTP': 6,
+    'UDP': 17, 'DNS': 17,
+    'ICMP': 1, 'ICMPv6': 58,
+}
+
+_ETHERNET = struct.Struct("!12xH")
+_IPV4 = struct.Struct("!BBHHHBBHII")
+_IPV6 = struct.Struct("!IHBB16s16s")
+_TCP = struct.Struct("!HHIIBBHHH")
+_UDP = struct.Struct("!HHHH")
+_ICMP = struct.Struct("!BBHI")
+
+
+def _ipv6_bytes(address):
+    """16-byte form of an address string, mapping IPv4 into IPv6, or None"""
+    packed = ip_to_int(address)
+    if packed is not None:
+        return b"\0" * 10 + b"\xff\xff" + struct.pack("!I", packed)
+    try:
+        return socket.inet_pton(socket.AF_INET6, address)
+    except (OSError, TypeError):
+        return None
+
+
+def synthesize_frame(src, dst, ip_proto, size, src_port, dst_port, tcp_flags, icmp_type):
+    """Rebuild Ethernet/IP/transport headers from decoded packet fields.
+
+    SniffViz keeps decoded fields rather than raw bytes, so saved packets
+    contain headers only; the wire length is preserved in the record header.
+    ``src`` and ``dst`` are packed IPv4 ints or address strings (None when
+    the packet had no IP layer).
+    """
+    if src is None or dst is None:
+        return _ETHERNET.pack(0)
+
+    if isinstance(src, int) and isinstance(dst, int):
+        ip_header = None
+        payload = max(0, size - 14 - 20)
+    else:
+        src6 = _ipv6_bytes(src) if isinstance(src, str) else _ipv6_bytes(socket.inet_ntoa(struct.pack("!I", src)))
+        dst6 = _ipv6_bytes(dst) if isinstance(dst, str) else _ipv6_bytes(socket.inet_ntoa(struct.pack("!I", dst)))
+        if src6 is None or dst6 is None:
+            return _ETHERNET.pack(0)
+        payload = max(0, size - 14 - 40)
+        ip_header = (src6, dst6)
+
+    if ip_proto == 6:
+        transport = _TCP.pack(src_port, dst_port, 0, 0, 0x50, tcp_flags, 65535, 0, 0)
+    elif ip_proto == 17:
+        transport = _UDP.pack(src_port, dst_port, min(payload, 65535), 0)
+    elif ip_proto in (1, 58):
+        transport = _ICMP.pack(icmp_type, 0, 0, 0)
+    else:
+        transport = b""
+
+    if ip_header is None:
+        ip = _IPV4.pack(0x45, 0, min(payload + 20, 65535), 0, 0x4000, 64,
+                        ip_proto or 255, 0, src, dst)
+        return _ETHERNET.pack(0x0800) + ip + transport
+    ip = _IPV6.pack(0x60000000, min(payload, 65535), ip_proto or 59, 64, *ip_header)
+    return _ETHERNET.pack(0x86DD) + ip + transport
+
+
+def frame_from_packet(packet):
+    """Rebuild a frame from a packet dict, e.g. to run a BPF filter on it"""
+    src, dst = packet.get('src_ip'), packet.get('dst_ip')
+    if src in (None, 'N/A') or dst in (None, 'N/A'):
+        src = dst = None
+    else:
+        src = ip_to_int(src) if ip_to_int(src) is not None else src
+        dst = ip_to_int(dst) if ip_to_int(dst) is not None else dst
+    return synthesize_frame(src, dst, _IP_PROTOCOLS.get(packet.get('protocol'), 0),
+                            packet.get('size', 0), packet.get('src_port') or 0,
+                            packet.get('dst_port') or 0, packet.get('tcp_flags') or 0,
+                            packet.get('icmp_type') or 0)
+
+
+class CaptureFileWriter:
+    """Buffered PCAP / PCAPNG writer for the contents of a PacketStore"""
+
+    def __init__(self, path, file_format=None, buffer_size=WRITE_BUFFER):
+        if file_format is None:
+            file_format = FORMAT_PCAPNG if path.lower().endswith(".pcapng") else FORMAT_PCAP
+        self.path = path
+        self.format = file_format
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._file = open(path, 'wb')
+        self.packets_written = 0
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_header(self):
+        if self.format == FORMAT_PCAP:
+            self._buffer += struct.pack("<IHHiIII", PCAP_MAGIC_NSEC, 2, 4, 0, 0, SNAPLEN, LINKTYPE_ETHERNET)
+            return
+        # Section header: no options, unknown section length
+        self._buffer += struct.pack("<IIIHHqI", PCAPNG_SECTION_HEADER, 28, PCAPNG_BYTE_ORDER_MAGIC,
+                                    1, 0, -1, 28)
+        # One Ethernet interface with nanosecond timestamps
+        self._buffer += struct.pack("<IIHHIHHB3xHHI", PCAPNG_INTERFACE_DESCRIPTION, 32,
+                                    LINKTYPE_ETHERNET, 0, SNAPLEN,
+                                    PCAPNG_OPT_IF_TSRESOL, 1, 9, PCAPNG_OPT_END, 0, 32)
+
+    def write_frame(self, timestamp, frame, wire_len):
+        """Append one record holding ``frame`` with the given wire length"""
+        nanoseconds = int(round(timestamp * 1e9))
+        caplen = len(frame)
+        if self.format == FORMAT_PCAP:
+            sec, nsec = divmod(nanoseconds, 1000000000)
+            self._buffer += struct.pack("<IIII", sec, nsec, caplen, max(wire_len, caplen))
+            self._buffer += frame
+        else:
+            padded = (caplen + 3) & ~3
+            block_len = 32 + padded
+            self._buffer += struct.pack("<IIIIIII", PCAPNG_ENHANCED_PACKET, block_len, 0,
+                                        nanoseconds >> 32, nanoseconds & 0xFFFFFFFF,
+                                        caplen, max(wire_len, caplen))
+            self._buffer += frame
+            self._buffer += b"\0" * (padded - caplen)
+            self._buffer += struct.pack("<I", block_len)
+        self.packets_written += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_store(self, store, start=0, stop=None, progress=None, cancelled=None):
+        """Write rows [start, stop) of a PacketStore, one chunk at a time.
+
+        ``progress(done, total)`` is called after each chunk; writing stops
+        early if ``cancelled()`` returns true. Returns the rows written.
+        """
+        stop = len(store) if stop is None else min(stop, len(store))
+        names = store.protocol_names
+        addresses = store.addresses
+        done = 0
+        for cols in store.iter_chunks(start=start, stop=stop):
+            if cancelled is not None and cancelled():
+                break
+            rows = zip(cols['timestamp'].tolist(), cols['size'].tolist(),
+                       cols['src_ip'].tolist(), cols['dst_ip'].tolist(),
+                       cols['src_port'].tolist(), cols['dst_port'].tolist(),
+                       cols['protocol'].tolist(), cols['tcp_flags'].tolist(),
+                       cols['icmp_type'].tolist(), cols['fields'].tolist())
+            for ts, size, src, dst, sport, dport, proto, flags, icmp, fields in rows:
+                if not fields & FIELD_SRC_IP:
+                    src = None
+                elif fields & FIELD_SRC_INTERNED:
+                    src = addresses[src]
+                if not fields & FIELD_DST_IP:
+                    dst = None
+                elif fields & FIELD_DST_INTERNED:
+                    dst = addresses[dst]
+                if src == 'N/A' or dst == 'N/A':
+                    src = dst = None
+                frame = synthesize_frame(src, dst, _IP_PROTOCOLS.get(names[proto], 0),
+                                         size, sport, dport, flags, icmp)
+                self.write_frame(ts, frame, size)
+            done += len(cols['timestamp'])
+            if progress is not None:
+                progress(done, stop - start)
+        return done
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,386 @@
+# components/pipeline.py
+# Multi-process capture pipeline. A capture process only pulls raw frames off
+# the AF_PACKET ring and copies them into shared-memory slots; a pool of
+# worker processes decodes each slot into store-encoded column records in a
+# second shared-memory region. Only slot numbers, sequence numbers and the
+# rare non-IPv4 address string travel through the multiprocessing queues, so
+# frames and packets are never pickled. The GUI process copies finished
+# record blocks into the packet store in capture order.
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from components.afpacket import AFPacketCapture, iter_block_frames
+from components.dissector import dissect, ColumnBuilder
+from models.packet_store import COLUMNS
+
+# Per-frame index kept in front of each slot's raw bytes
+FRAME_INDEX = np.dtype([('timestamp', np.float64), ('offset', np.uint32),
+                        ('caplen', np.uint32), ('wire_len', np.uint32)])
+# One decoded packet, laid out like a packet store row
+RECORD = np.dtype(list(COLUMNS))
+
+# Shared counters: capture stage first, then two per worker
+CAPTURED = 0
+CAPTURED_BYTES = 1
+CAPTURE_STALLS = 2
+KERNEL_DROPS = 3
+_WORKER_BASE = 4
+_WORKER_DECODED = 0
+_WORKER_BUSY_NS = 1
+
+
+def default_worker_count():
+    """Decoder processes to use, leaving a core each for capture and the UI.
+
+    Returns 0 on machines with too few cores for the pipeline to pay off.
+    """
+    cores = os.cpu_count() or 1
+    return min(max(cores - 2, 0), 8)
+
+
+class SlotBuffers:
+    """Fixed-size frame and record slots in two shared-memory blocks.
+
+    Slot ``i`` of the frame region holds up to ``max_frames`` raw frames in
+    ``slot_bytes`` bytes; slot ``i`` of the record region receives their
+    decoded rows. A slot stays owned by one stage at a time.
+    """
+
+    def __init__(self, slots, slot_bytes, max_frames):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.max_frames = max_frames
+        self._index_bytes = max_frames * FRAME_INDEX.itemsize
+        self._frame_stride = self._index_bytes + slot_bytes
+        self._record_stride = max_frames * RECORD.itemsize
+        self.frames = shared_memory.SharedMemory(create=True, size=slots * self._frame_stride)
+        self.records = shared_memory.SharedMemory(create=True, size=slots * self._record_stride)
+
+    def frame_index(self, slot):
+        return np.ndarray((self.max_frames,), dtype=FRAME_INDEX, buffer=self.frames.buf,
+                          offset=slot * self._frame_stride)
+
+    def frame_data(self, slot):
+        start = slot * self._frame_stride + self._index_bytes
+        return self.frames.buf[start:start + self.slot_bytes]
+
+    def record_rows(self, slot):
+        return np.ndarray((self.max_frames,), dtype=RECORD, buffer=self.records.buf,
+                          offset=slot * self._record_stride)
+
+    def close(self):
+        for block in (self.frames, self.records):
+            block.close()
+            block.unlink()
+
+
+class AFPacketSource:
+    """Raw frames from a TPACKET_V3 ring, one iterable per retired block"""
+
+    def __init__(self, interface=None, bpf_program=None):
+        self.interface = interface
+        self.bpf_program = bpf_program
+        self.capture = None
+
+    def open(self):
+        """Open the socket and ring; a process forked afterwards inherits them"""
+        self.capture = AFPacketCapture(self.interface, bpf_program=self.bpf_program)
+        self.capture.open()
+
+    def close(self):
+        """Close this process's handle on the socket and ring"""
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+
+    def __call__(self, should_continue):
+        if self.capture is None:
+            self.open()
+        try:
+            for block in self.capture.blocks(should_continue):
+                yield iter_block_frames(block)
+        finally:
+            self.capture.close()
+
+    def kernel_drops(self):
+        return self.capture.stats()['kernel_drops'] if self.capture is not None else 0
+
+
+def decode_slot(index, data, count, records):
+    """Decode ``count`` frames of a slot into its record rows.
+
+    Returns (row, is_dst, address) for addresses that aren't IPv4 and must
+    be interned by the packet store that receives the rows.
+    """
+    data = data if isinstance(data, memoryview) else memoryview(data)
+    builder = ColumnBuilder()
+    for timestamp, offset, caplen, wire_len in index[:count].tolist():
+        builder.add(timestamp, wire_len, dissect(data[offset:offset + caplen]))
+    for name, values in builder.values.items():
+        records[name][:count] = values
+    return builder.interned
+
+
+def _capture_main(source, buffers, free_slots, tasks, counters, stop, workers):
+    """Capture process: copy frames from ``source`` into free slots"""
+    seq = 0
+    slot = None
+    filled = 0
+    position = 0
+    pending = []
+
+    def acquire():
+        while not stop.is_set():
+            try:
+                return free_slots.get(timeout=0.1)
+            except queue.Empty:
+                counters[CAPTURE_STALLS] += 1
+        return None
+
+    def flush():
+        nonlocal seq, slot, filled, position
+        index = buffers.frame_index(slot)
+        for name, values in zip(('timestamp', 'offset', 'caplen', 'wire_len'), zip(*pending)):
+            index[name][:filled] = values
+        tasks.put((seq, slot, filled))
+        counters[CAPTURED] += filled
+        counters[CAPTURED_BYTES] += position
+        seq += 1
+        slot = None
+        filled = 0
+        position = 0
+        pending.clear()
+
+    try:
+        for frames in source(lambda: not stop.is_set()):
+            for timestamp, frame, wire_len in frames:
+                caplen = min(len(frame), buffers.slot_bytes)
+                if slot is not None and (filled == buffers.max_frames
+                                         or position + caplen > buffers.slot_bytes):
+                    flush()
+                if slot is None:
+                    slot = acquire()
+                    if slot is None:
+                        return
+                    data = buffers.frame_data(slot)
+                data[position:position + caplen] = frame[:caplen]
+                pending.append((timestamp, position, caplen, wire_len))
+                position += caplen
+                filled += 1
+            # Drop the last view into the source's buffer before it is reused
+            frame = frames = None
+            # Hand over partial slots at block boundaries to bound latency
+            if slot is not None and filled:
+                flush()
+            if hasattr(source, 'kernel_drops'):
+                counters[KERNEL_DROPS] = source.kernel_drops()
+    except Exception as e:
+        tasks.put(('error', f"Capture process failed: {e}"))
+        # Nothing more is coming, so let the pipeline wind down
+        stop.set()
+    finally:
+        for _ in range(workers):
+            tasks.put(None)
+
+
+def _worker_main(worker, buffers, tasks, results, counters):
+    """Decoder process: turn frame slots into record slots"""
+    base = _WORKER_BASE + 2 * worker
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        if task[0] == 'error':
+            results.put(task)
+            continue
+        seq, slot, count = task
+        started = time.perf_counter_ns()
+        try:
+            interned = decode_slot(buffers.frame_index(slot), buffers.frame_data(slot),
+                                   count, buffers.record_rows(slot))
+        except Exception as e:
+            # Keep the sequence unbroken so later slots are still delivered
+            results.put(('error', f"Decoder {worker} failed: {e}"))
+            count, interned = 0, []
+        counters[base + _WORKER_BUSY_NS] += time.perf_counter_ns() - started
+        counters[base + _WORKER_DECODED] += count
+        results.put((seq, slot, count, interned))
+    results.put(('done', worker))
+
+
+class DissectionPipeline:
+    """Capture process plus ``workers`` decoder processes.
+
+    ``source(should_continue)`` runs in the capture process and yields
+    iterables of (timestamp, frame, wire_len); by default it reads an
+    AF_PACKET ring. A source with an ``open`` method is opened by ``start``
+    before anything is forked, so a capture that can't open (e.g. without
+    CAP_NET_RAW) raises there instead of failing in the capture process. ``drain`` is called from the GUI process and returns
+    decoded batches as column dicts ready for ``PacketStore.append_columns``.
+    Linux only: processes are forked so they inherit the shared memory.
+    """
+
+    def __init__(self, workers=None, source=None, interface=None, bpf_program=None,
+                 slots=None, slot_bytes=4 << 20, max_frames=16384):
+        self.workers = workers if workers else max(default_worker_count(), 1)
+        self.source = source or AFPacketSource(interface, bpf_program)
+        self.slots = slots or max(4 * self.workers, 8)
+        self.slot_bytes = slot_bytes
+        self.max_frames = max_frames
+        self.error = None
+        self.delivered = 0
+        self._ctx = mp.get_context("fork")
+        self._buffers = None
+        self._counters = None
+        self._stop = None
+        self._processes = []
+        self._results = None
+        self._free_slots = None
+        self._pending = {}
+        self._next_seq = 0
+        self._finished_workers = 0
+        self._stopped = True
+        self._last_sample = None
+
+    @property
+    def running(self):
+        return not self._stopped
+
+    def start(self):
+        if hasattr(self.source, 'open'):
+            self.source.open()
+        try:
+            self._start()
+        finally:
+            # The capture process holds its own copy from the fork
+            if hasattr(self.source, 'close'):
+                self.source.close()
+
+    def _start(self):
+        ctx = self._ctx
+        self._buffers = SlotBuffers(self.slots, self.slot_bytes, self.max_frames)
+        self._counters = ctx.RawArray('Q', _WORKER_BASE + 2 * self.workers)
+        self._stop = ctx.Event()
+        self._free_slots = ctx.Queue()
+        tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+        self._pending = {}
+        self._next_seq = 0
+        self._finished_workers = 0
+        self.delivered = 0
+        self.error = None
+        self._processes = [
+            ctx.Process(target=_worker_main, daemon=True,
+                        args=(worker, self._buffers, tasks, self._results, self._counters))
+            for worker in range(self.workers)
+        ]
+        self._processes.append(ctx.Process(
+            target=_capture_main, daemon=True,
+            args=(self.source, self._buffers, self._free_slots, tasks, self._counters,
+                  self._stop, self.workers)))
+        for process in self._processes:
+            process.start()
+        self._stopped = False
+        self._last_sample = (time.monotonic(), self.stage_counts())
+
+    def stop(self):
+        """Ask the capture process to stop; workers exit once they catch up"""
+        if self._stop is not None:
+            self._stop.set()
+
+    def _collect(self, block):
+        """Move finished results off the result queue into ``_pending``"""
+        while True:
+            try:
+                result = self._results.get(timeout=0.1) if block else self._results.get_nowait()
+            except queue.Empty:
+                return
+            if result[0] == 'error':
+                self.error = result[1]
+            elif result[0] == 'done':
+                self._finished_workers += 1
+            else:
+                self._pending[result[0]] = result
+            block = False
+
+    def drain(self, store, max_batches=None):
+        """Return decoded batches in capture order as column dicts.
+
+        Non-IPv4 addresses are interned into ``store``. Once stopped and
+        fully drained, the processes are reaped and shared memory released.
+        """
+        if self._buffers is None:
+            return []
+        self._collect(block=False)
+        batches = []
+        while self._next_seq in self._pending and (max_batches is None or len(batches) < max_batches):
+            _, slot, count, interned = self._pending.pop(self._next_seq)
+            rows = self._buffers.record_rows(slot)[:count]
+            columns = {name: rows[name].copy() for name, _ in COLUMNS}
+            self._free_slots.put(slot)
+            store.intern_rows(columns, interned)
+            batches.append(columns)
+            self._next_seq += 1
+            self.delivered += count
+        if (self._stop.is_set() and self._finished_workers == self.workers
+                and not self._pending):
+            self._release()
+        return batches
+
+    def _release(self):
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._buffers.close()
+        self._buffers = None
+        self._stopped = True
+
+    def close(self):
+        """Stop immediately, discarding anything not yet drained"""
+        if self._buffers is None:
+            return
+        self.stop()
+        deadline = time.monotonic() + 2
+        while self._finished_workers < self.workers and time.monotonic() < deadline:
+            self._collect(block=True)
+        self._pending.clear()
+        self._release()
+
+    def stage_counts(self):
+        """Cumulative packets through each stage"""
+        counters = self._counters
+        decoded = sum(counters[_WORKER_BASE + 2 * w + _WORKER_DECODED] for w in range(self.workers))
+        busy_ns = sum(counters[_WORKER_BASE + 2 * w + _WORKER_BUSY_NS] for w in range(self.workers))
+        return {
+            "captured": counters[CAPTURED],
+            "captured_bytes": counters[CAPTURED_BYTES],
+            "capture_stalls": counters[CAPTURE_STALLS],
+            "kernel_drops": counters[KERNEL_DROPS],
+            "decoded": decoded,
+            "decode_busy_s": busy_ns / 1e9,
+            "delivered": self.delivered,
+        }
+
+    def stats(self):
+        """Stage counters plus per-stage throughput since the previous call"""
+        counts = self.stage_counts()
+        now = time.monotonic()
+        then, previous = self._last_sample
+        elapsed = max(now - then, 1e-9)
+        for stage in ("captured", "decoded", "delivered"):
+            counts[f"{stage}_per_s"] = (counts[stage] - previous[stage]) / elapsed
+        # Fraction of the worker pool's time spent decoding
+        counts["worker_utilization"] = (counts["decode_busy_s"] - previous["decode_busy_s"]) / (elapsed * self.workers)
+        counts["workers"] = self.workers
+        counts["in_flight"] = counts["captured"] - counts["delivered"]
+        self._last_sample = (now, self.stage_counts())
+        return counts
@@ -0,0 +1,357 @@
+# components/report_export.py
+# Exporting the packet store as a text report, CSV, JSON Lines or a
+# compressed columnar NumPy archive. Rows are formatted a whole chunk at a
+# time from the store's columns rather than packet by packet, and output
+# goes through a large buffer, so an export is bound by disk speed.
+import time
+import zipfile
+from datetime import datetime
+from functools import lru_cache
+from json.encoder import encode_basestring
+
+import numpy as np
+
+from components.pcap_io import WRITE_BUFFER
+from models.packet_store import COLUMN_DTYPES
+from utils.constants import (
+    FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_PORT, FIELD_DST_PORT, FIELD_TCP_FLAGS,
+    FIELD_ICMP_TYPE, FIELD_SRC_INTERNED, FIELD_DST_INTERNED
+)
+from utils.helpers import tcp_flag_list
+
+FORMAT_TEXT = "text"
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMAT_COLUMNAR = "npz"
+
+# File extension for each format, used to pick one from a file name
+EXPORT_EXTENSIONS = {
+    FORMAT_TEXT: ".txt",
+    FORMAT_CSV: ".csv",
+    FORMAT_JSONL: ".jsonl",
+    FORMAT_COLUMNAR: ".npz",
+}
+
+# Info text for protocols that don't depend on the packet
+_FIXED_INFO = {
+    'HTTP': "HTTP GET /",
+    'HTTPS': "TLS Client Hello",
+    'DNS': "DNS Standard query",
+}
+
+
+# "[SYN ACK]"-style labels for every TCP flag byte
+_FLAG_LABELS = np.array(
+    ["[" + " ".join(tcp_flag_list(flags)) + "]" if tcp_flag_list(flags) else "" for flags in range(256)],
+    dtype=object)
+
+
+def export_format(path):
+    """Pick the export format from a file name, defaulting to the text report"""
+    lower = path.lower()
+    for file_format, extension in EXPORT_EXTENSIONS.items():
+        if lower.endswith(extension):
+            return file_format
+    return FORMAT_TEXT
+
+
+def time_labels(timestamps):
+    """Local HH:MM:SS.mmm labels for an array of epoch timestamps"""
+    if not len(timestamps):
+        return np.empty(0, dtype=object)
+    first = time.localtime(float(timestamps.min())).tm_gmtoff
+    last = time.localtime(float(timestamps.max())).tm_gmtoff
+    if first != last:
+        # A DST change inside the batch: let datetime work out each offset
+        return np.array([datetime.fromtimestamp(t).strftime('%H:%M:%S.%f')[:-3]
+                         for t in timestamps.tolist()], dtype=object)
+    # Round the fraction on its own, as datetime does: scaling the whole
+    # epoch value to microseconds would lose precision
+    seconds = np.floor(timestamps)
+    micros = (seconds.astype(np.int64) + first) * 1000000 + np.round((timestamps - seconds) * 1e6).astype(np.int64)
+    micros = micros.astype('datetime64[us]')
+    return np.char.partition(np.datetime_as_string(micros, unit='ms'), 'T')[:, 2].astype(object)
+
+
+def address_column(store, values, fields, present_bit, interned_bit, missing="N/A", quote=None):
+    """Address strings for a batch of rows, formatting each distinct address once.
+
+    ``quote``, if given, escapes each formatted address for the output format.
+    """
+    quote = quote or str
+    keys = values.astype(np.int64)
+    keys |= (fields & interned_bit).astype(np.int64) << 32
+    keys[(fields & present_bit) == 0] = -1
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    labels = np.array([missing if key < 0 else quote(store.format_address(key & 0xFFFFFFFF, key >> 32))
+                       for key in distinct.tolist()], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+@lru_cache(maxsize=None)
+def _number_labels():
+    """Decimal strings for every uint16 value, built on the first export"""
+    return np.array([str(value) for value in range(65536)], dtype=object)
+
+
+def optional_column(values, fields, bit, missing=''):
+    """Port, flag or type values as strings, with ``missing`` where the field is absent"""
+    labels = _number_labels()[values]
+    labels[(fields & bit) == 0] = missing
+    return labels
+
+
+def info_column(cols, protocols):
+    """The packet list's Info text for a batch of rows"""
+    fields = cols['fields']
+    info = np.empty(len(fields), dtype=object)
+    codes = cols['protocol']
+    for code in np.unique(codes).tolist():
+        rows = codes == code
+        name = protocols[code]
+        if name in ('TCP', 'UDP'):
+            src = optional_column(cols['src_port'][rows], fields[rows], FIELD_SRC_PORT)
+            dst = optional_column(cols['dst_port'][rows], fields[rows], FIELD_DST_PORT)
+            if name == 'TCP':
+                flags = np.where(fields[rows] & FIELD_TCP_FLAGS, cols['tcp_flags'][rows], 0)
+                info[rows] = [f"TCP {s} → {d} {f}" for s, d, f in zip(src, dst, _FLAG_LABELS[flags])]
+            else:
+                info[rows] = [f"UDP {s} → {d}" for s, d in zip(src, dst)]
+        elif name == 'ICMP':
+            icmp = optional_column(cols['icmp_type'][rows], fields[rows], FIELD_ICMP_TYPE)
+            info[rows] = [f"ICMP {t}" for t in icmp]
+        else:
+            info[rows] = _FIXED_INFO.get(name, f"{name} packet")
+    return info
+
+
+class _ExportWriter:
+    """Buffered writer for rows of a PacketStore, one chunk at a time"""
+
+    def __init__(self, path, buffer_size=WRITE_BUFFER):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._file = open(path, 'wb')
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, text):
+        self._buffer += text.encode('utf-8')
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def write_store(self, store, start=0, stop=None, progress=None, cancelled=None):
+        """Write rows [start, stop) of a PacketStore, one chunk at a time.
+
+        ``progress(done, total)`` is called after each chunk; writing stops
+        early if ``cancelled()`` returns true. Returns the rows written.
+        """
+        stop = len(store) if stop is None else min(stop, len(store))
+        total = max(stop - start, 0)
+        done = 0
+        for cols in store.iter_chunks(start=start, stop=stop):
+            if cancelled is not None and cancelled():
+                break
+            self.write_rows(store, cols, start + done + 1)
+            done += len(cols['timestamp'])
+            self.rows_written += len(cols['timestamp'])
+            if progress is not None:
+                progress(done, total)
+        return done
+
+    def write_rows(self, store, cols, number):
+        """Write one chunk of rows, the first of them numbered ``number``"""
+        raise NotImplementedError
+
+    def row_labels(self, store, cols, number, quote=None, missing="N/A"):
+        """The packet list columns for a chunk, as lists.
+
+        ``quote`` escapes the text columns for the output format, and
+        ``missing`` stands in for an absent address.
+        """
+        fields = cols['fields']
+        source = address_column(store, cols['src_ip'], fields, FIELD_SRC_IP, FIELD_SRC_INTERNED, missing, quote)
+        destination = address_column(store, cols['dst_ip'], fields, FIELD_DST_IP, FIELD_DST_INTERNED, missing, quote)
+        protocols = store.protocol_names
+        info = info_column(cols, protocols).tolist()
+        if quote is not None:
+            protocols = [quote(name) for name in protocols]
+            info = [quote(text) for text in info]
+        return {
+            'number': range(number, number + len(fields)),
+            'time': time_labels(cols['timestamp']).tolist(),
+            'source': source.tolist(),
+            'destination': destination.tolist(),
+            'protocol': np.asarray(protocols, dtype=object)[cols['protocol']].tolist(),
+            'length': cols['size'].tolist(),
+            'info': info,
+        }
+
+
+class TextReportWriter(_ExportWriter):
+    """The plain-text report: a statistics summary followed by the packet list"""
+
+    def __init__(self, path, title="", stats=None, total=0, buffer_size=WRITE_BUFFER):
+        super().__init__(path, buffer_size)
+        self.write(f"Packet Capture Report - {title}\n")
+        self.write("====================\n\n")
+        self.write(f"Generated: {datetime.now()}\n")
+        self.write(f"Total packets: {total}\n\n")
+        for key, value in (stats or {}).items():
+            if isinstance(value, dict):
+                self.write(f"{key}:\n")
+                for k, v in value.items():
+                    self.write(f"  {k}: {v}\n")
+            else:
+                self.write(f"{key}: {value}\n")
+        self.write("\n\nPacket List:\n")
+        self.write("No.\tTime\tSource\tDestination\tProtocol\tLength\tInfo\n")
+
+    def write_rows(self, store, cols, number):
+        labels = self.row_labels(store, cols, number)
+        self.write("".join(
+            f"{i}\t{t}\t{src}\t{dst}\t{protocol}\t{length}\t{info}\n"
+            for i, t, src, dst, protocol, length, info in zip(
+                labels['number'], labels['time'], labels['source'], labels['destination'],
+                labels['protocol'], labels['length'], labels['info'])))
+
+
+def csv_quote(text):
+    """Quote a CSV field only when it needs it"""
+    if ',' in text or '"' in text or '\n' in text or '\r' in text:
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+class CsvWriter(_ExportWriter):
+    """One CSV row per packet, with the epoch timestamp and raw ports"""
+
+    HEADER = ("No.", "Timestamp", "Time", "Source", "Destination", "Protocol", "Length",
+              "Source Port", "Destination Port", "Info")
+
+    def __init__(self, path, buffer_size=WRITE_BUFFER):
+        super().__init__(path, buffer_size)
+        self.write(",".join(map(csv_quote, self.HEADER)) + "\n")
+
+    def write_rows(self, store, cols, number):
+        labels = self.row_labels(store, cols, number, quote=csv_quote, missing="")
+        fields = cols['fields']
+        self.write("".join(
+            f"{i},{ts!r},{t},{src},{dst},{protocol},{length},{sport},{dport},{info}\n"
+            for i, ts, t, src, dst, protocol, length, sport, dport, info in zip(
+                labels['number'], cols['timestamp'].tolist(), labels['time'],
+                labels['source'], labels['destination'], labels['protocol'], labels['length'],
+                optional_column(cols['src_port'], fields, FIELD_SRC_PORT).tolist(),
+                optional_column(cols['dst_port'], fields, FIELD_DST_PORT).tolist(),
+                labels['info'])))
+
+
+class JsonLinesWriter(_ExportWriter):
+    """One JSON object per packet; fields a packet lacks are null"""
+
+    def write_rows(self, store, cols, number):
+        labels = self.row_labels(store, cols, number, quote=encode_basestring, missing="null")
+        fields = cols['fields']
+        sport, dport, flags, icmp = (
+            optional_column(cols[name], fields, bit, missing="null").tolist()
+            for name, bit in (('src_port', FIELD_SRC_PORT), ('dst_port', FIELD_DST_PORT),
+                              ('tcp_flags', FIELD_TCP_FLAGS), ('icmp_type', FIELD_ICMP_TYPE)))
+        self.write("".join(
+            f'{{"no":{i},"timestamp":{ts!r},"src_ip":{src},"dst_ip":{dst},"protocol":{protocol},'
+            f'"size":{length},"src_port":{sp},"dst_port":{dp},"tcp_flags":{fl},"icmp_type":{ic},'
+            f'"info":{info}}}\n'
+            for i, ts, src, dst, protocol, length, sp, dp, fl, ic, info in zip(
+                labels['number'], cols['timestamp'].tolist(), labels['source'],
+                labels['destination'], labels['protocol'], labels['length'],
+                sport, dport, flags, icmp, labels['info'])))
+
+
+class ColumnarWriter:
+    """The store's own columns as a compressed NumPy ``.npz`` archive.
+
+    Each column becomes one ``<name>.npy`` member, streamed chunk by chunk
+    so the export never holds more than a chunk in memory; ``np.load``
+    reads the result directly. ``protocol_names`` and ``addresses`` hold
+    the tables the ``protocol`` code and interned address columns index,
+    and ``fields`` carries the same presence bits as the store.
+    """
+
+    def __init__(self, path, compresslevel=1):
+        self.path = path
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED,
+                                    compresslevel=compresslevel, allowZip64=True)
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def _write_array(self, name, array):
+        with self._zip.open(f"{name}.npy", 'w', force_zip64=True) as member:
+            np.lib.format.write_array(member, array, allow_pickle=False)
+
+    def write_store(self, store, start=0, stop=None, progress=None, cancelled=None):
+        """Write rows [start, stop) of a PacketStore, one column at a time.
+
+        ``progress(done, total)`` counts rows over all columns; writing stops
+        early if ``cancelled()`` returns true. Returns the rows written.
+        """
+        stop = len(store) if stop is None else min(stop, len(store))
+        count = max(stop - start, 0)
+        total = count * len(COLUMN_DTYPES)
+        done = 0
+        for name, dtype in COLUMN_DTYPES.items():
+            with self._zip.open(f"{name}.npy", 'w', force_zip64=True) as member:
+                header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                          'fortran_order': False, 'shape': (count,)}
+                np.lib.format.write_array_header_2_0(member, header)
+                for cols in store.iter_chunks((name,), start, stop):
+                    if cancelled is not None and cancelled():
+                        return 0
+                    member.write(np.ascontiguousarray(cols[name]).data)
+                    done += len(cols[name])
+                    if progress is not None:
+                        progress(done, total)
+        self._write_array('protocol_names', np.array(store.protocol_names, dtype=str))
+        self._write_array('addresses', np.array(store.addresses, dtype=str))
+        self.rows_written = count
+        return count
+
+
+def open_export(path, file_format=None, title="", stats=None, total=0):
+    """Open the writer for ``file_format``, or for the format ``path`` names.
+
+    ``title``, ``stats`` and ``total`` are only used by the text report.
+    """
+    file_format = file_format or export_format(path)
+    if file_format == FORMAT_CSV:
+        return CsvWriter(path)
+    if file_format == FORMAT_JSONL:
+        return JsonLinesWriter(path)
+    if file_format == FORMAT_COLUMNAR:
+        return ColumnarWriter(path)
+    return TextReportWriter(path, title, stats, total)
@@ -0,0 +1,459 @@
+# components/sketches.py
+# Fixed-size streaming summaries. Each one is updated from whole batches of
+# NumPy keys and can be merged with another of the same kind, so summaries
+# of separate time windows combine into one for the union of the windows.
+import numpy as np
+
+
+def _unique_keys(keys):
+    """Distinct keys and, for each input key, the index of its distinct key.
+
+    ``keys`` is either 1-D or 2-D with one composite key per row.
+    """
+    if keys.ndim == 1:
+        return np.unique(keys, return_inverse=True)
+    # Chained stable argsorts beat np.lexsort on uint64 columns by a wide margin
+    order = np.argsort(keys[:, -1])
+    for column in range(keys.shape[1] - 2, -1, -1):
+        order = order[np.argsort(keys[order, column], kind='stable')]
+    sorted_keys = keys[order]
+    boundary = np.empty(len(keys), dtype=np.bool_)
+    boundary[:1] = True
+    boundary[1:] = (sorted_keys[1:] != sorted_keys[:-1]).any(axis=1)
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = np.cumsum(boundary) - 1
+    return sorted_keys[boundary], inverse
+
+
+class SpaceSaving:
+    """Weighted heavy hitters in at most ``capacity`` counters (Space-Saving).
+
+    Every reported count over-estimates the key's true total by at most its
+    ``error``, and every error is at most ``total / capacity``; a key whose
+    true total exceeds ``total / capacity`` is always in the summary.
+    Weights can be 1 per packet or the packet size for byte totals.
+
+    Batches are folded in by merging the summary with the batch's exact
+    totals, and two summaries merge the same way: a key missing from a full
+    summary is assumed to have that summary's smallest count, which keeps
+    both guarantees for the combined stream.
+    """
+
+    def __init__(self, capacity=1024, key_width=None):
+        self.capacity = capacity
+        # None for scalar keys, or the number of uint64 parts per key
+        self.key_width = key_width
+        self.reset()
+
+    def reset(self):
+        shape = (0,) if self.key_width is None else (0, self.key_width)
+        self.keys = np.zeros(shape, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+        self.total = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _floor(self):
+        """Smallest count a missing key could have, 0 unless the summary is full"""
+        if len(self.counts) < self.capacity:
+            return 0
+        return int(self.counts.min())
+
+    def update(self, keys, weights=None):
+        """Fold a batch of keys in, each weighing 1 or its entry in ``weights``"""
+        if not len(keys):
+            return
+        keys = np.asarray(keys, dtype=np.uint64)
+        if weights is None:
+            weights = np.ones(len(keys), dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.int64)
+        # The batch is an exact summary: no floor and no error
+        self._merge(keys, weights, None, 0, int(weights.sum()))
+
+    def merge(self, other):
+        """Fold in another summary of the same key shape"""
+        self._merge(other.keys, other.counts, other.errors, other._floor(), other.total)
+
+    def _merge(self, keys, counts, errors, floor, total):
+        """Combine with (possibly repeated) ``keys`` carrying ``counts`` and ``errors``"""
+        own = len(self.counts)
+        own_floor = self._floor()
+        distinct, inverse = _unique_keys(np.concatenate([self.keys, keys]))
+        size = len(distinct)
+        merged_counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                    minlength=size).astype(np.int64)
+        if errors is None:
+            merged_errors = np.zeros(size, dtype=np.int64)
+            merged_errors[inverse[:own]] = self.errors
+        else:
+            merged_errors = np.bincount(inverse, weights=np.concatenate([self.errors, errors]),
+                                        minlength=size).astype(np.int64)
+        # A key missing from one side may still have up to that side's floor
+        if own_floor:
+            missing = np.ones(size, dtype=np.bool_)
+            missing[inverse[:own]] = False
+            merged_counts[missing] += own_floor
+            merged_errors[missing] += own_floor
+        if floor:
+            missing = np.ones(size, dtype=np.bool_)
+            missing[inverse[own:]] = False
+            merged_counts[missing] += floor
+            merged_errors[missing] += floor
+
+        if size > self.capacity:
+            keep = np.argpartition(merged_counts, size - self.capacity)[-self.capacity:]
+            distinct, merged_counts, merged_errors = distinct[keep], merged_counts[keep], merged_errors[keep]
+        self.keys, self.counts, self.errors = distinct, merged_counts, merged_errors
+        self.total += total
+
+    def top(self, count=10):
+        """The ``count`` largest (key, estimate, error) triples, largest first"""
+        if len(self.counts) > count:
+            keep = np.argpartition(self.counts, len(self.counts) - count)[-count:]
+        else:
+            keep = np.arange(len(self.counts))
+        keep = keep[np.argsort(self.counts[keep], kind='stable')[::-1]]
+        keys = self.keys[keep]
+        keys = keys.tolist() if self.key_width is None else [tuple(row) for row in keys.tolist()]
+        return list(zip(keys, self.counts[keep].tolist(), self.errors[keep].tolist()))
+
+    @property
+    def max_error(self):
+        """Upper bound on the over-estimate of any reported count"""
+        return self.total // self.capacity
+
+
+def hash64(keys):
+    """Well-mixed 64-bit hashes of uint64 keys (splitmix64 finalizer).
+
+    2-D keys are hashed column by column, each column mixed into the last.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    columns = keys.T if keys.ndim == 2 else (keys,)
+    hashes = np.zeros(len(keys), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column in columns:
+            h = (hashes ^ column) + np.uint64(0x9E3779B97F4A7C15)
+            h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            hashes = h ^ (h >> np.uint64(31))
+    return hashes
+
+
+def _register_ranks(hashes, precision):
+    """HyperLogLog register index and rank (leading zeros + 1) of each hash"""
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    # Rank over the next 52 bits, which convert to float exactly; frexp's
+    # exponent is then the bit length
+    rest = (hashes << np.uint64(precision)) >> np.uint64(12)
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    return index, (53 - bit_length).astype(np.uint8)
+
+
+# 2 ** -rank for every possible register value
+_INVERSE_POWERS = np.exp2(-np.arange(256, dtype=np.float64))
+
+
+def _hll_estimate(registers):
+    """Cardinality estimates for one register array or a 2-D stack of them"""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+    raw = alpha * m * m / _INVERSE_POWERS[registers].sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    # Linear counting is more accurate while many registers are still empty
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class HyperLogLog:
+    """Distinct-count estimate in ``2 ** precision`` one-byte registers.
+
+    The relative standard error is about ``1.04 / sqrt(2 ** precision)``,
+    1.6% at the default precision of 12 (4 KB). Merging two estimators
+    gives the estimator of the union of their streams.
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def reset(self):
+        self.registers[:] = 0
+
+    def update(self, keys):
+        """Add a batch of uint64 keys (1-D, or 2-D composite keys)"""
+        if len(keys):
+            index, rank = _register_ranks(hash64(keys), self.precision)
+            np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        return float(_hll_estimate(self.registers)[0])
+
+
+class WindowedHyperLogLog:
+    """Distinct counts over the whole stream and over recent time windows.
+
+    Keys are binned into ``window_seconds`` windows of capture time, and the
+    last ``windows`` of them are kept as a ring of register arrays, so the
+    recent count is a merge of a fixed number of estimators.
+    """
+
+    def __init__(self, window_seconds=10, windows=6, precision=12):
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self.precision = precision
+        self.reset()
+
+    def reset(self):
+        self.total = HyperLogLog(self.precision)
+        self._ring = np.zeros((self.windows, 1 << self.precision), dtype=np.uint8)
+        self._latest = None
+
+    def update(self, keys, timestamps):
+        if not len(keys):
+            return
+        hashes = hash64(keys)
+        index, rank = _register_ranks(hashes, self.precision)
+        np.maximum.at(self.total.registers, index, rank)
+
+        windows = np.floor(timestamps / self.window_seconds).astype(np.int64)
+        newest = int(windows.max())
+        if self._latest is None:
+            self._latest = newest
+        elif newest > self._latest:
+            # Clear the slots of windows that are starting
+            for window in range(max(self._latest + 1, newest - self.windows + 1), newest + 1):
+                self._ring[window % self.windows] = 0
+            self._latest = newest
+        # Keys older than the ring only count towards the total
+        recent = windows > self._latest - self.windows
+        slots = windows[recent] % self.windows
+        np.maximum.at(self._ring, (slots, index[recent]), rank[recent])
+
+    def recent(self, windows=None):
+        """Distinct keys in the last ``windows`` windows (all of the ring by default)"""
+        if self._latest is None:
+            return 0.0
+        windows = min(windows or self.windows, self.windows)
+        slots = [(self._latest - back) % self.windows for back in range(windows)]
+        return float(_hll_estimate(self._ring[slots].max(axis=0))[0])
+
+    def window_estimates(self):
+        """Distinct keys in each window of the ring, oldest first"""
+        if self._latest is None:
+            return []
+        slots = [(self._latest - back) % self.windows for back in range(self.windows - 1, -1, -1)]
+        return _hll_estimate(self._ring[slots]).tolist()
+
+    def merge(self, other):
+        """Fold in another estimator with the same window layout"""
+        self.total.merge(other.total)
+        if other._latest is None:
+            return
+        if self._latest is None or other._latest > self._latest:
+            shift = other._latest - (self._latest if self._latest is not None else other._latest)
+            for window in range(other._latest - min(shift, self.windows) + 1, other._latest + 1):
+                self._ring[window % self.windows] = 0
+            self._latest = other._latest
+        for back in range(self.windows):
+            window = other._latest - back
+            if window > self._latest - self.windows:
+                slot = window % self.windows
+                np.maximum(self._ring[slot], other._ring[slot], out=self._ring[slot])
+
+
+class KeyedHyperLogLog:
+    """Distinct values per key, for at most ``capacity`` keys.
+
+    Each tracked key has a small HyperLogLog of ``2 ** precision`` registers
+    (13% relative error at the default precision of 6), all in one fixed
+    table. When more keys show up than fit, the keys with the lowest
+    estimates make room, so the keys with the most distinct values, such as
+    a scanner's source address, stay tracked. Once the table is full, a new
+    key is only admitted if it has more rows in its batch than the smallest
+    tracked estimate, which keeps a flood of one-off keys cheap.
+    """
+
+    def __init__(self, capacity=4096, precision=6):
+        self.capacity = capacity
+        self.precision = precision
+        self.reset()
+
+    def reset(self):
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.registers = np.zeros((0, 1 << self.precision), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def update(self, keys, values):
+        """Record that each of ``keys`` was seen with the matching entry of ``values``"""
+        if not len(keys):
+            return
+        keys = np.asarray(keys, dtype=np.uint64)
+        index, rank = _register_ranks(hash64(values), self.precision)
+        distinct, inverse = np.unique(keys, return_inverse=True)
+
+        # Tracked keys come first in the table; new ones are appended after
+        position = np.searchsorted(self.keys, distinct)
+        position = np.minimum(position, max(len(self.keys) - 1, 0))
+        known = (self.keys[position] == distinct) if len(self.keys) else np.zeros(len(distinct), np.bool_)
+        new = ~known
+        room = self.capacity - len(self.keys)
+        if new.sum() > room:
+            rows_per_key = np.bincount(inverse, minlength=len(distinct))
+            smallest = _hll_estimate(self.registers).min() if len(self.keys) else 0
+            admit = new & (rows_per_key > smallest)
+            if room > 0:
+                # Free slots go to the busiest new keys
+                candidates = np.flatnonzero(new)
+                busiest = candidates[np.argsort(rows_per_key[candidates], kind='stable')[::-1][:room]]
+                admit[busiest] = True
+            new = admit
+        new_keys = distinct[new]
+        rows = np.full(len(distinct), -1, dtype=np.int64)
+        rows[known] = position[known]
+        rows[new] = len(self.keys) + np.arange(len(new_keys))
+        registers = np.concatenate([self.registers,
+                                    np.zeros((len(new_keys), self.registers.shape[1]), np.uint8)])
+        row_of = rows[inverse]
+        tracked = row_of >= 0
+        np.maximum.at(registers, (row_of[tracked], index[tracked]), rank[tracked])
+        keys = np.concatenate([self.keys, new_keys])
+
+        if len(keys) > self.capacity:
+            estimates = _hll_estimate(registers)
+            keep = np.argpartition(estimates, len(keys) - self.capacity)[-self.capacity:]
+            keys, registers = keys[keep], registers[keep]
+        # Keep the table sorted by key for the next lookup
+        order = np.argsort(keys)
+        self.keys, self.registers = keys[order], registers[order]
+
+    def merge(self, other):
+        """Fold in another table; keys over capacity are dropped as in ``update``"""
+        keys = np.concatenate([self.keys, other.keys])
+        registers = np.concatenate([self.registers, other.registers])
+        distinct, inverse = np.unique(keys, return_inverse=True)
+        merged = np.zeros((len(distinct), registers.shape[1]), dtype=np.uint8)
+        np.maximum.at(merged, inverse, registers)
+        if len(distinct) > self.capacity:
+            keep = np.sort(np.argpartition(_hll_estimate(merged), len(distinct) - self.capacity)[-self.capacity:])
+            distinct, merged = distinct[keep], merged[keep]
+        self.keys, self.registers = distinct, merged
+
+    def top(self, count=10):
+        """The ``count`` keys with the most distinct values, as (key, estimate)"""
+        if not len(self.keys):
+            return []
+        estimates = _hll_estimate(self.registers)
+        order = np.argsort(estimates, kind='stable')[::-1][:count]
+        return list(zip(self.keys[order].tolist(), estimates[order].tolist()))
+
+
+class DDSketch:
+    """Quantiles with bounded relative error over a fixed range of values.
+
+    Values fall into logarithmic buckets of ratio ``gamma = (1 + a) / (1 - a)``
+    for ``a = relative_accuracy``, so any reported quantile is within a
+    factor ``a`` of the true value at that rank. Buckets cover
+    ``[min_value, max_value]`` densely: smaller values (and zero) share one
+    bucket reported as 0 and larger ones are counted in the top bucket, so
+    memory is fixed by the range, not the stream length.
+
+    Counts are kept per series (rows of a 2-D array, e.g. one per protocol
+    code); the overall distribution is the sum of the rows. Merging adds
+    counts bucket by bucket.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-6, max_value=1e6):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.max_value = max_value
+        self._offset = int(np.ceil(np.log(min_value) / self._log_gamma))
+        # Bucket 0 holds values below min_value
+        self.buckets = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 2
+        self.reset()
+
+    def reset(self):
+        self.counts = np.zeros((1, self.buckets), dtype=np.int64)
+
+    def _bucket(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        index = np.ones(len(values), dtype=np.int64)
+        small = values < self.min_value
+        index[~small] = np.ceil(np.log(values[~small]) / self._log_gamma).astype(np.int64) - self._offset + 1
+        index[small] = 0
+        return np.minimum(index, self.buckets - 1)
+
+    def _values(self, buckets):
+        """Representative value of each bucket"""
+        buckets = np.asarray(buckets)
+        values = 2 * self.gamma ** (buckets + self._offset - 1) / (1 + self.gamma)
+        return np.where(buckets == 0, 0.0, values)
+
+    def update(self, values, series=None):
+        """Add a batch of values, each to row 0 or to its entry of ``series``"""
+        if not len(values):
+            return
+        buckets = self._bucket(values)
+        if series is None:
+            self.counts[0] += np.bincount(buckets, minlength=self.buckets)
+            return
+        series = np.asarray(series, dtype=np.int64)
+        rows = int(series.max()) + 1
+        if rows > len(self.counts):
+            grown = np.zeros((rows, self.buckets), dtype=np.int64)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+        flat = series * self.buckets + buckets
+        self.counts[:rows] += np.bincount(flat, minlength=rows * self.buckets).reshape(rows, self.buckets)
+
+    def merge(self, other):
+        rows = max(len(self.counts), len(other.counts))
+        merged = np.zeros((rows, self.buckets), dtype=np.int64)
+        merged[:len(self.counts)] += self.counts
+        merged[:len(other.counts)] += other.counts
+        self.counts = merged
+
+    def _row(self, series):
+        if series is None:
+            return self.counts.sum(axis=0)
+        if series >= len(self.counts):
+            return np.zeros(self.buckets, dtype=np.int64)
+        return self.counts[series]
+
+    def count(self, series=None):
+        return int(self._row(series).sum())
+
+    def series(self):
+        """Row numbers that hold any values"""
+        return np.flatnonzero(self.counts.sum(axis=1)).tolist()
+
+    def quantiles(self, qs, series=None):
+        """Estimated values at quantiles ``qs`` (in [0, 1]), or NaNs if empty"""
+        row = self._row(series)
+        total = row.sum()
+        if not total:
+            return [float('nan')] * len(qs)
+        cumulative = np.cumsum(row)
+        ranks = np.asarray(qs, dtype=np.float64) * (total - 1)
+        buckets = np.searchsorted(cumulative, ranks, side='right')
+        return self._values(buckets).tolist()
+
+    def histogram(self, series=None):
+        """(bucket lower edges, upper edges, counts) over the occupied range"""
+        row = self._row(series)
+        used = np.flatnonzero(row)
+        if not len(used):
+            return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)
+        buckets = np.arange(max(used[0], 1), used[-1] + 1)
+        upper = self.gamma ** (buckets + self._offset - 1)
+        return upper / self.gamma, upper, row[buckets]
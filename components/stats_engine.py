@@ -0,0 +1,283 @@
+# components/stats_engine.py
+import threading
+from collections import Counter
+
+import numpy as np
+
+from components.flow_table import endpoint_keys, split_endpoint
+from components.sketches import SpaceSaving, WindowedHyperLogLog, KeyedHyperLogLog, DDSketch
+from utils.constants import FIELD_SRC_IP, FIELD_DST_IP, FIELD_DST_PORT
+
+# Columns the aggregates are computed from
+STATS_COLUMNS = ('timestamp', 'size', 'protocol', 'src_ip', 'dst_ip', 'src_port', 'dst_port',
+                 'tcp_flags', 'fields')
+
+# Entries shown per top-N section
+TOP_N = 5
+
+# Percentiles shown for packet sizes and inter-arrival times
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class StreamingStatistics:
+    """Running aggregates over the packet stream.
+
+    Each batch is folded in once as it arrives, so producing the statistics
+    dict costs O(k) in the number of tracked keys instead of a rescan of the
+    whole capture. Top-N sections come from Space-Saving summaries of
+    ``sketch_capacity`` keys each, so memory stays fixed however many
+    distinct addresses, ports or conversations the traffic contains; an
+    estimate is shown with its error bound when it may be inexact.
+    Distinct sources, destinations and ports, overall and over the last
+    ``cardinality_windows`` windows of ``cardinality_window`` seconds, and
+    per-key distinct counts come from HyperLogLog estimators, also of fixed
+    size, so scans and floods show up as jumps in these counts. Packet
+    size and inter-arrival time percentiles, overall and per protocol, come
+    from DDSketches accurate to 1% of the value.
+    """
+
+    def __init__(self, sketch_capacity=1024, cardinality_window=10, cardinality_windows=6):
+        self.sketch_capacity = sketch_capacity
+        self.cardinality_window = cardinality_window
+        self.cardinality_windows = cardinality_windows
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything seen so far"""
+        with self._lock:
+            self.packet_count = 0
+            self.total_bytes = 0
+            self.first_timestamp = None
+            self.last_timestamp = None
+            self.protocol_counts = Counter()
+            capacity = self.sketch_capacity
+            self.src_ips = SpaceSaving(capacity)
+            self.dst_ips = SpaceSaving(capacity)
+            self.dst_ports = SpaceSaving(capacity)
+            self.src_bytes = SpaceSaving(capacity)
+            self.dst_bytes = SpaceSaving(capacity)
+            self.conversations = SpaceSaving(capacity, key_width=2)
+            window, windows = self.cardinality_window, self.cardinality_windows
+            self.distinct_sources = WindowedHyperLogLog(window, windows)
+            self.distinct_destinations = WindowedHyperLogLog(window, windows)
+            self.distinct_ports = WindowedHyperLogLog(window, windows)
+            self.ports_per_source = KeyedHyperLogLog()
+            self.sources_per_destination = KeyedHyperLogLog()
+            # Sizes per protocol code; inter-arrival times between consecutive
+            # packets overall (row 0) and of the same protocol (row code + 1)
+            self.packet_sizes = DDSketch(0.01, 1, 1 << 20)
+            self.inter_arrival = DDSketch(0.01, 1e-7, 1e5)
+            self._last_arrival = None
+            self._last_arrival_by_protocol = np.full(256, np.nan)
+            self._store = None
+
+    def rebuild(self, packets):
+        """Reset and fold in every packet of a store or filtered view"""
+        self.reset()
+        self.update_columns(packets.columns(STATS_COLUMNS), packets)
+
+    def update_columns(self, cols, store):
+        """Fold a batch of rows given as store-encoded column arrays.
+
+        ``store`` resolves protocol codes and interned addresses to labels;
+        every batch must come from the same store.
+        """
+        if not len(cols['timestamp']):
+            return
+        fields = cols['fields']
+        sizes = cols['size']
+
+        protocol_counts = np.bincount(cols['protocol'])
+        names = store.protocol_names
+
+        # Endpoint keys tag interned and missing addresses so they stay distinct
+        src, dst = endpoint_keys(cols)
+        src_addresses = src >> np.uint64(16)
+        dst_addresses = dst >> np.uint64(16)
+        has_port = ((fields & FIELD_DST_PORT) != 0) & (cols['dst_port'] != 0)
+        has_src = (fields & FIELD_SRC_IP) != 0
+        has_dst = (fields & FIELD_DST_IP) != 0
+        timestamps = cols['timestamp']
+        ports = cols['dst_port'][has_port]
+        # Conversations in the same canonical form as the flow table
+        lo_to_hi = src <= dst
+        conversation = np.empty((len(src), 2), dtype=np.uint64)
+        conversation[:, 0] = np.where(lo_to_hi, src, dst)
+        conversation[:, 1] = (np.where(lo_to_hi, dst, src) << np.uint64(8)) | cols['protocol'].astype(np.uint64)
+
+        first = float(cols['timestamp'].min())
+        last = float(cols['timestamp'].max())
+        with self._lock:
+            self._store = store
+            self.packet_count += len(cols['timestamp'])
+            self.total_bytes += int(sizes.sum(dtype=np.uint64))
+            if self.first_timestamp is None or first < self.first_timestamp:
+                self.first_timestamp = first
+            if self.last_timestamp is None or last > self.last_timestamp:
+                self.last_timestamp = last
+            self.protocol_counts.update({names[code]: int(count)
+                                         for code, count in enumerate(protocol_counts) if count})
+            self.src_ips.update(src_addresses)
+            self.dst_ips.update(dst_addresses)
+            self.dst_ports.update(ports)
+            self.src_bytes.update(src_addresses, sizes)
+            self.dst_bytes.update(dst_addresses, sizes)
+            self.conversations.update(conversation, sizes)
+            self.distinct_sources.update(src_addresses[has_src], timestamps[has_src])
+            self.distinct_destinations.update(dst_addresses[has_dst], timestamps[has_dst])
+            self.distinct_ports.update(ports, timestamps[has_port])
+            scanned = has_src & has_port
+            self.ports_per_source.update(src_addresses[scanned], cols['dst_port'][scanned])
+            both = has_src & has_dst
+            self.sources_per_destination.update(dst_addresses[both], src_addresses[both])
+            self.packet_sizes.update(sizes, cols['protocol'])
+            self._update_inter_arrival(timestamps, cols['protocol'])
+
+    def _update_inter_arrival(self, timestamps, protocols):
+        """Gaps between consecutive packets, in arrival order, overall and per protocol"""
+        previous = np.empty_like(timestamps)
+        previous[1:] = timestamps[:-1]
+        previous[0] = np.nan if self._last_arrival is None else self._last_arrival
+        self._last_arrival = float(timestamps[-1])
+
+        order = np.argsort(protocols, kind='stable')
+        grouped = protocols[order]
+        times = timestamps[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        ends = np.r_[starts[1:], len(order)] - 1
+        previous_same = np.empty_like(times)
+        previous_same[1:] = times[:-1]
+        previous_same[starts] = self._last_arrival_by_protocol[grouped[starts]]
+        self._last_arrival_by_protocol[grouped[ends]] = times[ends]
+
+        gaps = np.concatenate([timestamps - previous, times - previous_same])
+        rows = np.concatenate([np.zeros(len(timestamps), dtype=np.int64), grouped.astype(np.int64) + 1])
+        known = ~np.isnan(gaps)
+        # Packets that arrive out of order count as a zero gap
+        self.inter_arrival.update(np.maximum(gaps[known], 0), rows[known])
+
+    @staticmethod
+    def _address_label(store, key):
+        if key >> 33:
+            return ''
+        return store.format_address(key & 0xFFFFFFFF, key >> 32)
+
+    @staticmethod
+    def _conversation_label(store, key):
+        def endpoint(packed):
+            address, port = split_endpoint(packed, store)
+            return f"[{address}]:{port}" if ':' in address else f"{address}:{port}"
+
+        lo, hi = key
+        protocol = hi & 0xFF
+        a, b = endpoint(lo), endpoint(hi >> 8)
+        name = store.protocol_names[protocol] if protocol < len(store.protocol_names) else 'Other'
+        return f"{a} ↔ {b} {name}"
+
+    @staticmethod
+    def _estimate(count, error, unit=None):
+        text = f"{count / 1024:.1f} KB" if unit == 'bytes' else str(count)
+        if not error:
+            return count if unit is None else text
+        bound = f"{error / 1024:.1f} KB" if unit == 'bytes' else str(error)
+        return f"{text} (±{bound})"
+
+    def _distinct(self, counter):
+        """Latest window, all recent windows and all time for a windowed counter"""
+        window = self.cardinality_window
+        return (f"≈{counter.recent(1):.0f} last {window} s, "
+                f"≈{counter.recent():.0f} last {window * self.cardinality_windows} s, "
+                f"≈{counter.total.estimate():.0f} total")
+
+    def _top_distinct(self, keyed):
+        store = self._store
+        return {self._address_label(store, key): f"≈{estimate:.0f}"
+                for key, estimate in keyed.top(TOP_N)}
+
+    @staticmethod
+    def _format_bytes(value):
+        return f"{value:.0f} B" if value < 1024 else f"{value / 1024:.1f} KB"
+
+    @staticmethod
+    def _format_seconds(value):
+        if value < 1e-3:
+            return f"{value * 1e6:.0f} µs"
+        if value < 1:
+            return f"{value * 1e3:.1f} ms"
+        return f"{value:.2f} s"
+
+    def _percentiles(self, sketch, format_value, series=None):
+        return "  ".join(f"p{q * 100:g} {format_value(v)}"
+                         for q, v in zip(PERCENTILES, sketch.quantiles(PERCENTILES, series)))
+
+    def _distribution_section(self, sketch, format_value, overall, offset):
+        """Percentiles for all traffic and each protocol present, busiest first"""
+        names = self._store.protocol_names
+        section = {"All": self._percentiles(sketch, format_value, overall)}
+        rows = sorted(sketch.series(), key=sketch.count, reverse=True)
+        for row in rows:
+            code = row - offset
+            if 0 <= code < len(names):
+                section[names[code]] = self._percentiles(sketch, format_value, row)
+        return section
+
+    def distributions(self):
+        """Histograms and percentiles of all packets for the distribution chart"""
+        with self._lock:
+            if not self.packet_count:
+                return None
+            return {
+                'size': self.packet_sizes.histogram() + (self.packet_sizes.quantiles(PERCENTILES),),
+                'inter_arrival': self.inter_arrival.histogram(0) + (self.inter_arrival.quantiles(PERCENTILES, 0),),
+                'percentiles': PERCENTILES,
+            }
+
+    def _top(self, sketch, label, unit=None):
+        store = self._store
+        return {label(store, key): self._estimate(count, error, unit)
+                for key, count, error in sketch.top(TOP_N)}
+
+    def protocols(self):
+        """Protocol name -> packet count"""
+        with self._lock:
+            return dict(self.protocol_counts)
+
+    def snapshot(self, is_real_capture):
+        """Return the statistics dict shown in the UI and in reports"""
+        with self._lock:
+            if not self.packet_count:
+                return {"Total packets": 0}
+
+            count = self.packet_count
+            stats = {}
+            stats["Total packets"] = count
+            stats["Total data"] = f"{self.total_bytes / 1024:.2f} KB"
+
+            duration = self.last_timestamp - self.first_timestamp
+            stats["Capture duration"] = f"{duration:.1f} seconds"
+            stats["Packets/second"] = f"{count / duration:.1f}" if duration > 0 else "0"
+
+            stats["Protocol distribution"] = {k: f"{v} ({v/count*100:.1f}%)"
+                                             for k, v in self.protocol_counts.most_common()}
+            stats["Packet size"] = self._distribution_section(self.packet_sizes, self._format_bytes, None, 0)
+            stats["Inter-arrival time"] = self._distribution_section(self.inter_arrival, self._format_seconds,
+                                                                     0, 1)
+            stats["Top source IPs"] = self._top(self.src_ips, self._address_label)
+            stats["Top destination IPs"] = self._top(self.dst_ips, self._address_label)
+            stats["Top destination ports"] = {str(port): self._estimate(count, error)
+                                              for port, count, error in self.dst_ports.top(TOP_N)}
+            stats["Top sources by bytes"] = self._top(self.src_bytes, self._address_label, 'bytes')
+            stats["Top destinations by bytes"] = self._top(self.dst_bytes, self._address_label, 'bytes')
+            stats["Top conversations by bytes"] = self._top(self.conversations, self._conversation_label,
+                                                            'bytes')
+            stats["Distinct counts"] = {
+                "Sources": self._distinct(self.distinct_sources),
+                "Destinations": self._distinct(self.distinct_destinations),
+                "Destination ports": self._distinct(self.distinct_ports),
+            }
+            stats["Most destination ports per source"] = self._top_distinct(self.ports_per_source)
+            stats["Most sources per destination"] = self._top_distinct(self.sources_per_destination)
+
+        stats["Capture type"] = "Real packets" if is_real_capture else "Sample data"
+        return stats
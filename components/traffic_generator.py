@@ -0,0 +1,383 @@
+# components/traffic_generator.py
+# Synthetic traffic for simulation mode and sample data, generated a batch
+# at a time with NumPy. Packets belong to flows whose sizes are heavy-tailed
+# (most flows are a few packets, a few carry most of the bytes); flows start
+# at a rate that follows a daily curve; TCP flows open with a three-way
+# handshake and close with a FIN. SYN floods, port scans and exfiltration
+# bursts can be scheduled on top. Batches come out as store-encoded columns
+# in the same layout as the decode pipeline's, and a seeded generator
+# produces the same traffic every time.
+import math
+from datetime import datetime
+
+import numpy as np
+
+from models.packet_store import COLUMN_DTYPES
+from utils.constants import (
+    PROTOCOLS, FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_PORT, FIELD_DST_PORT,
+    FIELD_TCP_FLAGS, FIELD_ICMP_TYPE
+)
+
+ATTACK_SYN_FLOOD = "syn-flood"
+ATTACK_PORT_SCAN = "port-scan"
+ATTACK_EXFIL = "exfil"
+ATTACKS = (ATTACK_SYN_FLOOD, ATTACK_PORT_SCAN, ATTACK_EXFIL)
+
+# Packets per second an attack runs at unless given a rate
+ATTACK_RATES = {ATTACK_SYN_FLOOD: 20000.0, ATTACK_PORT_SCAN: 2000.0, ATTACK_EXFIL: 5000.0}
+
+SYN, SYN_ACK, ACK, PSH_ACK, FIN_ACK = 0x02, 0x12, 0x10, 0x18, 0x11
+ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST = 0, 8
+
+# Header-only frame sizes: Ethernet + IPv4 + TCP / UDP / ICMP
+TCP_HEADER_SIZE, UDP_HEADER_SIZE, ICMP_ECHO_SIZE = 66, 42, 98
+MTU_FRAME = 1514
+
+# Longest slice of the daily curve treated as having a constant rate
+_CURVE_STEP = 60.0
+
+# Kinds of flow, with how often each starts. Each flow kind has a protocol
+# label, the server ports it uses, and the share of its data packets that
+# go from server to client.
+_KIND_TCP, _KIND_DNS, _KIND_ICMP, _KIND_UDP = range(4)
+_FLOW_KINDS = (
+    # label,  weight, transport,  server ports,                 downstream share
+    ("HTTPS", 0.42, _KIND_TCP, (443,), 0.75),
+    ("HTTP", 0.08, _KIND_TCP, (80, 8080), 0.75),
+    ("DNS", 0.22, _KIND_DNS, (53,), 0.5),
+    ("SSH", 0.03, _KIND_TCP, (22,), 0.5),
+    ("FTP", 0.01, _KIND_TCP, (21,), 0.6),
+    ("TCP", 0.10, _KIND_TCP, (25, 110, 3306, 5432, 6379), 0.5),
+    ("UDP", 0.10, _KIND_UDP, (123, 443, 1900, 5353), 0.5),
+    ("ICMP", 0.04, _KIND_ICMP, (0,), 0.5),
+)
+_KIND_WEIGHTS = np.array([kind[1] for kind in _FLOW_KINDS])
+_KIND_WEIGHTS /= _KIND_WEIGHTS.sum()
+_KIND_PROTOCOLS = np.array([PROTOCOLS.index(kind[0]) for kind in _FLOW_KINDS], dtype=np.uint8)
+_KIND_TRANSPORT = np.array([kind[2] for kind in _FLOW_KINDS])
+_KIND_DOWNSTREAM = np.array([kind[4] for kind in _FLOW_KINDS])
+_KIND_PORTS = [np.array(kind[3], dtype=np.uint16) for kind in _FLOW_KINDS]
+
+# Address pools, as packed IPv4
+_CLIENT_NET = 0xC0A80000                            # 192.168.0.0/16
+_INTERNAL_NET = 0x0A000000                          # 10.0.0.0/16
+_EXTERNAL_NET = 0x5DB80000                          # 93.184.0.0/16
+_RESOLVERS = np.array([0x08080808, 0x01010101, 0x09090909], dtype=np.uint32)
+_INTERNAL_KINDS = np.array([kind[0] in ("SSH", "FTP", "TCP") for kind in _FLOW_KINDS])
+
+_SCANNER = 0xCB007107                               # 203.0.113.7
+_EXFIL_SOURCE = 0xC0A80142                          # 192.168.1.66
+_EXFIL_TARGET = 0xC6336417                          # 198.51.100.23
+_VICTIM = 0x0A000001                                # 10.0.0.1
+
+
+def empty_columns(count=0):
+    return {name: np.zeros(count, dtype=dtype) for name, dtype in COLUMN_DTYPES.items()}
+
+
+def concatenate_columns(batches):
+    """Join column batches, in order, into one"""
+    batches = [batch for batch in batches if len(batch['timestamp'])]
+    if not batches:
+        return empty_columns()
+    if len(batches) == 1:
+        return batches[0]
+    return {name: np.concatenate([batch[name] for batch in batches]) for name in COLUMN_DTYPES}
+
+
+def take_rows(columns, rows):
+    return {name: values[rows] for name, values in columns.items()}
+
+
+class Attack:
+    """A scheduled attack: ``kind`` at ``rate`` packets/s over [start, start + duration)"""
+
+    def __init__(self, kind, start, duration, rate=None, source=None, target=None, port=None):
+        if kind not in ATTACKS:
+            raise ValueError(f"Unknown attack: {kind}")
+        self.kind = kind
+        self.start = start
+        self.end = start + duration
+        self.rate = ATTACK_RATES[kind] if rate is None else rate
+        self.source = source
+        self.target = target
+        self.port = port
+        # Next port a scan probes, so a scan keeps sweeping across batches
+        self.cursor = 0
+
+    def __repr__(self):
+        return f"Attack({self.kind!r}, {self.start}, {self.end - self.start}, rate={self.rate})"
+
+
+class TrafficGenerator:
+    """Flow-level synthetic traffic at ``rate`` packets per second.
+
+    The rate is the daily mean: it swings by ``diurnal`` (0 for a flat
+    rate) around that, peaking at ``peak_hour`` local time. Flow lengths
+    in packets are Pareto-distributed with shape ``flow_alpha`` and capped
+    at ``max_flow_packets``. Flow durations are log-normal around
+    ``flow_seconds`` and capped at ``max_flow_seconds``, so big flows are
+    fast transfers rather than long ones. Clients and servers are drawn from Zipf-weighted
+    pools of ``clients`` and ``servers`` hosts, so a few are busy and most
+    are quiet.
+
+    ``generate`` is for live simulation: flows still running at the end of
+    a batch carry over into the next. ``sample`` fits a fixed number of
+    packets into a time range, for sample data and tests.
+    """
+
+    def __init__(self, rate=1000.0, seed=None, diurnal=0.5, peak_hour=14.0, flow_alpha=1.2,
+                 max_flow_packets=100000, flow_seconds=1.0, max_flow_seconds=60.0,
+                 clients=2000, servers=400):
+        self.rate = rate
+        self.diurnal = diurnal
+        self.peak_hour = peak_hour
+        self.flow_alpha = flow_alpha
+        self.max_flow_packets = max_flow_packets
+        self.flow_seconds = flow_seconds
+        self.max_flow_seconds = max_flow_seconds
+        self.clients = clients
+        self.servers = servers
+        self.attacks = []
+        self.rng = np.random.default_rng(seed)
+        # Packets of running flows that fall after the last batch, as
+        # time-sorted batches that later calls take prefixes of
+        self._pending = []
+        # Mean packets per flow, for sizing draws of flows
+        self._mean_flow = min(1 + 3 / max(flow_alpha - 1, 0.1), max_flow_packets)
+
+    # -- Scheduling -------------------------------------------------------
+
+    def inject(self, kind, start, duration=10.0, rate=None, source=None, target=None, port=None):
+        """Schedule an attack; addresses are packed IPv4 ints, defaulting per kind"""
+        attack = Attack(kind, start, duration, rate, source, target, port)
+        self.attacks.append(attack)
+        return attack
+
+    def rate_at(self, times):
+        """Mean packet rate at each of ``times`` (epoch seconds) on the daily curve"""
+        times = np.asarray(times, dtype=np.float64)
+        if not self.diurnal:
+            return np.full(times.shape, float(self.rate))
+        offset = datetime.fromtimestamp(float(times.flat[0]) if times.size else 0).astimezone().utcoffset()
+        hours = ((times + offset.total_seconds()) % 86400) / 3600
+        return self.rate * (1 + self.diurnal * np.cos(2 * math.pi * (hours - self.peak_hour) / 24))
+
+    def _curve(self, start, end):
+        """Slice edges of [start, end) and the packets expected in each slice"""
+        steps = max(int(math.ceil((end - start) / _CURVE_STEP)), 1)
+        edges = np.linspace(start, end, steps + 1)
+        return edges, self.rate_at((edges[:-1] + edges[1:]) / 2) * np.diff(edges)
+
+    # -- Generation -------------------------------------------------------
+
+    def generate(self, start, end):
+        """Packets captured in [start, end), sorted by time.
+
+        The count follows the rate curve with Poisson noise. Flows that
+        outlast ``end`` leave their remaining packets for the next call.
+        """
+        if end <= start:
+            return empty_columns()
+        edges, expected = self._curve(start, end)
+        count = int(self.rng.poisson(expected.sum()))
+        batch = self._flows(count, edges, expected, fit=False)
+        later = batch['timestamp'] >= end
+        if later.any():
+            carried = take_rows(batch, later)
+            self._pending.append(take_rows(carried, np.argsort(carried['timestamp'], kind='stable')))
+            batch = take_rows(batch, ~later)
+        batches = [batch]
+        pending = []
+        for carried in self._pending:
+            split = int(np.searchsorted(carried['timestamp'], end))
+            if split:
+                batches.append({name: values[:split] for name, values in carried.items()})
+            if split < len(carried['timestamp']):
+                pending.append({name: values[split:] for name, values in carried.items()})
+        self._pending = pending
+        return self._finish(batches + self._attacks(start, end))
+
+    @property
+    def pending(self):
+        """Packets of running flows still to come"""
+        return sum(len(batch['timestamp']) for batch in self._pending)
+
+    def sample(self, count, start, end):
+        """``count`` background packets spread over [start, end), plus any attacks in it"""
+        edges, expected = self._curve(start, end)
+        return self._finish([self._flows(count, edges, expected, fit=True)] + self._attacks(start, end))
+
+    def _finish(self, batches):
+        batch = concatenate_columns(batches)
+        return take_rows(batch, np.argsort(batch['timestamp'], kind='stable'))
+
+    def _draw_flows(self, count):
+        """Kinds and packet counts of new flows totalling exactly ``count`` packets"""
+        rng = self.rng
+        kinds, lengths = [], []
+        total = 0
+        while total < count:
+            draw = int((count - total) / self._mean_flow) + 16
+            kind = rng.choice(len(_FLOW_KINDS), draw, p=_KIND_WEIGHTS)
+            length = np.minimum(1 + np.floor(rng.pareto(self.flow_alpha, draw) * 3),
+                                self.max_flow_packets).astype(np.int64)
+            # DNS lookups are a query and an answer; pings come in pairs
+            transport = _KIND_TRANSPORT[kind]
+            length[transport == _KIND_DNS] = 2
+            pings = transport == _KIND_ICMP
+            length[pings] = np.minimum(length[pings] + length[pings] % 2, 20)
+            kinds.append(kind)
+            lengths.append(length)
+            total += int(length.sum())
+        kinds, lengths = np.concatenate(kinds), np.concatenate(lengths)
+        ends = np.cumsum(lengths)
+        flows = int(np.searchsorted(ends, count)) + 1
+        kinds, lengths = kinds[:flows], lengths[:flows]
+        lengths[-1] -= ends[flows - 1] - count
+        return kinds, lengths
+
+    def _flows(self, count, edges, expected, fit):
+        """``count`` packets of new flows starting over the slices ``edges``"""
+        if count <= 0:
+            return empty_columns()
+        rng = self.rng
+        kind, lengths = self._draw_flows(count)
+        flows = len(lengths)
+        transport = _KIND_TRANSPORT[kind]
+
+        # Per-flow endpoints and timing
+        slices = rng.choice(len(expected), flows, p=expected / expected.sum())
+        begin = edges[slices] + rng.random(flows) * np.diff(edges)[slices]
+        duration = np.minimum(self.flow_seconds * rng.lognormal(0.0, 1.5, flows), self.max_flow_seconds)
+        # A lookup is answered in milliseconds
+        duration[transport == _KIND_DNS] *= 0.01
+        gap = duration / lengths
+        client = _CLIENT_NET + np.minimum(rng.zipf(1.3, flows), self.clients)
+        server = np.where(_INTERNAL_KINDS[kind], _INTERNAL_NET, _EXTERNAL_NET) + \
+            np.minimum(rng.zipf(1.5, flows), self.servers)
+        server = np.where(transport == _KIND_DNS, _RESOLVERS[rng.integers(0, len(_RESOLVERS), flows)], server)
+        server_port = np.zeros(flows, dtype=np.uint16)
+        for k, ports in enumerate(_KIND_PORTS):
+            chosen = kind == k
+            server_port[chosen] = ports[rng.integers(0, len(ports), int(chosen.sum()))]
+        client_port = rng.integers(32768, 61000, flows)
+
+        # Expand to packets: which flow each belongs to and its place in it
+        flow = np.repeat(np.arange(flows), lengths)
+        first = np.cumsum(lengths) - lengths
+        index = np.arange(count) - first[flow]
+        length = lengths[flow]
+        steps = rng.exponential(1.0, count) * gap[flow]
+        steps[first] = 0.0
+        elapsed = np.cumsum(steps)
+        offset = elapsed - elapsed[first][flow]
+        if fit:
+            # Squeeze flows that would run past the end of the range
+            span = offset[first + lengths - 1]
+            room = edges[-1] - begin
+            scale = np.where(span > room, room / np.maximum(span, 1e-12) * 0.999, 1.0)
+            offset *= scale[flow]
+        timestamps = begin[flow] + offset
+
+        kinds = transport[flow]
+        is_tcp = kinds == _KIND_TCP
+        is_icmp = kinds == _KIND_ICMP
+        # Direction: requests on even packets of lookups and pings, the
+        # handshake's fixed pattern for TCP, otherwise mostly downstream
+        downstream = rng.random(count) < _KIND_DOWNSTREAM[kind][flow]
+        downstream = np.where(kinds == _KIND_DNS, index % 2 == 1, downstream)
+        downstream = np.where(is_icmp, index % 2 == 1, downstream)
+        downstream = np.where(is_tcp & (index < 3), index == 1, downstream)
+
+        # TCP flags: SYN, SYN-ACK, ACK, then data, then FIN from the client
+        last = (index == length - 1) & (length > 3)
+        carries_data = rng.random(count) < np.where(downstream, 0.85, 0.3)
+        flags = np.where(carries_data, PSH_ACK, ACK).astype(np.uint8)
+        flags[index == 0] = SYN
+        flags[index == 1] = SYN_ACK
+        flags[index == 2] = ACK
+        flags[last] = FIN_ACK
+        downstream[is_tcp & last] = False
+        flags[~is_tcp] = 0
+        handshake = is_tcp & ((index < 3) | last)
+
+        # Frame sizes: full segments for bulk data, small requests and ACKs
+        size = np.where(rng.random(count) < 0.7, MTU_FRAME,
+                        rng.integers(TCP_HEADER_SIZE + 40, MTU_FRAME, count))
+        size = np.where(is_tcp & ~downstream, np.where(carries_data, rng.integers(120, 900, count),
+                                                       TCP_HEADER_SIZE), size)
+        size = np.where(handshake | (is_tcp & ~carries_data), TCP_HEADER_SIZE, size)
+        size = np.where(kinds == _KIND_DNS, np.where(downstream, rng.integers(90, 400, count),
+                                                     rng.integers(70, 110, count)), size)
+        size = np.where(kinds == _KIND_UDP, rng.integers(UDP_HEADER_SIZE + 48, 1300, count), size)
+        size = np.where(is_icmp, ICMP_ECHO_SIZE, size)
+
+        fields = np.full(count, FIELD_SRC_IP | FIELD_DST_IP, dtype=np.uint8)
+        fields[~is_icmp] |= FIELD_SRC_PORT | FIELD_DST_PORT
+        fields[is_tcp] |= FIELD_TCP_FLAGS
+        fields[is_icmp] |= FIELD_ICMP_TYPE
+        client, server = client[flow], server[flow]
+        client_port, server_port = client_port[flow], server_port[flow]
+        return {
+            'timestamp': timestamps,
+            'size': size.astype(np.uint32),
+            'src_ip': np.where(downstream, server, client).astype(np.uint32),
+            'dst_ip': np.where(downstream, client, server).astype(np.uint32),
+            'src_port': np.where(is_icmp, 0, np.where(downstream, server_port, client_port)).astype(np.uint16),
+            'dst_port': np.where(is_icmp, 0, np.where(downstream, client_port, server_port)).astype(np.uint16),
+            'protocol': _KIND_PROTOCOLS[kind][flow],
+            'tcp_flags': flags,
+            'icmp_type': np.where(is_icmp, np.where(downstream, ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST),
+                                  0).astype(np.uint8),
+            'fields': fields,
+        }
+
+    # -- Attacks ----------------------------------------------------------
+
+    def _attacks(self, start, end):
+        """Packets of every scheduled attack active during [start, end)"""
+        batches = []
+        for attack in self.attacks:
+            low, high = max(start, attack.start), min(end, attack.end)
+            if high <= low:
+                continue
+            count = int(self.rng.poisson(attack.rate * (high - low)))
+            if count:
+                timestamps = np.sort(low + self.rng.random(count) * (high - low))
+                batches.append(self._attack_packets(attack, timestamps))
+        return batches
+
+    def _attack_packets(self, attack, timestamps):
+        rng = self.rng
+        count = len(timestamps)
+        columns = empty_columns(count)
+        columns['timestamp'] = timestamps
+        columns['fields'][:] = FIELD_SRC_IP | FIELD_DST_IP | FIELD_SRC_PORT | FIELD_DST_PORT | FIELD_TCP_FLAGS
+        columns['protocol'][:] = PROTOCOLS.index("TCP")
+        columns['src_port'] = rng.integers(1024, 65536, count).astype(np.uint16)
+        if attack.kind == ATTACK_SYN_FLOOD:
+            # Spoofed sources from anywhere, all at one service
+            columns['src_ip'] = rng.integers(0x01000000, 0xDF000000, count).astype(np.uint32)
+            columns['dst_ip'][:] = attack.target or _VICTIM
+            columns['dst_port'][:] = attack.port or 80
+            columns['tcp_flags'][:] = SYN
+            columns['size'][:] = TCP_HEADER_SIZE - 6
+        elif attack.kind == ATTACK_PORT_SCAN:
+            # One source sweeping the target's ports in order
+            columns['src_ip'][:] = attack.source or _SCANNER
+            columns['dst_ip'][:] = attack.target or _VICTIM
+            columns['dst_port'] = ((attack.cursor + np.arange(count)) % 65535 + 1).astype(np.uint16)
+            attack.cursor = (attack.cursor + count) % 65535
+            columns['tcp_flags'][:] = SYN
+            columns['size'][:] = TCP_HEADER_SIZE - 6
+        else:
+            # One internal host pushing full segments to an outside server
+            columns['src_ip'][:] = attack.source or _EXFIL_SOURCE
+            columns['dst_ip'][:] = attack.target or _EXFIL_TARGET
+            columns['src_port'][:] = columns['src_port'][0]
+            columns['dst_port'][:] = attack.port or 443
+            columns['protocol'][:] = PROTOCOLS.index("HTTPS")
+            columns['tcp_flags'][:] = PSH_ACK
+            columns['size'][:] = MTU_FRAME
+        return columns
@@ -1,11 +1,14 @@
 # components/ui_builder.py
 import tkinter as tk
 from tkinter import ttk, scrolledtext, font
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime
 import time
 
+from components.virtual_list import VirtualTreeview
+from components.display_filter import FilteredView
+from components.chart_renderer import ChartRenderer
+from utils.helpers import tcp_flag_list
+
 # Custom color scheme
 COLORS = {
     "bg_dark": "#0a0a14",
@@ -22,11 +25,19 @@ COLORS = {
     "info": "#00aaff"
 }
 
+# Packet list row height in pixels, used to map scroll position to packets
+ROW_HEIGHT = 20
+
+# Buttons that would touch the packet store while a file task is using it
+FILE_TASK_LOCKED_BUTTONS = ("load_sample", "clear_data", "export_report", "open_capture",
+                            "save_capture", "open_session", "save_session")
+
 class UIBuilder:
     def __init__(self, root, app):
         self.root = root
         self.app = app
         self.buttons = {}
+        self.packet_data_processor = None
         
         # Configure styles
         self.configure_styles()
@@ -73,6 +84,7 @@ class UIBuilder:
                         foreground=COLORS["text"],
                         fieldbackground=COLORS["bg_light"],
                         borderwidth=0,
+                        rowheight=ROW_HEIGHT,
                         font=("Consolas", 9))
         style.configure("Treeview.Heading",
                         background=COLORS["bg_medium"],
@@ -135,6 +147,20 @@ class UIBuilder:
         style.configure("TLabelframe", background=COLORS["bg_light"], foreground=COLORS["accent"])
         style.configure("TLabelframe.Label", background=COLORS["bg_light"], foreground=COLORS["accent"])
         
+        # Capture filter, compiled to BPF and applied in the kernel
+        filter_label = ttk.Label(control_frame, text="Capture filter (BPF):",
+                                 background=COLORS["bg_light"], foreground=COLORS["text_secondary"])
+        filter_label.pack(fill=tk.X)
+        self.filter_entry = tk.Entry(
+            control_frame,
+            bg=COLORS["bg_medium"],
+            fg=COLORS["text"],
+            insertbackground=COLORS["accent"],
+            relief="flat",
+            font=("Consolas", 9)
+        )
+        self.filter_entry.pack(fill=tk.X, pady=(2, 5), ipady=3)
+        
         # Combined start/stop button
         self.capture_button = ttk.Button(control_frame, text="▶ Start Capture", width=20)
         self.capture_button.pack(fill=tk.X, pady=5)
@@ -152,6 +178,30 @@ class UIBuilder:
         self.buttons["export_report"] = ttk.Button(control_frame, text="Export Report")
         self.buttons["export_report"].pack(fill=tk.X, pady=5)
         
+        # Capture file container
+        file_container = ttk.Frame(control_frame)
+        file_container.pack(fill=tk.X, pady=5)
+        
+        self.buttons["open_capture"] = ttk.Button(file_container, text="Open Capture")
+        self.buttons["open_capture"].pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        
+        self.buttons["save_capture"] = ttk.Button(file_container, text="Save Capture")
+        self.buttons["save_capture"].pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(5, 0))
+        
+        # Saved sessions: segment files with a time index, opened in place
+        session_container = ttk.Frame(control_frame)
+        session_container.pack(fill=tk.X, pady=5)
+        
+        self.buttons["open_session"] = ttk.Button(session_container, text="Open Session")
+        self.buttons["open_session"].pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        
+        self.buttons["save_session"] = ttk.Button(session_container, text="Save Session")
+        self.buttons["save_session"].pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(5, 0))
+        
+        # Stops a running import, save or export
+        self.buttons["cancel_file_task"] = ttk.Button(control_frame, text="Cancel File Task", state=tk.DISABLED)
+        self.buttons["cancel_file_task"].pack(fill=tk.X, pady=5)
+        
     def create_stats_frame(self):
         # Statistics
         stats_frame = ttk.LabelFrame(self.left_panel, text="STATISTICS", padding=15)
@@ -181,6 +231,28 @@ class UIBuilder:
         packet_frame = ttk.LabelFrame(packet_list_panel, text="CAPTURED PACKETS", padding=15)
         packet_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # Display filter bar, applied to packets already captured
+        filter_bar = ttk.Frame(packet_frame)
+        filter_bar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        ttk.Label(filter_bar, text="Display filter:", background=COLORS["bg_light"],
+                  foreground=COLORS["text_secondary"]).pack(side=tk.LEFT)
+        self.display_filter_entry = tk.Entry(
+            filter_bar,
+            bg=COLORS["bg_medium"],
+            fg=COLORS["text"],
+            insertbackground=COLORS["accent"],
+            relief="flat",
+            font=("Consolas", 9)
+        )
+        self.display_filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, ipady=3)
+        self.buttons["apply_display_filter"] = ttk.Button(filter_bar, text="Apply")
+        self.buttons["apply_display_filter"].pack(side=tk.LEFT, padx=(0, 5))
+        self.buttons["clear_display_filter"] = ttk.Button(filter_bar, text="Clear")
+        self.buttons["clear_display_filter"].pack(side=tk.LEFT)
+        self.display_count_label = ttk.Label(filter_bar, text="", background=COLORS["bg_light"],
+                                             foreground=COLORS["text_secondary"])
+        self.display_count_label.pack(side=tk.LEFT, padx=(10, 0))
+        
         # Create treeview for packet list
         columns = ("No", "Time", "Source", "Destination", "Protocol", "Length", "Info")
         self.packet_tree = ttk.Treeview(packet_frame, columns=columns, show="headings", height=15)
@@ -191,18 +263,20 @@ class UIBuilder:
             self.packet_tree.heading(col, text=col)
             self.packet_tree.column(col, width=width, minwidth=40)
         
-        # Add scrollbars
-        v_scrollbar = ttk.Scrollbar(packet_frame, orient=tk.VERTICAL, command=self.packet_tree.yview)
+        # Add scrollbars. The vertical one is driven by the virtual list,
+        # which only keeps the visible rows in the tree.
+        v_scrollbar = ttk.Scrollbar(packet_frame, orient=tk.VERTICAL)
         h_scrollbar = ttk.Scrollbar(packet_frame, orient=tk.HORIZONTAL, command=self.packet_tree.xview)
-        self.packet_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.packet_tree.configure(xscrollcommand=h_scrollbar.set)
+        self.packet_list = VirtualTreeview(self.packet_tree, v_scrollbar, self.format_packet_row, ROW_HEIGHT)
         
         # Grid layout for treeview and scrollbars
-        self.packet_tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.packet_tree.grid(row=1, column=0, sticky="nsew")
+        v_scrollbar.grid(row=1, column=1, sticky="ns")
+        h_scrollbar.grid(row=2, column=0, sticky="ew")
         
         # Configure grid weights
-        packet_frame.grid_rowconfigure(0, weight=1)
+        packet_frame.grid_rowconfigure(1, weight=1)
         packet_frame.grid_columnconfigure(0, weight=1)
         
     def create_details_frame(self):
@@ -244,50 +318,250 @@ class UIBuilder:
         self.protocol_tab = ttk.Frame(self.viz_notebook)
         self.traffic_tab = ttk.Frame(self.viz_notebook)
         
+        self.conversations_tab = ttk.Frame(self.viz_notebook)
+        self.alerts_tab = ttk.Frame(self.viz_notebook)
+        self.distribution_tab = ttk.Frame(self.viz_notebook)
+        self.diagnostics_tab = ttk.Frame(self.viz_notebook)
+        
         self.viz_notebook.add(self.protocol_tab, text="Protocol Distribution")
         self.viz_notebook.add(self.traffic_tab, text="Traffic Over Time")
-        
-        # Create figures for each tab
+        self.viz_notebook.add(self.distribution_tab, text="Distributions")
+        self.viz_notebook.add(self.conversations_tab, text="Conversations")
+        self.viz_notebook.add(self.alerts_tab, text="Alerts")
+        self.viz_notebook.add(self.diagnostics_tab, text="Diagnostics")
+        
+        # Charts are rendered off the main thread and shown as images
+        self.chart_canvases = {}
+        self.chart_images = {}
         self.setup_protocol_tab()
         self.setup_traffic_tab()
+        self.setup_distribution_tab()
+        self.setup_conversations_tab()
+        self.setup_alerts_tab()
+        self.setup_diagnostics_tab()
+        self.chart_renderer = ChartRenderer(self.app.visualizations.charts, self.app.metrics)
+        self.chart_renderer.start()
         
     def setup_protocol_tab(self):
-        # Set dark theme for matplotlib
-        plt.style.use('dark_background')
-        
-        self.protocol_fig, self.protocol_ax = plt.subplots(figsize=(8, 4), facecolor=COLORS["bg_light"])
-        self.protocol_fig.patch.set_alpha(0.0)
-        self.protocol_ax.set_facecolor(COLORS["bg_light"])
-        
-        # Customize colors
-        self.protocol_ax.title.set_color(COLORS["accent"])
-        self.protocol_ax.xaxis.label.set_color(COLORS["text_secondary"])
-        self.protocol_ax.yaxis.label.set_color(COLORS["text_secondary"])
-        self.protocol_ax.tick_params(colors=COLORS["text_secondary"])
-        
-        self.protocol_canvas = FigureCanvasTkAgg(self.protocol_fig, self.protocol_tab)
-        self.protocol_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.protocol_canvas = self.create_chart_canvas(self.protocol_tab, "protocol")
         
     def setup_traffic_tab(self):
-        # Set dark theme for matplotlib
-        plt.style.use('dark_background')
-        
-        self.traffic_fig, self.traffic_ax = plt.subplots(figsize=(8, 4), facecolor=COLORS["bg_light"])
-        self.traffic_fig.patch.set_alpha(0.0)
-        self.traffic_ax.set_facecolor(COLORS["bg_light"])
-        
-        # Customize colors
-        self.traffic_ax.title.set_color(COLORS["accent"])
-        self.traffic_ax.xaxis.label.set_color(COLORS["text_secondary"])
-        self.traffic_ax.yaxis.label.set_color(COLORS["text_secondary"])
-        self.traffic_ax.tick_params(colors=COLORS["text_secondary"])
-        
-        self.traffic_canvas = FigureCanvasTkAgg(self.traffic_fig, self.traffic_tab)
-        self.traffic_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.traffic_canvas = self.create_chart_canvas(self.traffic_tab, "traffic")
+        
+    def setup_distribution_tab(self):
+        self.distribution_canvas = self.create_chart_canvas(self.distribution_tab, "distribution")
+        
+    def setup_conversations_tab(self):
+        # Sort order and flow table counters
+        header = ttk.Frame(self.conversations_tab)
+        header.pack(fill=tk.X, pady=(5, 5))
+        ttk.Label(header, text="Sort by:", foreground=COLORS["text_secondary"]).pack(side=tk.LEFT)
+        self.conversation_sort = tk.StringVar(value="bytes")
+        for value, text in (("bytes", "Bytes"), ("packets", "Packets")):
+            ttk.Radiobutton(header, text=text, value=value, variable=self.conversation_sort,
+                            command=self.app.update_conversations).pack(side=tk.LEFT, padx=5)
+        self.conversation_count_label = ttk.Label(header, text="", foreground=COLORS["text_secondary"])
+        self.conversation_count_label.pack(side=tk.RIGHT)
+        
+        table = ttk.Frame(self.conversations_tab)
+        table.pack(fill=tk.BOTH, expand=True)
+        columns = ("Address A", "Address B", "Protocol", "Packets", "Bytes", "Packets A→B",
+                   "Packets B→A", "Bytes A→B", "Bytes B→A", "Duration", "Flags A→B", "Flags B→A", "State")
+        self.conversation_tree = ttk.Treeview(table, columns=columns, show="headings")
+        column_widths = [150, 150, 70, 70, 80, 80, 80, 80, 80, 70, 120, 120, 90]
+        for col, width in zip(columns, column_widths):
+            self.conversation_tree.heading(col, text=col)
+            self.conversation_tree.column(col, width=width, minwidth=40)
+        # Clicking the totals re-sorts by them
+        for col in ("Packets", "Bytes"):
+            self.conversation_tree.heading(col, command=lambda by=col.lower(): self.sort_conversations(by))
+            
+        v_scrollbar = ttk.Scrollbar(table, orient=tk.VERTICAL, command=self.conversation_tree.yview)
+        h_scrollbar = ttk.Scrollbar(table, orient=tk.HORIZONTAL, command=self.conversation_tree.xview)
+        self.conversation_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.conversation_tree.grid(row=0, column=0, sticky="nsew")
+        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        table.grid_rowconfigure(0, weight=1)
+        table.grid_columnconfigure(0, weight=1)
+        
+        self.viz_notebook.bind("<<NotebookTabChanged>>", lambda event: self.app.update_conversations())
+        
+    def sort_conversations(self, by):
+        self.conversation_sort.set(by)
+        self.app.update_conversations()
+        
+    def conversations_visible(self):
+        return self.viz_notebook.select() == str(self.conversations_tab)
+        
+    def update_conversations(self, flows, store, limit=500):
+        """Show the largest conversations in the flow table"""
+        by = self.conversation_sort.get()
+        rows = []
+        for flow in flows.top(limit, by):
+            info = flows.describe(flow, store)
+            rows.append((
+                self.format_endpoint(info['src_ip'], info['src_port']),
+                self.format_endpoint(info['dst_ip'], info['dst_port']),
+                info['protocol'],
+                info['packets'],
+                info['bytes'],
+                info['packets_ab'],
+                info['packets_ba'],
+                info['bytes_ab'],
+                info['bytes_ba'],
+                f"{info['last_seen'] - info['first_seen']:.1f}s",
+                " ".join(info['flags_ab']),
+                " ".join(info['flags_ba']),
+                info['state'],
+            ))
+        self.conversation_tree.delete(*self.conversation_tree.get_children())
+        for values in rows:
+            self.conversation_tree.insert("", tk.END, values=values)
+        self.conversation_count_label.config(
+            text=f"Active: {len(flows)}  Ended: {flows.ended_count}  Showing top {len(rows)} by {by}")
+            
+    @staticmethod
+    def format_endpoint(address, port):
+        if not port:
+            return address
+        return f"[{address}]:{port}" if ':' in address else f"{address}:{port}"
+        
+    def setup_alerts_tab(self):
+        # Newest alerts first
+        columns = ("Time", "Series", "Metric", "Kind", "Value", "Expected", "Score")
+        self.alert_tree = ttk.Treeview(self.alerts_tab, columns=columns, show="headings")
+        column_widths = [90, 120, 70, 120, 90, 90, 70]
+        for col, width in zip(columns, column_widths):
+            self.alert_tree.heading(col, text=col)
+            self.alert_tree.column(col, width=width, minwidth=40)
+        v_scrollbar = ttk.Scrollbar(self.alerts_tab, orient=tk.VERTICAL, command=self.alert_tree.yview)
+        self.alert_tree.configure(yscrollcommand=v_scrollbar.set)
+        self.alert_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.alerts_shown = 0
+        
+    def update_alerts(self, detector, limit=1000):
+        """Add alerts raised since the last call to the top of the alert log"""
+        if detector.alert_count < self.alerts_shown:
+            # The detector was reset
+            self.alert_tree.delete(*self.alert_tree.get_children())
+            self.alerts_shown = 0
+            self.viz_notebook.tab(self.alerts_tab, text="Alerts")
+        alerts, self.alerts_shown = detector.recent_alerts(self.alerts_shown)
+        if not alerts:
+            return
+        for alert in alerts:
+            value, expected = alert['value'], alert['expected']
+            if alert['metric'] == 'bytes':
+                value, expected = f"{value / 1024:.1f} KB", f"{expected / 1024:.1f} KB"
+            else:
+                value, expected = f"{value:.0f}", f"{expected:.1f}"
+            self.alert_tree.insert("", 0, values=(
+                datetime.fromtimestamp(alert['timestamp']).strftime('%H:%M:%S'),
+                alert['series'],
+                alert['metric'],
+                alert['kind'],
+                value,
+                expected,
+                f"{alert['score']:+.1f}",
+            ))
+        rows = self.alert_tree.get_children()
+        if len(rows) > limit:
+            self.alert_tree.delete(*rows[limit:])
+        self.viz_notebook.tab(self.alerts_tab, text=f"Alerts ({detector.alert_count})")
+        
+    def setup_diagnostics_tab(self):
+        self.diagnostics_text = scrolledtext.ScrolledText(
+            self.diagnostics_tab,
+            bg=COLORS["bg_light"],
+            fg=COLORS["text"],
+            selectbackground=COLORS["accent"],
+            selectforeground=COLORS["bg_dark"],
+            relief="flat",
+            borderwidth=0,
+            font=("Consolas", 9)
+        )
+        self.diagnostics_text.pack(fill=tk.BOTH, expand=True)
+        self._diagnostics_sample = None
+        self.viz_notebook.bind("<<NotebookTabChanged>>", lambda event: self.app.update_diagnostics(), add="+")
+        
+    def diagnostics_visible(self):
+        return self.viz_notebook.select() == str(self.diagnostics_tab)
+        
+    def update_diagnostics(self, metrics, endpoint):
+        """Show stage timings, packet counters, queues, memory and recent errors"""
+        snapshot = metrics.snapshot()
+        now = time.monotonic()
+        parsed = sum(snapshot['packets_parsed_total'].values())
+        rate = ""
+        if self._diagnostics_sample is not None:
+            then, previous = self._diagnostics_sample
+            rate = f"  ({(parsed - previous) / max(now - then, 1e-9):,.0f}/s)"
+        self._diagnostics_sample = (now, parsed)
+        
+        def counts(name):
+            return "  ".join(f"{key} {value:,}" for key, value in snapshot[name].items()) or "0"
+            
+        lines = [
+            f"⚙ DIAGNOSTICS    Metrics endpoint: {endpoint}",
+            f"Uptime {snapshot['uptime_seconds']:,.0f} s   "
+            f"Memory {snapshot['process_resident_bytes'] / 2**20:,.1f} MB   "
+            f"Store {snapshot['store_packets']:,} packets "
+            f"({snapshot['store_resident_bytes'] / 2**20:,.1f} MB in memory, "
+            f"{snapshot['store_spilled_packets']:,} spilled)   Flows {snapshot['flows_active']:,}",
+            "",
+            f"{'STAGE':<22}{'COUNT':>9}{'LAST ms':>10}{'P50 ms':>9}{'P99 ms':>9}{'MAX ms':>9}{'TOTAL s':>10}",
+        ]
+        timings = [(stage, timing) for stage, timing in snapshot['stage_seconds'].items()]
+        timings += [(f"render {chart}", timing)
+                    for chart, timing in snapshot.get('chart_render_seconds', {}).items()]
+        for stage, timing in timings:
+            lines.append(f"{stage:<22}{timing['count']:>9,}{timing['last'] * 1000:>10.2f}"
+                         f"{timing['p50'] * 1000:>9.2f}{timing['p99'] * 1000:>9.2f}"
+                         f"{timing['max'] * 1000:>9.2f}{timing['sum']:>10.2f}")
+        depths, marks = snapshot['queue_depth'], snapshot['queue_high_watermark']
+        lines += [
+            "",
+            f"Received   {counts('packets_received_total')}",
+            f"Parsed     {counts('packets_parsed_total')}{rate}",
+            f"Dropped    {counts('packets_dropped_total')}   "
+            f"batches {snapshot['batches_dropped_total']:,}   filtered {snapshot['packets_filtered_total']:,}",
+            "Queues     " + "  ".join(f"{queue} {depth:,}/{marks[queue]:,}" if queue in marks
+                                      else f"{queue} {depth:,}" for queue, depth in depths.items())
+            + "   (depth/high watermark)",
+            f"Charts     rendered {snapshot.get('charts_rendered_total', 0):,}   "
+            f"superseded {snapshot.get('charts_dropped_total', 0):,}",
+            "",
+            f"Errors     {counts('errors_total')}",
+        ]
+        for when, stage, message in reversed(metrics.errors):
+            lines.append(f"  {datetime.fromtimestamp(when).strftime('%H:%M:%S')} {stage}: {message}")
+        text = "\n".join(lines)
+        if text != self.diagnostics_text.get(1.0, tk.END).rstrip("\n"):
+            position = self.diagnostics_text.yview()[0]
+            self.diagnostics_text.delete(1.0, tk.END)
+            self.diagnostics_text.insert(1.0, text)
+            self.diagnostics_text.yview_moveto(position)
+            
+    def create_chart_canvas(self, tab, name):
+        """Tk canvas showing the images the chart renderer produces for ``name``"""
+        canvas = tk.Canvas(tab, bg=COLORS["bg_light"], highlightthickness=0)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        image = tk.PhotoImage(master=canvas)
+        canvas.create_image(0, 0, anchor=tk.NW, image=image)
+        self.chart_canvases[name] = canvas
+        self.chart_images[name] = image
+        # Re-render at the new size when the tab is resized
+        canvas.bind("<Configure>", lambda event: self.app.request_chart_redraw())
+        return canvas
         
     def create_status_bar(self):
+        status_bar = ttk.Frame(self.root, style="Header.TFrame")
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X, padx=0, pady=0)
+        
         self.status_label = ttk.Label(
-            self.root, 
+            status_bar, 
             text="Status: Ready", 
             relief="flat", 
             anchor=tk.W,
@@ -295,53 +569,124 @@ class UIBuilder:
             foreground=COLORS["text_secondary"],
             font=("Segoe UI", 9)
         )
-        self.status_label.pack(side=tk.BOTTOM, fill=tk.X, padx=0, pady=0)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=0, pady=0)
         
+        # Capture queue depth and drops, so it is visible when the UI falls behind
+        self.queue_label = ttk.Label(
+            status_bar,
+            text="",
+            relief="flat",
+            anchor=tk.E,
+            background=COLORS["bg_medium"],
+            foreground=COLORS["text_secondary"],
+            font=("Segoe UI", 9)
+        )
+        self.queue_label.pack(side=tk.RIGHT, padx=10, pady=0)
+        
+        # Per-stage throughput of the multi-process capture pipeline
+        self.pipeline_label = ttk.Label(
+            status_bar,
+            text="",
+            relief="flat",
+            anchor=tk.E,
+            background=COLORS["bg_medium"],
+            foreground=COLORS["text_secondary"],
+            font=("Segoe UI", 9)
+        )
+        self.pipeline_label.pack(side=tk.RIGHT, padx=10, pady=0)
+        
+        # Active capture filter with its compile cost and pass counts
+        self.filter_label = ttk.Label(
+            status_bar,
+            text="",
+            relief="flat",
+            anchor=tk.E,
+            background=COLORS["bg_medium"],
+            foreground=COLORS["text_secondary"],
+            font=("Segoe UI", 9)
+        )
+        self.filter_label.pack(side=tk.RIGHT, padx=10, pady=0)
+        
+    def show_filter_valid(self, valid):
+        """Color the capture filter entry by whether it compiles"""
+        self.filter_entry.config(fg=COLORS["text"] if valid else COLORS["error"])
+        
+    def show_display_filter_valid(self, valid):
+        """Color the display filter entry by whether it compiles"""
+        self.display_filter_entry.config(fg=COLORS["text"] if valid else COLORS["error"])
+        
+    def update_display_count(self, shown, total, filtered):
+        """Show how many packets the display filter lets through"""
+        text = f"Displayed: {shown} of {total}" if filtered else ""
+        if text != self.display_count_label.cget("text"):
+            self.display_count_label.config(text=text)
+            
+    def update_pipeline_status(self, text):
+        if text != self.pipeline_label.cget("text"):
+            self.pipeline_label.config(text=text)
+            
+    def update_filter_status(self, text):
+        if text != self.filter_label.cget("text"):
+            self.filter_label.config(text=text)
+            
+    def update_queue_status(self, stats):
+        """Show capture queue depth and drop count in the status bar"""
+        text = f"Queue: {stats['depth']}/{stats['capacity']}  Dropped: {stats['dropped']}"
+        color = COLORS["warning"] if stats['dropped'] else COLORS["text_secondary"]
+        if text != self.queue_label.cget("text"):
+            self.queue_label.config(text=text, foreground=color)
+            
+    def set_file_task_active(self, active):
+        """Enable the cancel button while a file import/export is running.
+
+        Buttons that replace or rewrite the packet store are disabled until it
+        finishes; a running capture can still be stopped.
+        """
+        state = tk.NORMAL if active else tk.DISABLED
+        if str(self.buttons["cancel_file_task"].cget("state")) == state:
+            return
+        self.buttons["cancel_file_task"].config(state=state)
+        locked = tk.DISABLED if active else tk.NORMAL
+        for name in FILE_TASK_LOCKED_BUTTONS:
+            self.buttons[name].config(state=locked)
+        if not (active and self.app.capture_active):
+            self.capture_button.config(state=locked)
+            
     def bind_button(self, button_name, command):
         if button_name in self.buttons:
             self.buttons[button_name].config(command=command)
             
     def update_packet_list(self, packets, data_processor):
         """Update the packet list view"""
-        # Clear existing items but keep the last few to avoid complete refresh
-        current_items = self.packet_tree.get_children()
-        if len(current_items) > 0:
-            # Only update with new packets
-            start_idx = len(current_items)
-        else:
-            start_idx = 0
-            self.packet_tree.delete(*self.packet_tree.get_children())
-        
-        # Add new packets to the list
-        for i in range(start_idx, len(packets)):
-            packet = packets[i]
-            time_str = datetime.fromtimestamp(packet['timestamp']).strftime('%H:%M:%S.%f')[:-3]
-            src = packet.get('src_ip', 'N/A')
-            dst = packet.get('dst_ip', 'N/A')
-            protocol = packet.get('protocol', 'Unknown')
-            length = packet.get('size', 0)
-            info = data_processor.get_packet_info(packet)
-            
-            # Color code based on protocol
-            tags = ()
-            if protocol == 'TCP':
-                tags = ('tcp',)
-            elif protocol == 'UDP':
-                tags = ('udp',)
-            elif protocol == 'ICMP':
-                tags = ('icmp',)
-            elif protocol in ['HTTP', 'HTTPS']:
-                tags = ('http',)
-            elif protocol == 'DNS':
-                tags = ('dns',)
-                
-            self.packet_tree.insert("", "end", values=(
-                i+1, time_str, src, dst, protocol, length, info
-            ), tags=tags)
+        self.packet_data_processor = data_processor
+        self.packet_list.set_source(packets, len(packets))
+        
+    def format_packet_row(self, packets, index):
+        """Build the Treeview values and tags for one packet"""
+        packet = packets[index]
+        time_str = datetime.fromtimestamp(packet['timestamp']).strftime('%H:%M:%S.%f')[:-3]
+        src = packet.get('src_ip', 'N/A')
+        dst = packet.get('dst_ip', 'N/A')
+        protocol = packet.get('protocol', 'Unknown')
+        length = packet.get('size', 0)
+        info = self.packet_data_processor.get_packet_info(packet)
+        # Keep capture numbering when showing a filtered view
+        number = packets.store_index(index) + 1 if isinstance(packets, FilteredView) else index + 1
+        
+        # Color code based on protocol
+        tags = ()
+        if protocol == 'TCP':
+            tags = ('tcp',)
+        elif protocol == 'UDP':
+            tags = ('udp',)
+        elif protocol == 'ICMP':
+            tags = ('icmp',)
+        elif protocol in ['HTTP', 'HTTPS']:
+            tags = ('http',)
+        elif protocol == 'DNS':
+            tags = ('dns',)
             
-        # Auto-scroll to the bottom
-        if len(packets) > 0:
-            self.packet_tree.see(self.packet_tree.get_children()[-1])
+        return (number, time_str, src, dst, protocol, length, info), tags
             
     def show_packet_details(self, packet, is_real_capture):
         """Display detailed information about the selected packet"""
@@ -361,17 +706,7 @@ class UIBuilder:
             details += f"Destination Port: {packet.get('dst_port', 'N/A')}\n"
             
         if protocol == 'TCP' and 'tcp_flags' in packet:
-            flags = []
-            if packet['tcp_flags'] & 0x02:  # SYN flag
-                flags.append("SYN")
-            if packet['tcp_flags'] & 0x10:  # ACK flag
-                flags.append("ACK")
-            if packet['tcp_flags'] & 0x01:  # FIN flag
-                flags.append("FIN")
-            if packet['tcp_flags'] & 0x08:  # PSH flag
-                flags.append("PSH")
-            if packet['tcp_flags'] & 0x04:  # RST flag
-                flags.append("RST")
+            flags = tcp_flag_list(packet['tcp_flags'])
             details += f"TCP Flags: {', '.join(flags)}\n"
             
         # Add capture type info
@@ -382,10 +717,13 @@ class UIBuilder:
         
     def update_statistics(self, packets, data_processor, is_real_capture):
         try:
-            stats = data_processor.calculate_statistics(packets, is_real_capture)
+            view = packets if isinstance(packets, FilteredView) else None
+            stats = data_processor.calculate_statistics(is_real_capture, view)
             
             stats_text = "📊 REAL-TIME STATISTICS\n"
             stats_text += "=" * 30 + "\n\n"
+            if view is not None and view.statistics_pending:
+                stats_text += f"⏳ Counted {len(view) - view.statistics_pending} of {len(view)} filtered packets\n\n"
             
             for key, value in stats.items():
                 if isinstance(value, dict):
@@ -402,36 +740,45 @@ class UIBuilder:
             self.stats_text.delete(1.0, tk.END)
             self.stats_text.insert(1.0, stats_text)
         except Exception as e:
-            print(f"Error updating statistics: {e}")
+            self.app.metrics.record_error("statistics_panel", e)
             
-    def update_protocol_chart(self, packets, visualizations):
+    def chart_size(self, name):
+        canvas = self.chart_canvases[name]
+        return canvas.winfo_width(), canvas.winfo_height()
+        
+    def update_protocol_chart(self, statistics, visualizations):
         try:
-            visualizations.update_protocol_chart(packets, self.protocol_ax)
-            self.protocol_canvas.draw()
+            snapshot = visualizations.protocol_snapshot(statistics)
+            self.chart_renderer.submit("protocol", snapshot, self.chart_size("protocol"))
         except Exception as e:
-            print(f"Error updating protocol chart: {e}")
+            self.app.metrics.record_error("protocol_chart", e)
             
-    def update_traffic_chart(self, packets, visualizations):
+    def update_distribution_chart(self, statistics):
         try:
-            visualizations.update_traffic_chart(packets, self.traffic_ax, self.traffic_fig)
-            self.traffic_canvas.draw()
+            self.chart_renderer.submit("distribution", statistics.distributions(),
+                                       self.chart_size("distribution"))
         except Exception as e:
-            print(f"Error updating traffic chart: {e}")
+            self.app.metrics.record_error("distribution_chart", e)
+            
+    def update_traffic_chart(self, packets, visualizations, anomalies=()):
+        try:
+            snapshot = visualizations.traffic_snapshot(packets, anomalies)
+            self.chart_renderer.submit("traffic", snapshot, self.chart_size("traffic"))
+        except Exception as e:
+            self.app.metrics.record_error("traffic_chart", e)
+            
+    def show_rendered_charts(self):
+        """Display any chart images the renderer has finished"""
+        for name, image in self.chart_renderer.results().items():
+            self.chart_images[name].configure(data=image, format="PPM")
             
     def clear_ui(self):
-        self.packet_tree.delete(*self.packet_tree.get_children())
+        self.packet_list.reset()
         self.details_text.delete(1.0, tk.END)
         self.stats_text.delete(1.0, tk.END)
         
         # Clear charts
-        self.protocol_ax.clear()
-        self.protocol_ax.text(0.5, 0.5, 'No data available', 
-                            horizontalalignment='center', verticalalignment='center',
-                            color=COLORS["text_secondary"])
-        self.protocol_canvas.draw()
-        
-        self.traffic_ax.clear()
-        self.traffic_ax.text(0.5, 0.5, 'No data available', 
-                            horizontalalignment='center', verticalalignment='center',
-                            color=COLORS["text_secondary"])
-        self.traffic_canvas.draw()
\ No newline at end of file
+        self.app.visualizations.reset_traffic()
+        self.chart_renderer.submit("protocol", {}, self.chart_size("protocol"))
+        self.chart_renderer.submit("traffic", None, self.chart_size("traffic"))
+        self.chart_renderer.submit("distribution", None, self.chart_size("distribution"))
\ No newline at end of file
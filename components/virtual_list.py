@@ -0,0 +1,159 @@
+# components/virtual_list.py
+from collections import OrderedDict
+
+# Extra rows kept in the widget below the visible window so a resize or a
+# partially visible last row never shows a gap
+OVERSCAN = 4
+# Formatted rows remembered around the window so short scrolls don't reformat
+ROW_CACHE_SIZE = 512
+
+
+class VirtualTreeview:
+    """Treeview that only holds the rows currently on screen.
+
+    The widget keeps a fixed pool of row items; scrolling moves an offset into
+    the underlying data and re-fills the pool, formatting rows only when they
+    come into view. The scrollbar is driven from the offset and total row
+    count, so the cost of a refresh depends on the window height rather than
+    on the number of packets.
+    """
+
+    def __init__(self, tree, scrollbar, format_row, row_height=20):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.row_height = row_height
+        self.total = 0
+        self.offset = 0
+        self.visible_rows = 1
+        self.follow_tail = True
+        self.selected_index = None
+        self._slots = []
+        self._slot_indices = []
+        self._cache = OrderedDict()
+        self._source = None
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self.visible_rows))
+        self.tree.bind('<Next>', lambda e: self.scroll(self.visible_rows))
+        self.tree.bind('<Home>', lambda e: self.scroll_to(0))
+        self.tree.bind('<End>', lambda e: self.scroll_to(self.total))
+
+    # -- Data -------------------------------------------------------------
+
+    def set_source(self, source, total):
+        """Point the list at a new row source of ``total`` rows.
+
+        ``source`` is passed back to ``format_row`` with each row index.
+        """
+        if source is not self._source or total < self.total:
+            self._cache.clear()
+        self._source = source
+        self.total = total
+        if self.follow_tail:
+            self.offset = self._max_offset()
+        self.offset = min(self.offset, self._max_offset())
+        self.render()
+
+    def reset(self):
+        self._source = None
+        self._cache.clear()
+        self.total = 0
+        self.offset = 0
+        self.follow_tail = True
+        self.selected_index = None
+        self.render()
+
+    def index_of(self, item):
+        """Map a tree item id back to a row index, or None"""
+        try:
+            return self._slot_indices[self._slots.index(item)]
+        except (ValueError, IndexError):
+            return None
+
+    def selection_index(self):
+        """Row index of the selected item, remembered across scrolling"""
+        selection = self.tree.selection()
+        if selection:
+            self.selected_index = self.index_of(selection[0])
+            return self.selected_index
+        return None
+
+    # -- Scrolling --------------------------------------------------------
+
+    def _max_offset(self):
+        return max(0, self.total - self.visible_rows)
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+        return "break"
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(int(offset), self._max_offset()))
+        self.follow_tail = self.offset >= self._max_offset()
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Scrollbar command: handles 'moveto' and 'scroll' requests"""
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * self.total)
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows
+            self.scroll(amount)
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_configure(self, event):
+        rows = max(1, (event.height - self.row_height) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            if self.follow_tail:
+                self.offset = self._max_offset()
+            self.render()
+
+    # -- Rendering --------------------------------------------------------
+
+    def _row(self, index):
+        row = self._cache.get(index)
+        if row is None:
+            row = self.format_row(self._source, index)
+            self._cache[index] = row
+            if len(self._cache) > ROW_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return row
+
+    def _ensure_slots(self, count):
+        while len(self._slots) < count:
+            self._slots.append(self.tree.insert("", "end", values=()))
+        while len(self._slots) > count:
+            self.tree.delete(self._slots.pop())
+
+    def render(self):
+        """Fill the row pool from the current offset"""
+        count = max(0, min(self.visible_rows + OVERSCAN, self.total - self.offset))
+        self._ensure_slots(count)
+        self._slot_indices = list(range(self.offset, self.offset + count))
+
+        selected = ()
+        for slot, index in zip(self._slots, self._slot_indices):
+            values, tags = self._row(index)
+            self.tree.item(slot, values=values, tags=tags)
+            if index == self.selected_index:
+                selected = (slot,)
+        if tuple(self.tree.selection()) != selected:
+            self.tree.selection_set(selected)
+
+        if self.total:
+            first = self.offset / self.total
+            last = min(1.0, (self.offset + self.visible_rows) / self.total)
+        else:
+            first, last = 0.0, 1.0
+        self.scrollbar.set(first, last)
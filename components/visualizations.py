@@ -1,9 +1,9 @@
 # components/visualizations.py
-import matplotlib.pyplot as plt
+# The main thread only reduces packets to small snapshots for the charts:
+# protocol counts (kept by the statistics) and per-bin counts. The charts themselves live in
+# components/charts.py and are drawn on a worker thread (see
+# components/chart_renderer.py), so matplotlib is never imported here.
 import numpy as np
-from collections import defaultdict, Counter
-from datetime import datetime
-import random
 
 # Custom color scheme
 COLORS = {
@@ -17,106 +17,176 @@ COLORS = {
     "border": "#2a2a4a",
 }
 
+# Shading for intervals the anomaly detector flagged
+ANOMALY_COLOR = "#ff4466"
+
+# Rollup tiers as (bin seconds, bins kept): an hour of 1 s bins, a day of
+# 10 s bins, a week of 1 min bins and about a year of 10 min bins
+ROLLUP_TIERS = ((1, 3600), (10, 8640), (60, 10080), (600, 52704))
+TIER_LABELS = {1: "second", 10: "10 seconds", 60: "minute", 600: "10 minutes"}
+
+# Round durations the traffic chart's time range snaps to
+WINDOW_SPANS = (60, 120, 300, 600, 1200, 1800, 3600, 2 * 3600, 3 * 3600, 6 * 3600, 12 * 3600,
+                86400, 2 * 86400, 7 * 86400, 14 * 86400, 30 * 86400, 90 * 86400, 365 * 86400)
+
 class Visualizations:
-    def update_protocol_chart(self, packets, ax):
-        ax.clear()
-        
-        if not packets:
-            ax.text(0.5, 0.5, 'No data available', 
-                    horizontalalignment='center', verticalalignment='center',
-                    color=COLORS["text_secondary"], fontsize=12)
-            ax.set_frame_on(False)
-            return
-        
-        protocols = [p.get('protocol', 'Unknown') for p in packets]
-        protocol_counts = Counter(protocols)
-        
-        if protocol_counts:
-            labels, values = zip(*protocol_counts.items())
-            
-            # Create a color palette
-            colors = plt.cm.Set3(np.linspace(0, 1, len(labels)))
-            
-            # Explode the largest slice
-            max_idx = values.index(max(values))
-            explode = [0.1 if i == max_idx else 0 for i in range(len(labels))]
-            
-            wedges, texts, autotexts = ax.pie(
-                values, 
-                labels=labels, 
-                autopct='%1.1f%%',
-                startangle=90,
-                colors=colors,
-                explode=explode,
-                shadow=True
-            )
-            
-            # Style the text
-            for text in texts:
-                text.set_color(COLORS["text"])
-                text.set_fontweight('bold')
-                
-            for autotext in autotexts:
-                autotext.set_color(COLORS["bg_dark"])
-                autotext.set_fontweight('bold')
-            
-            ax.set_title('Protocol Distribution', color=COLORS["accent"], fontweight='bold', fontsize=12)
-            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-            
-    def update_traffic_chart(self, packets, ax, fig):
-        ax.clear()
-        
-        if not packets:
-            ax.text(0.5, 0.5, 'No data available', 
-                    horizontalalignment='center', verticalalignment='center',
-                    color=COLORS["text_secondary"], fontsize=12)
-            ax.set_frame_on(False)
-            return
-            
-        # Group packets by 10-second intervals
-        time_groups = defaultdict(int)
-        for packet in packets:
-            # Group by 10-second intervals
-            time_key = int(packet.get('timestamp', 0) / 10) * 10
-            time_groups[time_key] += 1
-            
-        if time_groups:
-            times, counts = zip(*sorted(time_groups.items()))
-            
-            # Convert timestamps to datetime for better x-axis labels
-            time_labels = [datetime.fromtimestamp(t).strftime('%H:%M:%S') for t in times]
-            
-            # Create a gradient color based on packet count
-            max_count = max(counts) if counts else 1
-            colors = [plt.cm.viridis(count / max_count) for count in counts]
-            
-            # Create bar chart
-            x_pos = np.arange(len(time_labels))
-            bars = ax.bar(x_pos, counts, align='center', alpha=0.8, color=colors, edgecolor=COLORS["accent"], linewidth=1)
-            
-            # Add a line plot over the bars
-            ax.plot(x_pos, counts, color=COLORS["accent"], linewidth=2, marker='o', markersize=4)
-            
-            # Set x-axis labels with rotation to prevent overlap
-            ax.set_xticks(x_pos)
-            ax.set_xticklabels(time_labels, rotation=45, ha='right', color=COLORS["text_secondary"])
-            
-            # Customize y-axis
-            ax.tick_params(axis='y', colors=COLORS["text_secondary"])
-            ax.set_ylabel('Packets per 10 seconds', color=COLORS["text_secondary"], fontweight='bold')
-            
-            # Set title
-            ax.set_title('Network Traffic Over Time', color=COLORS["accent"], fontweight='bold', fontsize=12)
-            
-            # Add grid
-            ax.grid(True, alpha=0.3, color=COLORS["border"])
-            
-            # Set facecolor
-            ax.set_facecolor(COLORS["bg_light"])
-            
-            # Add a border
-            for spine in ax.spines.values():
-                spine.set_color(COLORS["border"])
-                
-            # Adjust layout to prevent label cutoff
-            fig.tight_layout()
\ No newline at end of file
+    """Chart objects plus the main-thread reductions that feed them"""
+
+    def __init__(self, max_bars=120, max_points=2000):
+        self.max_bars = max_bars
+        self.max_points = max_points
+        self.traffic_rollups = TrafficRollups()
+        self._window = None
+
+    def charts(self):
+        """Build the chart objects, importing matplotlib on first use.
+
+        Called by the chart renderer on its worker thread, so the import
+        never delays the window.
+        """
+        from components.charts import create_charts
+        return create_charts(self.max_bars)
+
+    def protocol_snapshot(self, statistics):
+        """Protocol name -> packet count.
+
+        Read from the counts a StreamingStatistics keeps as packets arrive,
+        instead of recounting the whole store on every chart refresh.
+        """
+        return statistics.protocols()
+
+    def reset_traffic(self):
+        self.traffic_rollups.reset()
+        self._window = None
+
+    def traffic_window(self, first, last):
+        """Time range the traffic chart shows, from the first packet.
+
+        The range is a round duration with room to grow, so it only changes
+        (forcing a full redraw) when the capture outgrows it.
+        """
+        window = self._window
+        if window is None or window[0] != first or last >= window[1]:
+            needed = max(last - first, 1) * 1.25
+            span = next((span for span in WINDOW_SPANS if span >= needed), needed)
+            self._window = window = (first, first + span)
+        return window
+
+    def traffic_snapshot(self, packets, anomalies=()):
+        """Fold in new packets and return the chart data for the current window.
+
+        Returns None without packets, else (window start, window end, tier
+        seconds, bin start times, counts, anomalous spans). ``anomalies`` are
+        (start, end) spans of capture time, clipped to the window.
+        """
+        rollups = self.traffic_rollups
+        if rollups.update(packets):
+            self._window = None
+        if rollups.first is None:
+            return None
+        first = np.floor(rollups.first)
+        start, end = self.traffic_window(first, rollups.last)
+        seconds, times, counts = rollups.series(start, end, self.max_points)
+        spans = [(max(a, start), min(b, end)) for a, b in anomalies if b > start and a < end]
+        return start, end, seconds, times, counts, spans
+
+
+class TrafficRollups:
+    """Packets per time bin at several resolutions, counted as packets arrive.
+
+    Each tier is a ring of ``bins`` counters of ``seconds`` each, so the
+    fine tiers only cover the recent past: as time moves on, their oldest
+    bins are cleared and only the coarser tiers keep that history.
+    """
+
+    def __init__(self, tiers=ROLLUP_TIERS):
+        self.tiers = tiers
+        self.reset()
+
+    def reset(self):
+        self._source = None
+        self._counted = 0
+        self._rings = [np.zeros(bins, dtype=np.int64) for _, bins in self.tiers]
+        # Newest bin number per tier
+        self._latest = [None] * len(self.tiers)
+        self.first = None
+        self.last = None
+
+    def update(self, packets):
+        """Fold packets added since the last update into the tiers; True if reset"""
+        total = len(packets)
+        reset = packets is not self._source or total < self._counted
+        if reset:
+            self.reset()
+            self._source = packets
+        if total > self._counted:
+            timestamps = packets.column('timestamp', self._counted, total)
+            self._counted = total
+            first, last = float(timestamps.min()), float(timestamps.max())
+            self.first = first if self.first is None else min(self.first, first)
+            self.last = last if self.last is None else max(self.last, last)
+            for tier, (seconds, bins) in enumerate(self.tiers):
+                self._add(tier, (timestamps // seconds).astype(np.int64), bins)
+        return reset
+
+    def _add(self, tier, numbers, bins):
+        ring = self._rings[tier]
+        newest = int(numbers.max())
+        latest = self._latest[tier]
+        if latest is None:
+            latest = newest
+        elif newest > latest:
+            # Clear the slots of the bins now starting
+            if newest - latest >= bins:
+                ring[:] = 0
+            else:
+                cleared = np.arange(latest + 1, newest + 1) % bins
+                ring[cleared] = 0
+            latest = newest
+        self._latest[tier] = latest
+        # Bins older than the ring are compacted away in this tier
+        kept = numbers > latest - bins
+        np.add.at(ring, numbers[kept] % bins, 1)
+
+    def series(self, start, end, max_points):
+        """(tier seconds, bin start times, counts) covering [start, end].
+
+        Uses the finest tier that still holds ``start`` and needs at most
+        ``max_points`` bins for the range, or the coarsest tier otherwise.
+        Only bins up to the newest packet are returned.
+        """
+        for tier, (seconds, bins) in enumerate(self.tiers):
+            latest = self._latest[tier]
+            covers = latest - bins < start // seconds
+            if covers and (end - start) / seconds <= max_points:
+                break
+        latest = self._latest[tier]
+        first = max(int(start // seconds), latest - bins + 1)
+        numbers = np.arange(first, min(latest, int(end // seconds)) + 1)
+        return seconds, numbers * seconds, self._rings[tier][numbers % bins]
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling to at most ``threshold`` points.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previous pick and the next
+    bucket's mean, which preserves the peaks and dips of the series.
+    """
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return x, y
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, count - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else count
+        mean_x = x[next_lo:next_hi].mean()
+        mean_y = y[next_lo:next_hi].mean()
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - mean_x) * (y[lo:hi] - py) - (px - x[lo:hi]) * (mean_y - py))
+        previous = lo + int(areas.argmax())
+        picked[i + 1] = previous
+    return x[picked], y[picked]
@@ -0,0 +1,123 @@
+# daemon.py
+# Headless capture service: capture, statistics, flows and anomaly detection
+# without tkinter or matplotlib. Writes a JSON summary line every interval
+# and, with --capture-dir, rotated capture files.
+#
+#   python daemon.py --interface eth0 --capture-dir /var/lib/sniffviz --summary summary.jsonl
+#   python daemon.py --backend simulate --sim-rate 200000 --sim-attack syn-flood@60+10
+import argparse
+import signal
+import sys
+import time
+
+from components.bpf import compile_filter, FilterError
+from components.capture_daemon import CaptureDaemon, RotatingCaptureWriter
+from components.capture_manager import (
+    CaptureManager, BACKEND_AUTO, BACKEND_AFPACKET, BACKEND_SCAPY, BACKEND_SIMULATE
+)
+from components.capture_session import CaptureSession
+from components.metrics import MetricsServer
+from components.pcap_io import FORMAT_PCAP, FORMAT_PCAPNG
+from components.traffic_generator import TrafficGenerator, ATTACKS
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def positive_float(text):
+    """argparse type for durations that must be above 0"""
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {text}")
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless SniffViz capture daemon")
+    parser.add_argument("--interface", help="interface to capture on (default: all)")
+    parser.add_argument("--backend", default=BACKEND_AUTO,
+                        choices=(BACKEND_AUTO, BACKEND_AFPACKET, BACKEND_SCAPY, BACKEND_SIMULATE))
+    parser.add_argument("--filter", default="", help="BPF capture filter expression")
+    parser.add_argument("--workers", type=int, help="decoder processes for AF_PACKET capture")
+    parser.add_argument("--summary", default="-", help="file to append JSON summaries to (default: stdout)")
+    parser.add_argument("--summary-interval", type=float, default=60, help="seconds between summaries")
+    parser.add_argument("--capture-dir", help="write rotated capture files to this directory")
+    parser.add_argument("--format", default=FORMAT_PCAPNG, choices=(FORMAT_PCAPNG, FORMAT_PCAP))
+    parser.add_argument("--rotate-seconds", type=positive_float, default=3600, help="start a new capture file after this long")
+    parser.add_argument("--rotate-packets", type=positive_int, help="start a new capture file after this many packets")
+    parser.add_argument("--keep-files", type=positive_int, help="delete all but this many newest capture files")
+    parser.add_argument("--sim-rate", type=float, default=1000, help="simulated packets per second (daily mean)")
+    parser.add_argument("--sim-seed", type=int, help="seed for repeatable simulated traffic")
+    parser.add_argument("--sim-attack", action="append", default=[], metavar="KIND@START[+SECONDS]",
+                        help=f"inject an attack into simulated traffic, START seconds after launch "
+                             f"({', '.join(ATTACKS)}); may be repeated")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics at http://HOST:PORT/metrics (0 picks a free port)")
+    parser.add_argument("--metrics-host", default="127.0.0.1", help="address the metrics endpoint binds to")
+    return parser.parse_args(argv)
+
+
+def parse_attack(spec):
+    """Split ``kind@start[+seconds]`` into (kind, start, seconds)"""
+    kind, _, when = spec.partition("@")
+    start, _, seconds = when.partition("+")
+    if kind not in ATTACKS:
+        raise ValueError(f"unknown attack {kind!r}")
+    return kind, float(start or 0), float(seconds or 10)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    generator = TrafficGenerator(rate=args.sim_rate, seed=args.sim_seed)
+    try:
+        launched = time.time()
+        for spec in args.sim_attack:
+            kind, start, seconds = parse_attack(spec)
+            generator.inject(kind, launched + start, seconds)
+    except ValueError as e:
+        print(f"Attack error: {e}", file=sys.stderr)
+        return 2
+    manager = CaptureManager(backend=args.backend, interface=args.interface, workers=args.workers,
+                             generator=generator)
+    try:
+        manager.capture_filter = compile_filter(args.filter) if args.filter.strip() else None
+    except FilterError as e:
+        print(f"Capture filter error: {e}", file=sys.stderr)
+        return 2
+
+    writer = None
+    if args.capture_dir:
+        writer = RotatingCaptureWriter(args.capture_dir, file_format=args.format,
+                                       max_seconds=args.rotate_seconds,
+                                       max_packets=args.rotate_packets, keep=args.keep_files)
+    summary = sys.stdout if args.summary == "-" else open(args.summary, 'a', encoding='utf-8')
+    session = CaptureSession(manager)
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(session.metrics, args.metrics_host, args.metrics_port)
+        try:
+            metrics_server.start()
+        except OSError as e:
+            print(f"Metrics endpoint error: {e}", file=sys.stderr)
+            return 2
+        print(f"Serving metrics at {metrics_server.url}", file=sys.stderr)
+    daemon = CaptureDaemon(session, writer, summary, args.summary_interval)
+    signal.signal(signal.SIGINT, lambda *_: daemon.stop())
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    try:
+        daemon.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        if summary is not sys.stdout:
+            summary.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,69 @@
 # models/packet.py
-class Packet:
-    def __init__(self, timestamp, size, src_ip, dst_ip, protocol, 
-                 src_port=None, dst_port=None, tcp_flags=None, icmp_type=None):
-        self.timestamp = timestamp
-        self.size = size
-        self.src_ip = src_ip
-        self.dst_ip = dst_ip
-        self.protocol = protocol
-        self.src_port = src_port
-        self.dst_port = dst_port
-        self.tcp_flags = tcp_flags
-        self.icmp_type = icmp_type
-        
+from collections.abc import Mapping
+
+from utils.constants import (
+    FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_PORT, FIELD_DST_PORT,
+    FIELD_TCP_FLAGS, FIELD_ICMP_TYPE, FIELD_SRC_INTERNED, FIELD_DST_INTERNED
+)
+
+# Field name -> bit in the "fields" column that must be set for it to exist.
+# Fields mapped to 0 are always present.
+_FIELD_BITS = {
+    'timestamp': 0,
+    'size': 0,
+    'protocol': 0,
+    'src_ip': FIELD_SRC_IP,
+    'dst_ip': FIELD_DST_IP,
+    'src_port': FIELD_SRC_PORT,
+    'dst_port': FIELD_DST_PORT,
+    'tcp_flags': FIELD_TCP_FLAGS,
+    'icmp_type': FIELD_ICMP_TYPE,
+}
+
+
+class Packet(Mapping):
+    """Read-only view of one row of a ``PacketStore``.
+
+    Behaves like the packet dicts produced by the capture code, so
+    ``packet['timestamp']``, ``packet.get('src_port')`` and
+    ``'tcp_flags' in packet`` all work without copying the row out.
+    """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def _fields(self):
+        return int(self.store.value(self.index, 'fields'))
+
+    def __getitem__(self, key):
+        bit = _FIELD_BITS[key]
+        if bit:
+            fields = self._fields()
+            if not fields & bit:
+                raise KeyError(key)
+        value = self.store.value(self.index, key)
+        if key == 'timestamp':
+            return float(value)
+        if key == 'protocol':
+            return self.store.protocol_names[value]
+        if key == 'src_ip':
+            return self.store.format_address(value, fields & FIELD_SRC_INTERNED)
+        if key == 'dst_ip':
+            return self.store.format_address(value, fields & FIELD_DST_INTERNED)
+        return int(value)
+
+    def __iter__(self):
+        fields = self._fields()
+        return (key for key, bit in _FIELD_BITS.items() if not bit or fields & bit)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Packet({self.to_dict()!r})"
+
     def to_dict(self):
-        return {
-            'timestamp': self.timestamp,
-            'size': self.size,
-            'src_ip': self.src_ip,
-            'dst_ip': self.dst_ip,
-            'protocol': self.protocol,
-            'src_port': self.src_port,
-            'dst_port': self.dst_port,
-            'tcp_flags': self.tcp_flags,
-            'icmp_type': self.icmp_type
-        }
\ No newline at end of file
+        return dict(self.items())
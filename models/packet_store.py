@@ -0,0 +1,459 @@
+# models/packet_store.py
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from models.packet import Packet
+from models.segment import INDEX_BLOCK, SegmentFile, block_bounds, write_segment
+from models.session import read_manifest, segment_name, write_manifest
+from utils.constants import (
+    PROTOCOLS, FIELD_SRC_IP, FIELD_DST_IP, FIELD_SRC_PORT, FIELD_DST_PORT,
+    FIELD_TCP_FLAGS, FIELD_ICMP_TYPE, FIELD_SRC_INTERNED, FIELD_DST_INTERNED
+)
+from utils.helpers import ip_to_int, int_to_ip
+
+# Rows allocated at a time as the store grows
+CHUNK_SIZE = 65536
+
+# Column layout: about 28 bytes per packet
+COLUMNS = (
+    ('timestamp', np.float64),
+    ('size', np.uint32),
+    ('src_ip', np.uint32),
+    ('dst_ip', np.uint32),
+    ('src_port', np.uint16),
+    ('dst_port', np.uint16),
+    ('protocol', np.uint8),
+    ('tcp_flags', np.uint8),
+    ('icmp_type', np.uint8),
+    ('fields', np.uint8),
+)
+COLUMN_DTYPES = dict(COLUMNS)
+
+# Optional packet fields and the bit that marks them present
+_OPTIONAL_FIELDS = (
+    ('src_port', FIELD_SRC_PORT),
+    ('dst_port', FIELD_DST_PORT),
+    ('tcp_flags', FIELD_TCP_FLAGS),
+    ('icmp_type', FIELD_ICMP_TYPE),
+)
+
+
+def empty_chunk(size=CHUNK_SIZE):
+    """Allocate one chunk worth of zeroed columns"""
+    return {name: np.zeros(size, dtype=dtype) for name, dtype in COLUMNS}
+
+
+class RetentionPolicy:
+    """Limits on how much of a capture stays in memory.
+
+    Any limit left as None is not enforced. ``max_age`` is measured in
+    capture time, against the newest packet in the store.
+    """
+
+    def __init__(self, max_packets=None, max_bytes=None, max_age=None):
+        self.max_packets = max_packets
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def exceeded(self, packets, nbytes, oldest, newest):
+        """Whether the in-memory part is over any configured limit"""
+        if self.max_packets is not None and packets > self.max_packets:
+            return True
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return True
+        if self.max_age is not None and newest - oldest > self.max_age:
+            return True
+        return False
+
+
+class PacketStore:
+    """Append-only, column-oriented packet storage.
+
+    Packets are kept in typed NumPy columns that grow one chunk at a time.
+    Indexing returns lightweight ``Packet`` row views, and ``column`` exposes
+    whole columns so aggregations can run as array operations.
+
+    With a ``RetentionPolicy`` the in-memory chunks form a bounded ring: once
+    a limit is exceeded the oldest full chunk is written to a segment file,
+    replaced by a read-only memory map of that file, and its buffers are
+    freed once no reader still holds a view of them. Readers see one
+    continuous index space.
+
+    The same segment files make up a saved session (``save_session``), which
+    ``open_session`` maps back lazily; each segment records its time range
+    and a sparse time index so ``time_span`` can find a window of capture
+    time without scanning the timestamps.
+    """
+
+    def __init__(self, retention=None, chunk_size=CHUNK_SIZE, spill_dir=None):
+        self._lock = threading.Lock()
+        self.retention = retention
+        self.chunk_size = chunk_size
+        self._spill_root = spill_dir
+        self._spill_dir = None
+        # Chunks [0, _spilled) are memory-mapped segment files
+        self._spilled = 0
+        self.protocol_names = list(PROTOCOLS)
+        self._protocol_codes = {name: code for code, name in enumerate(self.protocol_names)}
+        # Non-IPv4 addresses are interned and referenced by index
+        self.addresses = []
+        self._address_codes = {}
+        self._chunks = []
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Packet(self, i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("packet index out of range")
+        return Packet(self, index)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield Packet(self, i)
+
+    # -- Encoding ---------------------------------------------------------
+
+    def protocol_code(self, name):
+        """Return the uint8 code for a protocol name, registering it if new"""
+        code = self._protocol_codes.get(name)
+        if code is None:
+            if len(self.protocol_names) > 255:
+                return self._protocol_codes['Other']
+            code = len(self.protocol_names)
+            self.protocol_names.append(name)
+            self._protocol_codes[name] = code
+        return code
+
+    def address_code(self, address):
+        """Return (value, interned) for an address string"""
+        packed = ip_to_int(address)
+        if packed is not None:
+            return packed, False
+        code = self._address_codes.get(address)
+        if code is None:
+            code = len(self.addresses)
+            self.addresses.append(address)
+            self._address_codes[address] = code
+        return code, True
+
+    def address_codes(self):
+        """Mapping of interned address strings to their codes"""
+        return self._address_codes
+
+    def intern_rows(self, columns, interned):
+        """Fill in address columns left for this store to intern.
+
+        ``interned`` lists (row, is_dst, address) for rows of ``columns``
+        decoded without a store, e.g. by another process.
+        """
+        for row, is_dst, address in interned:
+            value, _ = self.address_code(address)
+            columns['dst_ip' if is_dst else 'src_ip'][row] = value
+
+    def format_address(self, value, interned):
+        return self.addresses[value] if interned else int_to_ip(value)
+
+    # -- Writing ----------------------------------------------------------
+
+    def _reserve(self, count):
+        """Make room for ``count`` more rows and return the chunk spans to fill"""
+        needed = self._count + count
+        while len(self._chunks) * self.chunk_size < needed:
+            self._chunks.append(empty_chunk(self.chunk_size))
+        spans = []
+        pos = self._count
+        while pos < needed:
+            chunk_index, offset = divmod(pos, self.chunk_size)
+            length = min(self.chunk_size - offset, needed - pos)
+            spans.append((self._chunks[chunk_index], offset, length))
+            pos += length
+        return spans
+
+    def enforce_retention(self):
+        """Apply the retention policy now, e.g. for age limits on a quiet link"""
+        with self._lock:
+            self._enforce_retention()
+
+    def _enforce_retention(self):
+        """Spill the oldest full in-memory chunks while over the policy"""
+        if self.retention is None:
+            return
+        full_chunks = self._count // self.chunk_size
+        while self._spilled < full_chunks:
+            resident = self._count - self._spilled * self.chunk_size
+            nbytes = (len(self._chunks) - self._spilled) * self._chunk_nbytes()
+            oldest = float(self._chunks[self._spilled]['timestamp'][0])
+            newest = float(self.value(self._count - 1, 'timestamp'))
+            if not self.retention.exceeded(resident, nbytes, oldest, newest):
+                break
+            self._spill_chunk(self._spilled)
+            self._spilled += 1
+
+    def _chunk_nbytes(self):
+        return self.chunk_size * sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+
+    def _spill_chunk(self, chunk_index):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="sniffviz-", dir=self._spill_root)
+        path = os.path.join(self._spill_dir, segment_name(chunk_index))
+        chunk = self._chunks[chunk_index]
+        first, last, mins, maxs = write_segment(path, COLUMNS, chunk, self.chunk_size)
+        # The chunk's arrays are dropped, not reused: views that readers
+        # still hold into them must keep showing these rows
+        self._chunks[chunk_index] = SegmentFile(path, COLUMNS, self.chunk_size, first, last,
+                                                (INDEX_BLOCK, mins, maxs))
+
+    def append(self, packet):
+        """Append one packet given as a dict of fields"""
+        with self._lock:
+            (chunk, row, _), = self._reserve(1)
+            fields = 0
+            chunk['timestamp'][row] = packet['timestamp']
+            chunk['size'][row] = packet.get('size', 0)
+            chunk['protocol'][row] = self.protocol_code(packet.get('protocol', 'Other'))
+
+            src_ip = packet.get('src_ip')
+            if src_ip is not None:
+                value, interned = self.address_code(src_ip)
+                chunk['src_ip'][row] = value
+                fields |= FIELD_SRC_IP | (FIELD_SRC_INTERNED if interned else 0)
+            dst_ip = packet.get('dst_ip')
+            if dst_ip is not None:
+                value, interned = self.address_code(dst_ip)
+                chunk['dst_ip'][row] = value
+                fields |= FIELD_DST_IP | (FIELD_DST_INTERNED if interned else 0)
+
+            for name, bit in _OPTIONAL_FIELDS:
+                value = packet.get(name)
+                if value is not None:
+                    chunk[name][row] = int(value)
+                    fields |= bit
+            chunk['fields'][row] = fields
+            self._count += 1
+            if self._count % self.chunk_size == 0:
+                self._enforce_retention()
+
+    def extend(self, packets):
+        """Append an iterable of packet dicts"""
+        for packet in packets:
+            self.append(packet)
+
+    def append_columns(self, columns):
+        """Append a batch of already-encoded rows.
+
+        ``columns`` maps column names to equal-length arrays; columns left
+        out are filled with zeros.
+        """
+        count = len(columns['timestamp'])
+        with self._lock:
+            start = 0
+            for chunk, offset, length in self._reserve(count):
+                for name, values in columns.items():
+                    chunk[name][offset:offset + length] = values[start:start + length]
+                start += length
+            self._count += count
+            self._enforce_retention()
+
+    def clear(self):
+        with self._lock:
+            self._chunks = []
+            self._count = 0
+            self._spilled = 0
+            self._remove_spill_dir()
+
+    def close(self):
+        """Release memory-mapped segments and delete the spill files"""
+        self.clear()
+
+    def _remove_spill_dir(self):
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    # -- Sessions ---------------------------------------------------------
+
+    def save_session(self, path, progress=None, cancelled=None):
+        """Write the store to a session directory: one segment per chunk and a manifest.
+
+        Segments the directory already holds - when the store was opened
+        from or last saved to ``path`` - are left alone, so saving again
+        only appends what was added since. ``progress(done, total)`` is
+        called per chunk; if ``cancelled()`` returns true the manifest is
+        not updated. Returns the rows saved.
+        """
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            count = self._count
+            protocol_names = list(self.protocol_names)
+            addresses = list(self.addresses)
+        chunks = -(-count // self.chunk_size)
+        segments = []
+        for chunk_index in range(chunks):
+            if cancelled is not None and cancelled():
+                return 0
+            rows = min(self.chunk_size, count - chunk_index * self.chunk_size)
+            name = segment_name(chunk_index)
+            target = os.path.join(path, name)
+            # A chunk spilled meanwhile keeps its arrays until this drops them
+            chunk = self._chunks[chunk_index]
+            if not isinstance(chunk, SegmentFile):
+                first, last, _, _ = write_segment(target + ".tmp", COLUMNS, chunk, rows)
+                os.replace(target + ".tmp", target)
+            if isinstance(chunk, SegmentFile):
+                if os.path.abspath(chunk.path) != os.path.abspath(target):
+                    shutil.copyfile(chunk.path, target)
+                first, last = chunk.first, chunk.last
+            segments.append((name, rows, first, last))
+            if progress is not None:
+                progress(chunk_index + 1, chunks)
+        write_manifest(path, self.chunk_size, count, protocol_names, addresses, segments)
+        return count
+
+    @classmethod
+    def open_session(cls, path, retention=None, spill_dir=None):
+        """Open a saved session without reading its packets.
+
+        Only the manifest is read: full segments are memory-mapped the first
+        time something reads them. A partly filled last segment is copied
+        into memory so capturing can continue where the session ended.
+        """
+        manifest = read_manifest(path)
+        store = cls(retention, manifest['chunk_size'], spill_dir)
+        store.protocol_names = list(manifest['protocol_names'])
+        store._protocol_codes = {name: code for code, name in enumerate(store.protocol_names)}
+        store.addresses = list(manifest['addresses'])
+        store._address_codes = {address: code for code, address in enumerate(store.addresses)}
+        segments = manifest['segments']
+        for position, entry in enumerate(segments):
+            rows = entry['rows']
+            segment = SegmentFile(os.path.join(path, entry['file']), COLUMNS, rows,
+                                  entry['first'], entry['last'])
+            if rows == store.chunk_size:
+                store._chunks.append(segment)
+                store._spilled += 1
+            elif position == len(segments) - 1:
+                chunk = empty_chunk(store.chunk_size)
+                for name, _ in COLUMNS:
+                    chunk[name][:rows] = segment[name][:rows]
+                store._chunks.append(chunk)
+            else:
+                raise ValueError(f"{path}: segment {entry['file']} is not full")
+            store._count += rows
+        if store._count != manifest['rows']:
+            raise ValueError(f"{path}: manifest row count does not match its segments")
+        return store
+
+    # -- Reading ----------------------------------------------------------
+
+    def value(self, index, name):
+        """Return the raw column value of one row"""
+        chunk_index, row = divmod(index, self.chunk_size)
+        return self._chunks[chunk_index][name][row]
+
+    def iter_chunks(self, names=None, start=0, stop=None):
+        """Yield dicts of column views covering rows [start, stop).
+
+        Views stay valid after later appends: spilling a chunk swaps in its
+        segment file but leaves the arrays already handed out untouched.
+        """
+        names = names or COLUMN_DTYPES.keys()
+        stop = self._count if stop is None else min(stop, self._count)
+        chunks = self._chunks
+        pos = start
+        while pos < stop:
+            chunk_index, offset = divmod(pos, self.chunk_size)
+            length = min(self.chunk_size - offset, stop - pos)
+            chunk = chunks[chunk_index]
+            yield {name: chunk[name][offset:offset + length] for name in names}
+            pos += length
+
+    def time_span(self, start_time=None, end_time=None):
+        """Rows [start, stop) holding every packet timed within [start_time, end_time].
+
+        Segments whose recorded time range misses the window are skipped
+        without being mapped, and of the rest only the sparse time index
+        and the blocks at either edge are read. Packets that arrived out of
+        order can leave some rows outside the window inside the span.
+        Returns (0, 0) when no packet falls in the window.
+        """
+        low = -np.inf if start_time is None else start_time
+        high = np.inf if end_time is None else end_time
+        with self._lock:
+            chunks = list(self._chunks)
+            count = self._count
+        start = stop = None
+        for chunk_index, chunk in enumerate(chunks):
+            base = chunk_index * self.chunk_size
+            rows = min(self.chunk_size, count - base)
+            if rows <= 0:
+                break
+            if isinstance(chunk, SegmentFile):
+                if chunk.last < low or chunk.first > high:
+                    continue
+                block, mins, maxs = chunk.block_bounds()
+            else:
+                block = INDEX_BLOCK
+                mins, maxs = block_bounds(chunk['timestamp'][:rows], block)
+            candidates = np.flatnonzero((maxs >= low) & (mins <= high)).tolist()
+            if start is None:
+                for candidate in candidates:
+                    offset = candidate * block
+                    timestamps = chunk['timestamp'][offset:min(offset + block, rows)]
+                    inside = np.flatnonzero((timestamps >= low) & (timestamps <= high))
+                    if len(inside):
+                        start = base + offset + int(inside[0])
+                        break
+            for candidate in reversed(candidates):
+                offset = candidate * block
+                timestamps = chunk['timestamp'][offset:min(offset + block, rows)]
+                inside = np.flatnonzero((timestamps >= low) & (timestamps <= high))
+                if len(inside):
+                    stop = base + offset + int(inside[-1]) + 1
+                    break
+        if start is None:
+            return 0, 0
+        return start, stop
+
+    def column(self, name, start=0, stop=None):
+        """Return one column for rows [start, stop) as a contiguous array"""
+        parts = [chunk[name] for chunk in self.iter_chunks((name,), start, stop)]
+        if not parts:
+            return np.empty(0, dtype=COLUMN_DTYPES[name])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def columns(self, names=None, start=0, stop=None):
+        """Return several columns for rows [start, stop) as contiguous arrays"""
+        names = tuple(names or COLUMN_DTYPES.keys())
+        stop = self._count if stop is None else stop
+        return {name: self.column(name, start, stop) for name in names}
+
+    def protocol_labels(self, codes):
+        """Map an array of protocol codes to their names"""
+        return np.asarray(self.protocol_names, dtype=object)[codes]
+
+    def address_labels(self, values, fields, interned_bit):
+        """Map an address column to strings for a batch of rows"""
+        return [self.format_address(v, f & interned_bit) for v, f in zip(values.tolist(), fields.tolist())]
+
+    @property
+    def spilled_count(self):
+        """Number of packets held in on-disk segments"""
+        return self._spilled * self.chunk_size
+
+    def nbytes(self):
+        """Memory held by in-memory chunks, excluding spilled segments"""
+        resident = self._chunks[self._spilled:]
+        return sum(array.nbytes for chunk in resident for array in chunk.values())
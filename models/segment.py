@@ -0,0 +1,131 @@
+# models/segment.py
+import struct
+
+import numpy as np
+
+SEGMENT_MAGIC = b"SVSG"
+SEGMENT_VERSION = 2
+
+# magic, version, column count, row count, first timestamp, last timestamp,
+# rows per index block, byte offset of the sparse time index
+_HEADER = struct.Struct("<4sHHQddIQ")
+HEADER_SIZE = 64
+
+# Rows summarised by each entry of a segment's sparse time index
+INDEX_BLOCK = 1024
+
+
+def _column_offsets(columns, rows):
+    """Byte offset of each column in a segment file, 8-byte aligned"""
+    offsets = {}
+    pos = HEADER_SIZE
+    for name, dtype in columns:
+        offsets[name] = pos
+        pos += rows * np.dtype(dtype).itemsize
+        pos = (pos + 7) & ~7
+    return offsets, pos
+
+
+def block_bounds(timestamps, block=INDEX_BLOCK):
+    """Earliest and latest timestamp of each ``block`` rows.
+
+    Packets are not strictly time-ordered, so each block keeps both ends
+    rather than just its first timestamp.
+    """
+    starts = np.arange(0, len(timestamps), block)
+    if not len(starts):
+        return np.empty(0), np.empty(0)
+    return np.minimum.reduceat(timestamps, starts), np.maximum.reduceat(timestamps, starts)
+
+
+def write_segment(path, columns, chunk, rows):
+    """Write the first ``rows`` rows of a chunk to a segment file.
+
+    Returns the (first, last) timestamps and the block bounds written to
+    the segment's sparse index.
+    """
+    offsets, index_offset = _column_offsets(columns, rows)
+    timestamps = chunk['timestamp'][:rows]
+    mins, maxs = block_bounds(timestamps)
+    first, last = float(timestamps.min()), float(timestamps.max())
+    header = _HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, len(columns), rows,
+                          first, last, INDEX_BLOCK, index_offset)
+    with open(path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        for name, _ in columns:
+            f.seek(offsets[name])
+            f.write(memoryview(np.ascontiguousarray(chunk[name][:rows])))
+        f.seek(index_offset)
+        f.write(memoryview(mins.astype(np.float64)))
+        f.write(memoryview(maxs.astype(np.float64)))
+    return first, last, mins, maxs
+
+
+def read_segment_header(path):
+    """Return (rows, first_timestamp, last_timestamp) of a segment file"""
+    rows, first, last, _, _ = _read_header(path)
+    return rows, first, last
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        data = f.read(_HEADER.size)
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} is not a SniffViz segment file")
+    magic, version, _, rows, first, last, block, index_offset = _HEADER.unpack(data)
+    if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+        raise ValueError(f"{path} is not a SniffViz segment file")
+    return rows, first, last, block, index_offset
+
+
+def read_segment_index(path):
+    """Return (block_rows, mins, maxs), the sparse time index of a segment file"""
+    rows, _, _, block, index_offset = _read_header(path)
+    blocks = -(-rows // block)
+    with open(path, 'rb') as f:
+        f.seek(index_offset)
+        bounds = np.frombuffer(f.read(16 * blocks), dtype=np.float64)
+    if len(bounds) != 2 * blocks:
+        raise ValueError(f"{path} has a truncated time index")
+    return block, bounds[:blocks], bounds[blocks:]
+
+
+def open_segment(path, columns):
+    """Map a segment file read-only and return its columns.
+
+    The whole file is mapped once and each column is a view into it.
+    """
+    rows, _, _ = read_segment_header(path)
+    offsets, total = _column_offsets(columns, rows)
+    data = np.memmap(path, dtype=np.uint8, mode='r', shape=(total,))
+    return {name: data[offsets[name]:offsets[name] + rows * np.dtype(dtype).itemsize].view(dtype)
+            for name, dtype in columns}
+
+
+class SegmentFile:
+    """A segment file standing in for one chunk of a PacketStore.
+
+    Indexing by column name maps the file on first use, so a session of
+    thousands of segments opens without touching them; the sparse time
+    index is likewise only read when a time lookup reaches this segment.
+    """
+
+    def __init__(self, path, columns, rows, first, last, bounds=None):
+        self.path = path
+        self.columns = columns
+        self.rows = rows
+        self.first = first
+        self.last = last
+        self._bounds = bounds
+        self._mapped = None
+
+    def __getitem__(self, name):
+        if self._mapped is None:
+            self._mapped = open_segment(self.path, self.columns)
+        return self._mapped[name]
+
+    def block_bounds(self):
+        """(block_rows, mins, maxs) of the segment's sparse time index"""
+        if self._bounds is None:
+            self._bounds = read_segment_index(self.path)
+        return self._bounds
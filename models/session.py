@@ -0,0 +1,52 @@
+# models/session.py
+# A saved session is a directory of segment files plus a small JSON
+# manifest listing them in order with their row counts and time ranges,
+# and the protocol and address tables the encoded columns refer to.
+# Opening a session only reads the manifest; segments are mapped when
+# something first reads them.
+import json
+import os
+
+SESSION_MANIFEST = "session.json"
+SESSION_VERSION = 1
+
+
+def is_session(path):
+    return os.path.isfile(os.path.join(path, SESSION_MANIFEST))
+
+
+def segment_name(chunk_index):
+    return f"segment-{chunk_index:08d}.seg"
+
+
+def write_manifest(path, chunk_size, rows, protocol_names, addresses, segments):
+    """Replace a session's manifest in one step.
+
+    ``segments`` is a list of (file name, rows, first, last) in row order.
+    """
+    manifest = {
+        'version': SESSION_VERSION,
+        'chunk_size': chunk_size,
+        'rows': rows,
+        'protocol_names': list(protocol_names),
+        'addresses': list(addresses),
+        'segments': [{'file': name, 'rows': count, 'first': first, 'last': last}
+                     for name, count, first, last in segments],
+    }
+    target = os.path.join(path, SESSION_MANIFEST)
+    temporary = target + ".tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(temporary, target)
+
+
+def read_manifest(path):
+    """Load and check a session manifest"""
+    try:
+        with open(os.path.join(path, SESSION_MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"{path} is not a SniffViz session: {e}") from None
+    if manifest.get('version') != SESSION_VERSION:
+        raise ValueError(f"{path} uses an unsupported session version")
+    return manifest
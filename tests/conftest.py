@@ -0,0 +1,7 @@
+# tests/conftest.py
+# The modules import each other as top-level packages (components, models,
+# utils), as they do when app.py or daemon.py runs from the repository root.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
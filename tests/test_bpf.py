@@ -0,0 +1,53 @@
+# tests/test_bpf.py
+import pytest
+
+from components.bpf import compile_filter, FilterError, ACCEPT_SNAPLEN, run
+from test_dissector import FRAMES as RECORDED, ethernet, ipv6, tcp, udp
+
+FRAMES = {name: frame for name, frame, _ in RECORDED}
+FRAMES["ipv6 tcp"] = ethernet(0x86DD, ipv6(6, "2001:db8::7", "2001:db8::8", tcp(22, 60000, 0x18)))
+FRAMES["ipv6 udp"] = ethernet(0x86DD, ipv6(17, "2001:db8::7", "2001:db8::53", udp(40000, 53)))
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("ip", {"ipv4 tcp syn", "ipv4 options udp", "ipv4 later fragment"}),
+    ("arp", {"arp"}),
+    ("tcp", {"ipv4 tcp syn", "ipv6 tcp"}),
+    ("udp", {"ipv4 options udp", "ipv4 later fragment", "ipv6 udp"}),
+    ("icmp6", {"icmpv6 echo"}),
+    ("src host 2001:db8::1", {"ipv6 hop-by-hop tcp", "icmpv6 echo"}),
+    ("dst net 10.0.0.0/8", {"ipv4 options udp", "ipv4 later fragment"}),
+    # Ports are found past IPv4 options, and not in later fragments
+    ("port 53", {"ipv4 options udp", "ipv6 udp"}),
+    ("tcp dst port 443 or tcp src port 22", {"ipv4 tcp syn", "ipv6 tcp"}),
+    ("udp portrange 50-60", {"ipv4 options udp", "ipv6 udp"}),
+    ("not ip and not ip6", {"vlan icmp echo", "q-in-q udp", "arp"}),
+    ("ip6 and (tcp or udp) and not dst host 2001:db8::53", {"ipv6 tcp"}),
+    ("less 60", {"ipv4 tcp syn", "ipv4 options udp", "vlan icmp echo", "q-in-q udp",
+                 "ipv4 later fragment", "arp"}),
+])
+def test_filter_matches(expression, expected):
+    program = compile_filter(expression)
+    assert {name for name, frame in FRAMES.items() if program.matches(frame)} == expected
+    assert program.max_path() <= len(program)
+    assert len(program.pack()) == 8 * len(program)
+
+
+def test_empty_filter_accepts_everything():
+    program = compile_filter("  ")
+    assert all(run(program.instructions, frame) == ACCEPT_SNAPLEN for frame in FRAMES.values())
+
+
+def test_length_uses_wire_length():
+    frame = FRAMES["ipv4 tcp syn"]
+    program = compile_filter("greater 1000")
+    assert not program.matches(frame)
+    assert program.matches(frame, wire_len=1514)
+
+
+@pytest.mark.parametrize("expression", [
+    "port", "host 300.1.1.1", "port 70000", "portrange 90-80", "(tcp", "tcp and", "tcp[13] & 2 != 0",
+])
+def test_invalid_filters(expression):
+    with pytest.raises(FilterError):
+        compile_filter(expression)
@@ -0,0 +1,34 @@
+# tests/test_capture_daemon.py
+import os
+
+import pytest
+
+from components.capture_daemon import RotatingCaptureWriter
+from components.traffic_generator import TrafficGenerator
+from daemon import parse_args
+from models.packet_store import PacketStore
+
+
+@pytest.mark.parametrize("option", ["--rotate-packets", "--keep-files", "--rotate-seconds"])
+@pytest.mark.parametrize("value", ["0", "-5"])
+def test_rejects_limits_below_one(option, value, capsys):
+    with pytest.raises(SystemExit):
+        parse_args([option, value])
+    assert option in capsys.readouterr().err
+
+
+def test_rotates_by_packets_and_keeps_current_file(tmp_path):
+    args = parse_args(["--rotate-packets", "1", "--keep-files", "1"])
+    assert (args.rotate_packets, args.keep_files) == (1, 1)
+    with pytest.raises(ValueError):
+        RotatingCaptureWriter(str(tmp_path), max_packets=0)
+
+    store = PacketStore()
+    store.append_columns(TrafficGenerator(seed=2, diurnal=0).sample(10, 1.7e9, 1.7e9 + 1))
+    writer = RotatingCaptureWriter(str(tmp_path), max_seconds=None, max_packets=4, keep=2)
+    writer.write_store(store, 0, len(store))
+    assert len(writer.files) == 2
+    assert os.path.exists(writer.path)
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in writer.files)
+    store.close()
@@ -0,0 +1,93 @@
+# tests/test_display_filter.py
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from components.display_filter import DisplayFilter, DisplayFilterError, FilteredView
+from components.stats_engine import StreamingStatistics
+from components.traffic_generator import TrafficGenerator, take_rows
+from models.packet_store import PacketStore
+
+
+def test_view_statistics_fold_in_steps():
+    columns = TrafficGenerator(seed=11, diurnal=0).sample(30000, 1.7e9, 1.7e9 + 60)
+    store = PacketStore(chunk_size=4096)
+    store.append_columns(take_rows(columns, slice(0, 20000)))
+    view = FilteredView(store, DisplayFilter("tcp or size > 1000"))
+    assert view.statistics_pending == len(view) > 0
+    assert view.fold_statistics(5000) == 5000
+    store.append_columns(take_rows(columns, slice(20000, 30000)))
+    view.refresh()
+    while view.fold_statistics(5000):
+        pass
+    assert view.statistics_pending == 0
+
+    expected = StreamingStatistics()
+    expected.rebuild(view)
+    # Top-N sketches depend on batch boundaries; the exact aggregates don't
+    for name in ('packet_count', 'total_bytes', 'protocol_counts', 'first_timestamp', 'last_timestamp'):
+        assert getattr(view.statistics, name) == getattr(expected, name), name
+    mask = (store.column('size') > 1000) | np.isin(store.column('protocol'), [
+        code for code, name in enumerate(store.protocol_names) if name in ('TCP', 'HTTP', 'HTTPS', 'SSH', 'FTP')])
+    assert np.array_equal(view.indices, np.flatnonzero(mask))
+    store.close()
+
+
+START = datetime(2026, 10, 16, 9, 0).timestamp()
+
+PACKETS = [
+    {'protocol': 'HTTPS', 'src_ip': '192.168.1.5', 'dst_ip': '10.0.0.1', 'src_port': 40000,
+     'dst_port': 443, 'tcp_flags': 0x02, 'size': 60},
+    {'protocol': 'HTTPS', 'src_ip': '10.0.0.1', 'dst_ip': '192.168.1.5', 'src_port': 443,
+     'dst_port': 40000, 'tcp_flags': 0x10, 'size': 1514},
+    {'protocol': 'DNS', 'src_ip': '192.168.1.5', 'dst_ip': '10.0.0.53', 'src_port': 5353,
+     'dst_port': 53, 'size': 80},
+    {'protocol': 'ICMP', 'src_ip': '192.168.1.9', 'dst_ip': '8.8.8.8', 'icmp_type': 8, 'size': 98},
+    {'protocol': 'UDP', 'src_ip': '2001:db8::1', 'dst_ip': '2001:db8::2', 'src_port': 5000,
+     'dst_port': 6000, 'size': 1600},
+    {'protocol': 'Other', 'src_ip': 'N/A', 'dst_ip': 'N/A', 'size': 42},
+]
+
+
+@pytest.fixture
+def store():
+    store = PacketStore()
+    for minute, packet in enumerate(PACKETS):
+        store.append({'timestamp': START + 60 * minute, **packet})
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("tcp", [0, 1]),
+    ("udp", [2, 4]),
+    ("dns", [2]),
+    ("ip.src == 192.168.1.5 && tcp.flags.syn", [0]),
+    ("ip.addr == 10.0.0.0/8 and not dns", [0, 1]),
+    ("tcp.dstport in {80 443 8080} || udp.port == 53", [0, 2]),
+    ("ip.addr == 2001:db8::2", [4]),
+    ("size > 1500", [1, 4]),
+    ("frame.len <= 80", [0, 2, 5]),
+    ("size gt 1000 and size le 1514", [1]),
+    ("icmp.type == 8", [3]),
+    ("port", [0, 1, 2, 4]),
+    ('protocol == "ICMP"', [3]),
+    ("!(tcp || udp)", [3, 5]),
+    ("tcp.flags.ack and not tcp.flags.syn", [1]),
+    # 'and' binds tighter than 'or'
+    ("dns or icmp and size > 90", [2, 3]),
+    ("(dns or icmp) and size > 90", [3]),
+    ('frame.time >= "2026-10-16 09:02" && frame.time < "2026-10-16 09:04"', [2, 3]),
+])
+def test_filter_grammar(store, expression, expected):
+    assert DisplayFilter(expression).matching_indices(store).tolist() == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "", "size >", "(tcp", "tcp and", "nosuch == 1", "size == abc", "ip.src == 300.1.1.1",
+    "ip.addr == 10.0.0.0/40", "ip.src > 10.0.0.1", "tcp.dstport in {}", 'frame.time > "yesterday"',
+])
+def test_invalid_filters(expression):
+    with pytest.raises(DisplayFilterError):
+        DisplayFilter(expression)
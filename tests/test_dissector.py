@@ -0,0 +1,144 @@
+# tests/test_dissector.py
+import socket
+import struct
+
+import numpy as np
+import pytest
+
+from components.afpacket import BLOCK_DESC, TPACKET3_HDR, iter_block_frames, parse_block
+from components.dissector import (
+    ColumnBuilder, LINKTYPE_LINUX_SLL, LINKTYPE_RAW, dissect, parse_frame, parse_packet
+)
+from models.packet_store import PacketStore, COLUMN_DTYPES
+
+MACS = bytes.fromhex("00163e5a2b01" "f4e9d4a1b2c3")
+
+
+def ethernet(ethertype, payload, tags=()):
+    header = MACS
+    for tpid, tci in tags:
+        header += struct.pack("!HH", tpid, tci)
+    return header + struct.pack("!H", ethertype) + payload
+
+
+def ipv4(proto, src, dst, payload, options=b"", fragment=0):
+    ihl = 5 + len(options) // 4
+    header = struct.pack("!BBHHHBBH4s4s", 0x40 | ihl, 0, ihl * 4 + len(payload), 0x1c46, fragment, 64,
+                         proto, 0, socket.inet_aton(src), socket.inet_aton(dst))
+    return header + options + payload
+
+
+def ipv6(next_header, src, dst, payload):
+    return struct.pack("!IHBB16s16s", 0x60000000, len(payload), next_header, 64,
+                       socket.inet_pton(socket.AF_INET6, src), socket.inet_pton(socket.AF_INET6, dst)) + payload
+
+
+def tcp(src_port, dst_port, flags):
+    return struct.pack("!HHIIBBHHH", src_port, dst_port, 1000, 0, 0x50, flags, 64240, 0, 0)
+
+
+def udp(src_port, dst_port, payload=b""):
+    return struct.pack("!HHHH", src_port, dst_port, 8 + len(payload), 0) + payload
+
+
+# Frames as a capture would record them, with what parse_frame should make of each
+FRAMES = [
+    ("ipv4 tcp syn",
+     ethernet(0x0800, ipv4(6, "192.168.1.10", "93.184.216.34", tcp(51514, 443, 0x02))),
+     {'protocol': 'TCP', 'src_ip': '192.168.1.10', 'dst_ip': '93.184.216.34',
+      'src_port': 51514, 'dst_port': 443, 'tcp_flags': 0x02}),
+    ("ipv4 options udp",
+     ethernet(0x0800, ipv4(17, "10.0.0.2", "10.0.0.53", udp(5353, 53, b"\x12\x34"),
+                           options=b"\x94\x04\x00\x00")),
+     {'protocol': 'UDP', 'src_ip': '10.0.0.2', 'dst_ip': '10.0.0.53', 'src_port': 5353, 'dst_port': 53}),
+    ("vlan icmp echo",
+     ethernet(0x0800, ipv4(1, "172.16.0.1", "172.16.0.9", b"\x08\x00\x00\x00\x00\x01\x00\x01"),
+              tags=[(0x8100, 20)]),
+     {'protocol': 'ICMP', 'src_ip': '172.16.0.1', 'dst_ip': '172.16.0.9', 'icmp_type': 8}),
+    ("q-in-q udp",
+     ethernet(0x0800, ipv4(17, "10.1.1.1", "10.2.2.2", udp(40000, 123)), tags=[(0x88A8, 100), (0x8100, 20)]),
+     {'protocol': 'UDP', 'src_ip': '10.1.1.1', 'dst_ip': '10.2.2.2', 'src_port': 40000, 'dst_port': 123}),
+    ("ipv4 later fragment",
+     ethernet(0x0800, ipv4(17, "10.0.0.2", "10.0.0.3", b"\x00" * 16, fragment=185)),
+     {'protocol': 'Other', 'src_ip': '10.0.0.2', 'dst_ip': '10.0.0.3'}),
+    ("ipv6 hop-by-hop tcp",
+     ethernet(0x86DD, ipv6(0, "2001:db8::1", "2001:db8::2",
+                           bytes([6, 0]) + b"\x05\x02\x00\x00\x01\x00" + tcp(443, 50000, 0x12))),
+     {'protocol': 'TCP', 'src_ip': '2001:db8::1', 'dst_ip': '2001:db8::2',
+      'src_port': 443, 'dst_port': 50000, 'tcp_flags': 0x12}),
+    ("ipv6 first fragment udp",
+     ethernet(0x86DD, ipv6(44, "fe80::1", "ff02::fb", bytes([17, 0, 0, 1]) + b"\x00\x00\x00\x07" + udp(5353, 5353))),
+     {'protocol': 'UDP', 'src_ip': 'fe80::1', 'dst_ip': 'ff02::fb', 'src_port': 5353, 'dst_port': 5353}),
+    ("ipv6 later fragment",
+     ethernet(0x86DD, ipv6(44, "fe80::1", "ff02::fb", bytes([17, 0, 0x05, 0x01]) + b"\x00\x00\x00\x07" + b"\x00" * 8)),
+     {'protocol': 'Other', 'src_ip': 'fe80::1', 'dst_ip': 'ff02::fb'}),
+    ("icmpv6 echo",
+     ethernet(0x86DD, ipv6(58, "2001:db8::1", "2001:db8::2", b"\x80\x00\x00\x00\x00\x01\x00\x01")),
+     {'protocol': 'ICMPv6', 'src_ip': '2001:db8::1', 'dst_ip': '2001:db8::2', 'icmp_type': 128}),
+    ("arp",
+     ethernet(0x0806, bytes(28)),
+     {'protocol': 'Other', 'src_ip': 'N/A', 'dst_ip': 'N/A'}),
+]
+
+
+@pytest.mark.parametrize("name, frame, expected", FRAMES, ids=[name for name, _, _ in FRAMES])
+def test_parse_frame(name, frame, expected):
+    packet = parse_frame(frame, 1.7e9)
+    assert packet == {'timestamp': 1.7e9, 'size': len(frame), **expected}
+
+
+def test_truncated_frame_keeps_wire_length():
+    frame = FRAMES[0][1]
+    packet = parse_frame(memoryview(frame)[:14 + 20 + 8], 1.7e9, wire_len=len(frame))
+    assert packet['size'] == len(frame)
+    assert (packet['protocol'], packet['src_ip']) == ('TCP', '192.168.1.10')
+    assert 'src_port' not in packet and 'tcp_flags' not in packet
+
+
+def test_other_link_types():
+    datagram = ipv4(17, "10.0.0.2", "10.0.0.53", udp(5353, 53))
+    raw = parse_packet(datagram, 0.0, linktype=LINKTYPE_RAW)
+    sll = parse_packet(bytes(14) + b"\x08\x00" + datagram, 0.0, linktype=LINKTYPE_LINUX_SLL)
+    assert raw['dst_port'] == sll['dst_port'] == 53
+    assert raw['src_ip'] == sll['src_ip'] == '10.0.0.2'
+
+
+def test_column_builder_matches_store_append():
+    builder = ColumnBuilder()
+    expected = PacketStore()
+    for index, (_, frame, _) in enumerate(FRAMES):
+        builder.add(float(index), len(frame), dissect(frame))
+        expected.append(parse_frame(frame, float(index)))
+    store = PacketStore()
+    columns = builder.columns()
+    store.intern_rows(columns, builder.interned)
+    store.append_columns(columns)
+    for name in COLUMN_DTYPES:
+        assert np.array_equal(store.column(name), expected.column(name)), name
+    assert list(store) == list(expected)
+
+
+def tpacket_block(frames):
+    """A retired TPACKET_V3 block holding ``frames`` as (sec, nsec, frame) triples"""
+    first = 48
+    mac = 32
+    entries = []
+    for index, (sec, nsec, frame) in enumerate(frames):
+        size = (mac + len(frame) + 15) & ~15
+        next_offset = size if index < len(frames) - 1 else 0
+        header = TPACKET3_HDR.pack(next_offset, sec, nsec, len(frame), len(frame) + 4, 0, mac, mac + 14)
+        entries.append(header.ljust(mac, b"\0") + frame.ljust(size - mac, b"\0"))
+    desc = BLOCK_DESC.pack(1, 0, 1, len(frames), first)
+    return desc.ljust(first, b"\0") + b"".join(entries)
+
+
+def test_tpacket_v3_block():
+    frames = [(1700000000 + index, 250000000, frame) for index, (_, frame, _) in enumerate(FRAMES)]
+    block = tpacket_block(frames)
+    decoded = list(iter_block_frames(block))
+    assert [(timestamp, bytes(frame), wire_len) for timestamp, frame, wire_len in decoded] == \
+        [(sec + nsec * 1e-9, frame, len(frame) + 4) for sec, nsec, frame in frames]
+    packets = parse_block(block)
+    assert [packet['protocol'] for packet in packets] == [expected['protocol'] for _, _, expected in FRAMES]
+    assert packets[0]['size'] == len(FRAMES[0][1]) + 4
+    assert packets[5]['src_ip'] == '2001:db8::1'
@@ -0,0 +1,89 @@
+# tests/test_flow_table.py
+import numpy as np
+import pytest
+
+from components.flow_table import FlowTable, FLOW_COLUMNS, END_IDLE, END_ACTIVE, END_OVERFLOW
+from components.traffic_generator import TrafficGenerator
+from models.packet_store import PacketStore
+
+CLIENT = {'src_ip': '192.168.1.10', 'dst_ip': '93.184.216.34', 'src_port': 51514, 'dst_port': 443}
+SERVER = {'src_ip': '93.184.216.34', 'dst_ip': '192.168.1.10', 'src_port': 443, 'dst_port': 51514}
+
+# A TCP handshake and a reply, an IPv6 DNS lookup and a packet with no addresses
+PACKETS = [
+    {'timestamp': 10.0, 'size': 74, 'protocol': 'TCP', 'tcp_flags': 0x02, **CLIENT},
+    {'timestamp': 10.1, 'size': 74, 'protocol': 'TCP', 'tcp_flags': 0x12, **SERVER},
+    {'timestamp': 10.2, 'size': 66, 'protocol': 'TCP', 'tcp_flags': 0x10, **CLIENT},
+    {'timestamp': 10.3, 'size': 1500, 'protocol': 'TCP', 'tcp_flags': 0x18, **SERVER},
+    {'timestamp': 11.0, 'size': 90, 'protocol': 'UDP', 'src_ip': '2001:db8::7', 'dst_ip': '2001:db8::53',
+     'src_port': 40000, 'dst_port': 53},
+    {'timestamp': 11.1, 'size': 120, 'protocol': 'UDP', 'src_ip': '2001:db8::53', 'dst_ip': '2001:db8::7',
+     'src_port': 53, 'dst_port': 40000},
+    {'timestamp': 12.0, 'size': 60, 'protocol': 'Other', 'src_ip': 'N/A', 'dst_ip': 'N/A'},
+]
+
+
+@pytest.fixture
+def store():
+    store = PacketStore()
+    for packet in PACKETS:
+        store.append(packet)
+    yield store
+    store.close()
+
+
+def describe_all(table, store):
+    return sorted((FlowTable.describe(flow, store) for flow in table.flows()), key=lambda flow: flow['first_seen'])
+
+
+def test_both_directions_share_a_flow(store):
+    table = FlowTable()
+    table.update(store.columns(FLOW_COLUMNS))
+    assert len(table) == 3
+    tcp, dns, other = describe_all(table, store)
+    assert tcp == {
+        'src_ip': '192.168.1.10', 'src_port': 51514, 'dst_ip': '93.184.216.34', 'dst_port': 443,
+        'protocol': 'TCP', 'packets': 4, 'bytes': 1714,
+        'packets_ab': 2, 'packets_ba': 2, 'bytes_ab': 140, 'bytes_ba': 1574,
+        'flags_ab': ['SYN', 'ACK'], 'flags_ba': ['SYN', 'ACK', 'PSH'],
+        'first_seen': 10.0, 'last_seen': 10.3, 'state': 'active',
+    }
+    assert (dns['src_ip'], dns['dst_port'], dns['bytes_ab'], dns['bytes_ba']) == ('2001:db8::7', 53, 90, 120)
+    assert (other['src_ip'], other['dst_ip'], other['packets']) == ('N/A', 'N/A', 1)
+    assert [flow['bytes_lo'] + flow['bytes_hi'] for flow in table.top(2)] == [1714, 210]
+
+
+def test_batches_fold_like_one_update():
+    store = PacketStore()
+    store.append_columns(TrafficGenerator(seed=3, diurnal=0).sample(20000, 1.7e9, 1.7e9 + 30))
+    whole, batched = FlowTable(), FlowTable()
+    whole.update(store.columns(FLOW_COLUMNS))
+    for start in range(0, len(store), 1500):
+        batched.update(store.columns(FLOW_COLUMNS, start, start + 1500))
+    key = lambda flows: np.sort(flows, order=('lo', 'hi', 'protocol'))
+    assert np.array_equal(key(whole.flows()), key(batched.flows()))
+    assert int(sum(flow['packets_lo'] + flow['packets_hi'] for flow in whole.flows())) == len(store)
+    store.close()
+
+
+def test_flows_end_idle_active_and_evicted(store):
+    table = FlowTable(idle_timeout=5.0, active_timeout=20.0, max_flows=2, max_ended=2)
+    columns = store.columns(FLOW_COLUMNS)
+    table.update(columns)
+    # Three flows into a table of two: the least recently seen, TCP, is evicted
+    assert len(table) == 2
+    assert table.evicted[END_OVERFLOW] == 1
+    evicted = FlowTable.describe(table.flows()[-1], store)
+    assert (evicted['protocol'], evicted['packets'], evicted['state']) == ('TCP', 4, 'evicted')
+
+    table.sweep(16.5)
+    assert len(table) == 1 and table.evicted[END_IDLE] == 1
+    assert table.ended_count == 2
+
+    # A flow kept busy is split when it has been open too long
+    table = FlowTable(idle_timeout=5.0, active_timeout=20.0)
+    for second in range(0, 30, 2):
+        table.update({**columns, 'timestamp': columns['timestamp'] + 90.0 + second})
+    assert table.evicted[END_ACTIVE] == 3
+    states = [FlowTable.describe(flow, store)['state'] for flow in table.flows()]
+    assert states.count('active') == 3 and states.count('active timeout') == 3
@@ -0,0 +1,60 @@
+# tests/test_packet_store.py
+import numpy as np
+
+from models.packet_store import PacketStore, RetentionPolicy
+
+CHUNK = 1024
+
+
+def batch(index, count=CHUNK):
+    first = index * CHUNK
+    return {'timestamp': np.arange(first, first + count, dtype=np.float64),
+            'size': np.full(count, 60 + index, dtype=np.uint32)}
+
+
+def test_rows_survive_spilling():
+    store = PacketStore(RetentionPolicy(max_packets=2 * CHUNK), chunk_size=CHUNK)
+    try:
+        for index in range(6):
+            store.append_columns(batch(index))
+        assert store.spilled_count > 0
+        assert np.array_equal(store.column('timestamp'), np.arange(6 * CHUNK, dtype=np.float64))
+        assert store[0]['size'] == 60
+    finally:
+        store.close()
+
+
+def test_views_stay_valid_across_spills():
+    store = PacketStore(RetentionPolicy(max_packets=2 * CHUNK), chunk_size=CHUNK)
+    try:
+        store.append_columns(batch(0))
+        column = store.column('timestamp', 0, CHUNK)
+        chunks = list(store.iter_chunks(('size',)))
+        for index in range(1, 7):
+            store.append_columns(batch(index))
+        assert store.spilled_count >= 4 * CHUNK
+        assert np.array_equal(column, np.arange(CHUNK, dtype=np.float64))
+        assert (chunks[0]['size'] == 60).all()
+    finally:
+        store.close()
+
+
+def test_session_round_trip(tmp_path):
+    store = PacketStore(chunk_size=CHUNK)
+    store.append_columns(batch(0))
+    store.append_columns(batch(1, 100))
+    store.append({'timestamp': 5000.0, 'size': 99, 'protocol': 'DNS',
+                  'src_ip': 'fe80::1', 'dst_ip': '10.0.0.1', 'dst_port': 53})
+    store.save_session(str(tmp_path))
+    reopened = PacketStore.open_session(str(tmp_path))
+    try:
+        assert len(reopened) == len(store)
+        for name in ('timestamp', 'size', 'protocol', 'src_ip', 'fields'):
+            assert np.array_equal(reopened.column(name), store.column(name))
+        last = reopened[len(reopened) - 1]
+        assert dict(last) == dict(store[len(store) - 1])
+        assert (last['protocol'], last['src_ip'], last['dst_ip'], last['dst_port']) == ('DNS', 'fe80::1', '10.0.0.1', 53)
+        assert reopened.time_span(1024, 1030) == (1024, 1031)
+    finally:
+        reopened.close()
+        store.close()
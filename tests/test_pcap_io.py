@@ -0,0 +1,92 @@
+# tests/test_pcap_io.py
+import numpy as np
+import pytest
+
+from components.pcap_io import CaptureFileReader, CaptureFileWriter, FORMAT_PCAP, FORMAT_PCAPNG
+from components.traffic_generator import TrafficGenerator, take_rows
+from models.packet_store import PacketStore, RetentionPolicy, COLUMN_DTYPES
+
+CHUNK = 1024
+
+# Application protocols are named from ports, which a saved frame only
+# keeps as its transport protocol
+_TRANSPORT = {'HTTP': 'TCP', 'HTTPS': 'TCP', 'SSH': 'TCP', 'FTP': 'TCP', 'DNS': 'UDP'}
+
+
+def sample_store(count, **kwargs):
+    store = PacketStore(**kwargs)
+    store.append_columns(TrafficGenerator(seed=3, diurnal=0).sample(count, 1.7e9, 1.7e9 + 30))
+    return store
+
+
+def import_columns(path):
+    store = PacketStore()
+    with CaptureFileReader(str(path)) as reader:
+        for columns, interned in reader.column_batches(1000):
+            store.intern_rows(columns, interned)
+            store.append_columns(columns)
+    return store
+
+
+@pytest.mark.parametrize("file_format", [FORMAT_PCAP, FORMAT_PCAPNG])
+def test_round_trip(tmp_path, file_format):
+    store = sample_store(5000)
+    store.append({'timestamp': 1.7e9 + 31, 'size': 120, 'protocol': 'UDP', 'src_ip': '2001:db8::1',
+                  'dst_ip': '2001:db8::2', 'src_port': 5000, 'dst_port': 6000})
+    path = tmp_path / f"capture.{file_format}"
+    with CaptureFileWriter(str(path), file_format) as writer:
+        assert writer.write_store(store) == len(store)
+    loaded = import_columns(path)
+    assert len(loaded) == len(store)
+    assert np.allclose(loaded.column('timestamp'), store.column('timestamp'), rtol=0, atol=1e-6)
+    for name in ('size', 'src_port', 'dst_port', 'tcp_flags'):
+        assert np.array_equal(loaded.column(name), store.column(name)), name
+    for original, read in zip(store[:len(store) - 1], loaded[:len(loaded) - 1]):
+        assert (read['src_ip'], read['dst_ip']) == (original['src_ip'], original['dst_ip'])
+        assert read['protocol'] == _TRANSPORT.get(original['protocol'], original['protocol'])
+    last = loaded[len(loaded) - 1]
+    assert (last['src_ip'], last['dst_ip'], last['protocol']) == ('2001:db8::1', '2001:db8::2', 'UDP')
+    store.close()
+    loaded.close()
+
+
+def test_dict_and_column_import_agree(tmp_path):
+    store = sample_store(3000)
+    path = tmp_path / "capture.pcapng"
+    with CaptureFileWriter(str(path)) as writer:
+        writer.write_store(store)
+    dicts = PacketStore()
+    with CaptureFileReader(str(path)) as reader:
+        for batch in reader.batches(1000):
+            dicts.extend(batch)
+    columns = import_columns(path)
+    for name in COLUMN_DTYPES:
+        assert np.array_equal(dicts.column(name), columns.column(name)), name
+    assert dicts.addresses == columns.addresses
+
+
+def test_save_while_capture_spills(tmp_path):
+    columns = TrafficGenerator(seed=5, diurnal=0).sample(8 * CHUNK, 1.7e9, 1.7e9 + 30)
+    quiet = PacketStore(chunk_size=CHUNK)
+    quiet.append_columns(take_rows(columns, slice(0, 2 * CHUNK)))
+    busy = PacketStore(RetentionPolicy(max_packets=2 * CHUNK), chunk_size=CHUNK)
+    busy.append_columns(take_rows(columns, slice(0, 2 * CHUNK)))
+    appended = [2 * CHUNK]
+
+    def capture_more():
+        # Runs between the store handing out a chunk and the writer reading
+        # it: the chunk is spilled and room is made for new packets
+        for _ in range(2):
+            if appended[0] < len(columns['timestamp']):
+                busy.append_columns(take_rows(columns, slice(appended[0], appended[0] + CHUNK)))
+                appended[0] += CHUNK
+        return False
+
+    with CaptureFileWriter(str(tmp_path / "quiet.pcapng")) as writer:
+        writer.write_store(quiet)
+    with CaptureFileWriter(str(tmp_path / "busy.pcapng")) as writer:
+        assert writer.write_store(busy, 0, 2 * CHUNK, cancelled=capture_more) == 2 * CHUNK
+    assert busy.spilled_count >= 2 * CHUNK
+    assert (tmp_path / "busy.pcapng").read_bytes() == (tmp_path / "quiet.pcapng").read_bytes()
+    quiet.close()
+    busy.close()
@@ -0,0 +1,66 @@
+# tests/test_report_export.py
+import numpy as np
+import pytest
+
+from components.report_export import open_export, FORMAT_CSV, FORMAT_JSONL, FORMAT_COLUMNAR
+from components.traffic_generator import TrafficGenerator, take_rows
+from models.packet_store import PacketStore, RetentionPolicy
+
+CHUNK = 1024
+
+
+def sample_columns(count):
+    return TrafficGenerator(seed=7, diurnal=0).sample(count, 1.7e9, 1.7e9 + 60)
+
+
+def export(store, path, file_format, cancelled=None):
+    with open_export(str(path), file_format) as writer:
+        return writer.write_store(store, cancelled=cancelled)
+
+
+@pytest.mark.parametrize("file_format", [FORMAT_CSV, FORMAT_JSONL, FORMAT_COLUMNAR])
+def test_export_while_appending_past_retention(tmp_path, file_format):
+    columns = sample_columns(12 * CHUNK)
+    initial = take_rows(columns, slice(0, 2 * CHUNK))
+    quiet = PacketStore(chunk_size=CHUNK)
+    quiet.append_columns(initial)
+    busy = PacketStore(RetentionPolicy(max_packets=2 * CHUNK), chunk_size=CHUNK)
+    busy.append_columns(initial)
+    appended = [2 * CHUNK]
+
+    def capture_more():
+        # Called between the store handing out a chunk and the writer
+        # reading it: capture meanwhile spills that chunk, then allocates
+        # room for more packets
+        for _ in range(2):
+            if appended[0] < len(columns['timestamp']):
+                busy.append_columns(take_rows(columns, slice(appended[0], appended[0] + CHUNK)))
+                appended[0] += CHUNK
+        return False
+
+    try:
+        assert export(quiet, tmp_path / "quiet", file_format) == 2 * CHUNK
+        assert export(busy, tmp_path / "busy", file_format, capture_more) == 2 * CHUNK
+        assert busy.spilled_count >= 2 * CHUNK
+        if file_format == FORMAT_COLUMNAR:
+            with np.load(tmp_path / "quiet") as expected, np.load(tmp_path / "busy") as actual:
+                for name in ('timestamp', 'size', 'src_ip', 'dst_port', 'fields'):
+                    assert np.array_equal(actual[name], expected[name])
+        else:
+            assert (tmp_path / "busy").read_bytes() == (tmp_path / "quiet").read_bytes()
+    finally:
+        quiet.close()
+        busy.close()
+
+
+def test_csv_rows(tmp_path):
+    store = PacketStore()
+    store.append({'timestamp': 1.7e9, 'size': 74, 'protocol': 'TCP', 'src_ip': '10.0.0.1',
+                  'dst_ip': '10.0.0.2', 'src_port': 40000, 'dst_port': 443, 'tcp_flags': 0x02})
+    store.append({'timestamp': 1.7e9 + 1, 'size': 90, 'protocol': 'DNS', 'src_ip': 'fe80::1',
+                  'dst_ip': '10.0.0.53', 'src_port': 5353, 'dst_port': 53})
+    assert export(store, tmp_path / "out.csv", FORMAT_CSV) == 2
+    lines = (tmp_path / "out.csv").read_text().splitlines()
+    assert len(lines) == 3
+    assert "10.0.0.1" in lines[1] and "443" in lines[1] and "SYN" in lines[1]
+    assert "fe80::1" in lines[2] and "DNS" in lines[2]
@@ -0,0 +1,138 @@
+# tests/test_sketches.py
+from collections import Counter
+
+import numpy as np
+
+from components.sketches import DDSketch, HyperLogLog, KeyedHyperLogLog, SpaceSaving, WindowedHyperLogLog
+
+
+def zipf_keys(seed, count, distinct=5000):
+    rng = np.random.default_rng(seed)
+    return (rng.zipf(1.3, count) % distinct).astype(np.uint64)
+
+
+def check_space_saving(summary, truth):
+    assert summary.total == sum(truth.values())
+    assert len(summary) <= summary.capacity
+    reported = {key: (estimate, error) for key, estimate, error in summary.top(summary.capacity)}
+    for key, (estimate, error) in reported.items():
+        assert truth[key] <= estimate <= truth[key] + error
+        assert error <= summary.max_error
+    # Every key above total / capacity is guaranteed a counter
+    for key, count in truth.items():
+        if count > summary.total / summary.capacity:
+            assert key in reported
+
+
+def test_space_saving_bounds_over_batches():
+    keys = zipf_keys(1, 200000)
+    weights = np.random.default_rng(2).integers(60, 1514, len(keys))
+    packets, sizes = SpaceSaving(64), SpaceSaving(64)
+    for start in range(0, len(keys), 7000):
+        packets.update(keys[start:start + 7000])
+        sizes.update(keys[start:start + 7000], weights[start:start + 7000])
+    check_space_saving(packets, Counter(keys.tolist()))
+    byte_totals = Counter()
+    for key, weight in zip(keys.tolist(), weights.tolist()):
+        byte_totals[key] += weight
+    check_space_saving(sizes, byte_totals)
+    assert [key for key, _, _ in packets.top(3)] == [key for key, _ in Counter(keys.tolist()).most_common(3)]
+
+
+def test_space_saving_merge_and_composite_keys():
+    first, second = zipf_keys(3, 50000), zipf_keys(4, 80000)
+    pairs = np.column_stack([first[:40000], first[10000:50000]])
+    left, right = SpaceSaving(32), SpaceSaving(32)
+    left.update(first)
+    right.update(second)
+    left.merge(right)
+    check_space_saving(left, Counter(first.tolist()) + Counter(second.tolist()))
+
+    conversations = SpaceSaving(32, key_width=2)
+    conversations.update(pairs)
+    check_space_saving(conversations, Counter(map(tuple, pairs.tolist())))
+
+
+def test_hyperloglog_estimate_and_union():
+    keys = np.random.default_rng(5).permutation(np.arange(1, 150001, dtype=np.uint64))
+    left, right, whole = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.update(keys[:100000])
+    right.update(np.concatenate([keys[50000:], keys[50000:60000]]))
+    whole.update(keys)
+    # Four standard errors of 1.04 / sqrt(4096)
+    assert abs(left.estimate() / 100000 - 1) < 0.065
+    assert abs(right.estimate() / 100000 - 1) < 0.065
+    left.merge(right)
+    assert np.array_equal(left.registers, whole.registers)
+    assert abs(left.estimate() / 150000 - 1) < 0.065
+    # Small counts use linear counting and are close to exact
+    small = HyperLogLog()
+    small.update(keys[:200])
+    assert abs(small.estimate() - 200) < 5
+
+
+def test_windowed_hyperloglog_forgets_old_windows():
+    estimator = WindowedHyperLogLog(window_seconds=10, windows=3)
+    for window in range(5):
+        keys = np.arange(window * 1000, window * 1000 + 1000 * (window + 1), dtype=np.uint64)
+        estimator.update(keys, np.full(len(keys), window * 10 + 5.0))
+    # Windows 2..4 hold keys 2000..8999; the total saw keys 0..8999
+    assert abs(estimator.recent() / 7000 - 1) < 0.065
+    assert abs(estimator.recent(1) / 5000 - 1) < 0.065
+    assert abs(estimator.total.estimate() / 9000 - 1) < 0.065
+    assert [round(estimate, -3) for estimate in estimator.window_estimates()] == [3000, 4000, 5000]
+
+
+def test_keyed_hyperloglog_keeps_the_widest_keys():
+    rng = np.random.default_rng(6)
+    # A scanner touching 3000 ports among many sources touching a few each
+    sources = np.concatenate([np.full(3000, 7), rng.integers(100, 5000, 20000)]).astype(np.uint64)
+    ports = np.concatenate([np.arange(3000), rng.integers(0, 4, 20000)]).astype(np.uint64)
+    order = rng.permutation(len(sources))
+    table = KeyedHyperLogLog(capacity=64)
+    for start in range(0, len(order), 2000):
+        batch = order[start:start + 2000]
+        table.update(sources[batch], ports[batch])
+    assert len(table) <= 64
+    (key, estimate), = table.top(1)
+    assert key == 7
+    assert abs(estimate / 3000 - 1) < 0.5
+
+
+QUANTILES = [0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 0.999, 1.0]
+
+
+def check_quantiles(sketch, values, series=None):
+    expected = np.quantile(values, QUANTILES, method='lower')
+    estimated = np.array(sketch.quantiles(QUANTILES, series))
+    assert np.all(np.abs(estimated - expected) <= sketch.relative_accuracy * expected * (1 + 1e-9))
+
+
+def test_ddsketch_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(7)
+    # Round-trip times in seconds, from microseconds to tens of seconds
+    values = rng.lognormal(-5, 2.5, 100000).clip(1e-5, 50)
+    series = rng.integers(0, 3, len(values))
+    sketch, other = DDSketch(), DDSketch()
+    sketch.update(values[:60000], series[:60000])
+    other.update(values[60000:], series[60000:])
+    sketch.merge(other)
+    assert sketch.count() == len(values)
+    check_quantiles(sketch, values)
+    for code in range(3):
+        check_quantiles(sketch, values[series == code], code)
+    assert sketch.series() == [0, 1, 2]
+    assert np.isnan(sketch.quantiles([0.5], series=5)).all()
+
+    lower, upper, counts = sketch.histogram()
+    assert counts.sum() == len(values)
+    assert np.allclose(upper / lower, sketch.gamma)
+
+
+def test_ddsketch_clamps_out_of_range_values():
+    sketch = DDSketch(relative_accuracy=0.02, min_value=1e-3, max_value=1e3)
+    sketch.update(np.array([0.0, 1e-4, 5.0, 5e4]))
+    low, middle, high = sketch.quantiles([0.0, 2 / 3, 1.0])
+    assert low == 0.0
+    assert abs(middle / 5.0 - 1) <= 0.02
+    assert high <= 1e3 * sketch.gamma
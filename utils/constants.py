@@ -0,0 +1,30 @@
+# utils/constants.py
+
+# Protocol names stored as uint8 codes in the packet store. New names seen at
+# runtime are appended after these by the store itself.
+PROTOCOLS = ['Other', 'TCP', 'UDP', 'ICMP', 'HTTP', 'HTTPS', 'DNS', 'SSH', 'FTP', 'ICMPv6']
+
+# TCP flag bits
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_PSH = 0x08
+TCP_ACK = 0x10
+TCP_URG = 0x20
+
+# Order in which flags are listed in the packet info and details views
+TCP_FLAG_NAMES = [(TCP_SYN, "SYN"), (TCP_ACK, "ACK"), (TCP_FIN, "FIN"),
+                  (TCP_PSH, "PSH"), (TCP_RST, "RST")]
+
+# Bits of the packet store's per-row "fields" column recording which optional
+# fields a packet carries
+FIELD_SRC_IP = 0x01
+FIELD_DST_IP = 0x02
+FIELD_SRC_PORT = 0x04
+FIELD_DST_PORT = 0x08
+FIELD_TCP_FLAGS = 0x10
+FIELD_ICMP_TYPE = 0x20
+# The address column holds an index into the store's address table rather
+# than a packed IPv4 address (IPv6, 'N/A', ...)
+FIELD_SRC_INTERNED = 0x40
+FIELD_DST_INTERNED = 0x80
@@ -0,0 +1,25 @@
+# utils/helpers.py
+import socket
+import struct
+
+from utils.constants import TCP_FLAG_NAMES
+
+_IPV4 = struct.Struct("!I")
+
+
+def ip_to_int(address):
+    """Pack a dotted-quad IPv4 string into an int, or return None if it isn't one"""
+    try:
+        return _IPV4.unpack(socket.inet_aton(address))[0] if address.count('.') == 3 else None
+    except (OSError, AttributeError):
+        return None
+
+
+def int_to_ip(value):
+    """Format a packed IPv4 address as a dotted-quad string"""
+    return socket.inet_ntoa(_IPV4.pack(int(value)))
+
+
+def tcp_flag_list(flags):
+    """Return the names of the TCP flags set in a flag byte"""
+    return [name for bit, name in TCP_FLAG_NAMES if flags & bit]